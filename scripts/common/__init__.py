@@ -0,0 +1,5 @@
+"""
+DECODE X 2026 - Shared Analysis Modules
+=======================================
+Data-access and computation helpers shared by the stage scripts.
+"""
@@ -0,0 +1,142 @@
+"""
+DECODE X 2026 - Rolling-Origin Backtest
+=======================================
+Re-fits the Stage 1 decomposition at many historical origins and scores
+its 1..N month-ahead forecasts against what actually happened.
+
+  origins = pd.date_range('2023-01-01', '2025-06-01', freq='MS')
+  errors = rolling_origin(daily_route, origins, labels=['Route_Code', 'Route_Type'])
+  scores = score(errors, by=['Route_Type', 'Horizon'])
+
+For an origin (the first day of a month) the model sees only the history
+before it and forecasts the next `horizon_months` months. Months before
+an origin are complete, so every origin's trend line comes from prefix
+sums of the per-series monthly means (one cumulative sum shared by all
+origins, O(series) per origin). The seasonal, day-of-week and
+congestion components need one pass over the rows before the origin;
+origins are fitted in parallel in a process pool.
+
+Scores per group, in percent:
+  MAPE  mean of |forecast - actual| / actual over days with actual > 0
+  WAPE  sum |forecast - actual| / sum actual
+  Bias  sum (forecast - actual) / sum actual (positive = over-forecast)
+
+Pool workers are spawned, so a script calling rolling_origin(jobs > 1)
+must keep its top-level work under `if __name__ == '__main__':`.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.dates import build_date_dimension
+from common.forecasting import SERIES_KEYS, fit_components, monthly_means, project
+from common.regression import ols_from_sums
+
+BACKTEST_HORIZON_MONTHS = 6
+
+# History shared by the pool workers (set once per worker by _init_worker)
+_HISTORY = None
+
+
+def prefix_trends(history, origins, keys=SERIES_KEYS, value='Total_Pax'):
+    """Trend fit of every series as of each origin. Returns {origin: frame indexed by key}."""
+    series = history.groupby(keys, sort=True, observed=True)
+    codes = series.ngroup().to_numpy()
+    n_series = series.ngroups
+    monthly = monthly_means(history, codes, value)  # sorted by (code, period)
+
+    month_codes = monthly.index.get_level_values(0).to_numpy()
+    periods = monthly.index.get_level_values(1).to_numpy()
+    x = monthly.groupby(level=0).cumcount().to_numpy(dtype='float64')
+    y = monthly.to_numpy()
+    terms = np.column_stack([np.ones_like(x), x, y, x * x, x * y, y * y])
+    # prefix[i] = sums over the first i monthly rows
+    prefix = np.vstack([np.zeros(terms.shape[1]), np.cumsum(terms, axis=0)])
+
+    # Rows are ordered by (code, period): one sortable key finds each series' cut
+    span = int(periods.max()) + 1
+    row_keys = month_codes * span + periods
+    starts = np.searchsorted(row_keys, np.arange(n_series) * span)
+
+    trends = {}
+    for origin in origins:
+        origin_period = origin.year * 12 + origin.month
+        ends = np.searchsorted(row_keys, np.arange(n_series) * span + min(origin_period, span))
+        sums = prefix[ends] - prefix[starts]
+        fit = ols_from_sums(*sums.T)
+        fit.index = series.size().index
+        trends[origin] = fit[fit['N'] > 0]
+    return trends
+
+
+def _init_worker(history):
+    global _HISTORY
+    _HISTORY = history
+
+
+def _backtest_origin(origin, trend, keys, labels, value, horizon_months):
+    """Fit on the history before `origin`, forecast ahead, pair with the actuals."""
+    history = _HISTORY
+    end = origin + pd.DateOffset(months=horizon_months) - pd.Timedelta(days=1)
+    train = history[history['Date'] < origin]
+    actual = history[(history['Date'] >= origin) & (history['Date'] <= end)]
+    if train.empty or actual.empty:
+        return None
+
+    params = fit_components(train, keys, labels, value, trend=trend)
+    horizon = build_date_dimension(origin, actual['Date'].max())
+    forecast = project(params, horizon, value, calendar=())
+    paired = forecast.merge(actual[keys + ['Date', value]], on=keys + ['Date'])
+
+    paired = paired.rename(columns={f'Forecast_{value}': 'Forecast', value: 'Actual'})
+    paired.insert(0, 'Origin', origin)
+    months = (paired['Date'].dt.year - origin.year) * 12 + (paired['Date'].dt.month - origin.month)
+    paired.insert(1, 'Horizon', months + 1)
+    return paired[['Origin', 'Horizon', 'Date'] + keys + list(labels) + ['Actual', 'Forecast']]
+
+
+def rolling_origin(history, origins, keys=SERIES_KEYS, labels=(), value='Total_Pax',
+                   horizon_months=BACKTEST_HORIZON_MONTHS, jobs=None):
+    """Backtest forecasts for every origin: one row per (origin, series, day) with an actual.
+
+    `history` is the fit_components input (one row per series and day);
+    `jobs` worker processes (None = CPU count, 1 = in process).
+    """
+    keys, labels = list(keys), list(labels)
+    origins = [pd.Timestamp(origin) for origin in origins]
+    trends = prefix_trends(history, origins, keys, value)
+    tasks = [(origin, trends[origin], keys, labels, value, horizon_months) for origin in origins]
+
+    if jobs == 1:
+        _init_worker(history)
+        results = [_backtest_origin(*task) for task in tasks]
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=_init_worker, initargs=(history,)) as pool:
+            results = list(pool.map(_backtest_origin, *zip(*tasks)))
+    return pd.concat([r for r in results if r is not None], ignore_index=True)
+
+
+def score(errors, by):
+    """Days, MAPE, WAPE and Bias (percent) per `by` group of a rolling_origin() frame."""
+    error = errors['Forecast'] - errors['Actual']
+    actual = errors['Actual']
+    frame = pd.DataFrame({
+        'Error': error,
+        'Abs_Error': error.abs(),
+        'APE': (error.abs() / actual).where(actual > 0),
+        'Actual': actual,
+    })
+    grouped = frame.groupby([errors[col] for col in ([by] if isinstance(by, str) else by)],
+                            observed=True)
+    sums = grouped[['Error', 'Abs_Error', 'Actual']].sum()
+    return pd.DataFrame({
+        'Days': grouped.size(),
+        'MAPE': grouped['APE'].mean() * 100,
+        'WAPE': sums['Abs_Error'] / sums['Actual'] * 100,
+        'Bias': sums['Error'] / sums['Actual'] * 100,
+    })
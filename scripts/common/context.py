@@ -0,0 +1,328 @@
+"""
+DECODE X 2026 - Shared Data Context
+===================================
+One loader for the datasets every stage script opens with (master,
+forecasts, routes, stops, mapping, stop geometry, shock / out-of-time
+drops).
+
+  ctx = DataContext(DATA_DIR)
+  master_df = ctx.master(columns=['Date', 'Route_Code', 'Total_Pax'])
+  forecast_df = ctx.forecast()
+  routes_df = ctx.routes()
+
+Each dataset is loaded lazily on first access and memoized in process,
+keyed by file path + content fingerprint, so scripts run back to back in
+one interpreter (runners, orchestrator) parse each file once. Parsed CSVs
+are also written to an on-disk Parquet cache (<data_dir>/.cache) that the
+next process reads instead of re-parsing the CSV. Master columns are
+cached one by one: a script asking for a column another script already
+loaded does not touch the store again.
+
+Callers always receive their own copy, so mutating a returned frame never
+leaks into the cache.
+
+For process-parallel runs, publish_shared() writes the memoized frames as
+uncompressed Arrow IPC files; a worker started with DECODEX_SHARED_FRAMES
+pointing at that directory memory-maps them on a memo miss instead of
+re-reading the store, so the OS shares one copy of the pages.
+"""
+
+import hashlib
+import os
+import pandas as pd
+import pyarrow as pa
+
+from common.cube import CUBE_NAME, DemandCube, cube_path
+from common.dates import DATE_DIM_NAME
+from common.forecasting import FORECAST_PARAMS_NAME, Forecaster
+from common.geo import SEGMENT_LENGTHS_NAME, StopIndex, segment_lengths
+from common.hierarchy import FORECAST_HIERARCHY_NAME
+from common.loads import LOAD_PROFILE_NAME, LoadProfile, load_profile_path
+from common.schema import DATE_DIM_SCHEMA, MASTER_SCHEMA, apply_schema
+from common.store import (MASTER_NAME, apply_filters, count_rows, list_partitions, load_master,
+                          load_table, master_filters, table_path, to_storable)
+
+CACHE_DIR_NAME = '.cache'
+SHARED_DIR_ENV = 'DECODEX_SHARED_FRAMES'
+_BLOCK_SIZE = 1 << 20
+
+# In-process memo shared by every DataContext: key -> parsed frame (or master column dict)
+_FRAMES = {}
+# (path, size, mtime_ns) -> content digest, so unchanged files are hashed once per process
+_DIGESTS = {}
+
+
+def _file_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _DIGESTS:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b''):
+                digest.update(block)
+        _DIGESTS[key] = digest.digest()
+    return _DIGESTS[key]
+
+
+def fingerprint(paths, *extra):
+    """Content fingerprint of one or more files (plus any extra key parts)."""
+    digest = hashlib.blake2b(digest_size=12)
+    for path in paths:
+        digest.update(_file_digest(path))
+    digest.update(repr(extra).encode())
+    return digest.hexdigest()
+
+
+def clear_memo():
+    """Drop every in-process cached frame (the on-disk cache is kept)."""
+    _FRAMES.clear()
+    _DIGESTS.clear()
+
+
+def _shared_path(directory, key):
+    name = '-'.join(key) if isinstance(key, tuple) else key
+    return os.path.join(directory, f'{name}.arrow')
+
+
+def publish_shared(directory):
+    """Write every memoized frame to `directory` as an Arrow IPC file. Returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for key, frame in _FRAMES.items():
+        if isinstance(frame, dict):  # master column dict
+            frame = pd.DataFrame(frame['columns'])
+        table = pa.Table.from_pandas(to_storable(frame), preserve_index=False)
+        path = _shared_path(directory, key)
+        # Uncompressed, so readers map the column buffers without decoding
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        paths.append(path)
+    return paths
+
+
+def _shared_table(key):
+    """Memory-mapped Arrow table published for `key`, or None."""
+    directory = os.environ.get(SHARED_DIR_ENV)
+    if not directory:
+        return None
+    path = _shared_path(directory, key)
+    if not os.path.exists(path):
+        return None
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+class DataContext:
+    """Lazy, memoized access to the shared datasets under `data_dir`.
+
+    `subdirs` lists the directories (relative to data_dir) searched for each
+    file, in order; stage 3 uses the data/generated, data/raw, data/shock
+    layout, the other stages keep everything flat in data_dir.
+    """
+
+    def __init__(self, data_dir, subdirs=('',), cache_dir=None):
+        self.data_dir = str(data_dir)
+        self.search_dirs = [os.path.join(self.data_dir, d) if d else self.data_dir for d in subdirs]
+        self.cache_dir = cache_dir or os.path.join(self.data_dir, CACHE_DIR_NAME)
+
+    def path(self, filename):
+        """First existing `filename` across the search directories."""
+        for directory in self.search_dirs:
+            candidate = os.path.join(directory, filename)
+            if os.path.exists(candidate):
+                return candidate
+        raise FileNotFoundError(f"{filename} not found in {self.search_dirs}")
+
+    # ---------- CSV datasets ----------
+
+    def csv(self, filename, date_columns=('Date',), **date_kwargs):
+        """Parsed CSV with `date_columns` converted by pd.to_datetime(**date_kwargs)."""
+        path = self.path(filename)
+        file_key = fingerprint([path])
+        # Same file parsed with different date options is a different frame
+        variant = fingerprint([], tuple(date_columns), sorted(date_kwargs.items()))[:8]
+        key = (file_key, variant)
+        if key not in _FRAMES:
+            _FRAMES[key] = self._read_csv(path, key, date_columns, date_kwargs)
+        return _FRAMES[key].copy()
+
+    def _read_csv(self, path, key, date_columns, date_kwargs):
+        shared = _shared_table(key)
+        if shared is not None:
+            return shared.to_pandas()
+
+        file_key, variant = key
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(self.cache_dir, f'{stem}-{file_key}-{variant}.parquet')
+        if os.path.exists(cache_path):
+            return pd.read_parquet(cache_path)
+
+        df = pd.read_csv(path)
+        for col in date_columns:
+            df[col] = pd.to_datetime(df[col], **date_kwargs)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Parses of an older version of this file are dead weight
+        for entry in os.listdir(self.cache_dir):
+            if entry.startswith(f'{stem}-') and not entry.startswith(f'{stem}-{file_key}-'):
+                os.remove(os.path.join(self.cache_dir, entry))
+        df.to_parquet(cache_path, index=False)
+        return df
+
+    def routes(self):
+        return self.csv('Bus_Routes.csv', date_columns=())
+
+    def stops(self):
+        return self.csv('Bus_Stops.csv', date_columns=())
+
+    def mapping(self):
+        return self.csv('Route_Stop_Mapping.csv', date_columns=())
+
+    def stop_index(self):
+        """KD-tree over the stops' coordinates (common.geo.StopIndex)."""
+        return StopIndex.from_stops(self.stops())
+
+    def segment_lengths(self):
+        """Haversine km of each consecutive stop pair per route, cached on the stops + mapping content."""
+        key = fingerprint([self.path('Bus_Stops.csv'), self.path('Route_Stop_Mapping.csv')], SEGMENT_LENGTHS_NAME)
+        if key not in _FRAMES:
+            cache_path = os.path.join(self.cache_dir, f'{SEGMENT_LENGTHS_NAME}-{key}.parquet')
+            if os.path.exists(cache_path):
+                _FRAMES[key] = pd.read_parquet(cache_path)
+            else:
+                _FRAMES[key] = segment_lengths(self.mapping(), self.stops())
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for entry in os.listdir(self.cache_dir):
+                    if entry.startswith(f'{SEGMENT_LENGTHS_NAME}-'):
+                        os.remove(os.path.join(self.cache_dir, entry))
+                _FRAMES[key].to_parquet(cache_path, index=False)
+        return _FRAMES[key].copy()
+
+    def forecast(self, **date_kwargs):
+        """Stage 1 H2 2025 forecast (forecast_h2_2025.csv)."""
+        return self.csv('forecast_h2_2025.csv', **date_kwargs)
+
+    def stop_forecast(self, **date_kwargs):
+        """Stage 1 stop-level H2 2025 forecast, reconciled to the route forecast."""
+        return self.csv('forecast_stops_h2_2025.csv', **date_kwargs)
+
+    def revised_forecast(self, **date_kwargs):
+        """Stage 2 revised Q4 2025 forecast (revised_forecast_q4_2025.csv)."""
+        return self.csv('revised_forecast_q4_2025.csv', **date_kwargs)
+
+    def shock_ridership(self, **date_kwargs):
+        return self.csv('Shock_Ridership_2025_Q3.csv', **date_kwargs)
+
+    def shock_traffic(self, **date_kwargs):
+        return self.csv('Shock_Traffic_2025_Q3.csv', **date_kwargs)
+
+    def q4_ridership(self, **date_kwargs):
+        return self.csv('OutOfTime_Ridership_2025_Q4.csv', **date_kwargs)
+
+    def q4_traffic(self, **date_kwargs):
+        return self.csv('OutOfTime_Traffic_2025_Q4.csv', **date_kwargs)
+
+    # ---------- Stored tables ----------
+
+    def _store_dir(self, name):
+        for directory in self.search_dirs:
+            if any(os.path.exists(table_path(directory, name, fmt)) for fmt in ('parquet', 'csv')):
+                return directory
+        raise FileNotFoundError(f"No '{name}' table in {self.search_dirs}")
+
+    def _store_files(self, directory, name):
+        parquet_path = table_path(directory, name)
+        if os.path.exists(parquet_path):
+            return [parquet_path] + list_partitions(directory, name)
+        return [table_path(directory, name, 'csv')]
+
+    def _master_memo(self):
+        directory = self._store_dir(MASTER_NAME)
+        key = fingerprint(self._store_files(directory, MASTER_NAME), MASTER_NAME)
+        return directory, key, _FRAMES.setdefault(key, {'columns': {}, 'order': None})
+
+    @staticmethod
+    def _shared_master_columns(key, cached, missing):
+        """Fill `missing` master columns from a published shared frame. True if it had them all."""
+        shared = _shared_table(key)
+        if shared is None or not set(missing) <= set(shared.column_names):
+            return False
+        df = apply_schema(shared.select(missing).to_pandas(split_blocks=True), MASTER_SCHEMA)
+        cached['columns'].update(df.items())
+        return True
+
+    def master(self, columns=None, start=None, end=None, routes=None):
+        """Master dataset (compact dtypes), only `columns` if given.
+
+        The store is already typed Parquet, so it is memoized in process
+        column by column but not copied into the on-disk cache.
+
+        `start` / `end` / `routes` return just that slice (see
+        store.load_master). The slice is cut from memoized columns when a
+        full load already has them, otherwise read from the store's
+        matching row groups and not memoized.
+        """
+        directory, key, cached = self._master_memo()
+        filters = master_filters(start, end, routes)
+        if filters:
+            wanted = list(columns if columns is not None else cached['order'] or [])
+            needed = list(dict.fromkeys(wanted + [col for col, _, _ in filters]))
+            missing = [col for col in needed if col not in cached['columns']]
+            if wanted and (not missing or self._shared_master_columns(key, cached, missing)):
+                df = pd.DataFrame({col: cached['columns'][col] for col in needed})
+                return apply_filters(df, filters)[wanted]
+            return load_master(directory, columns=columns, start=start, end=end, routes=routes)
+
+        if columns is None:
+            if cached['order'] is None:
+                df = load_master(directory, columns=None)
+                cached['columns'].update(df.items())
+                cached['order'] = list(df.columns)
+            columns = cached['order']
+        else:
+            missing = [col for col in columns if col not in cached['columns']]
+            if missing and not self._shared_master_columns(key, cached, missing):
+                cached['columns'].update(load_master(directory, columns=missing).items())
+
+        return pd.DataFrame({col: cached['columns'][col] for col in columns})
+
+    def master_file(self):
+        """Path of the master's base file (partitions appended by --ingest are separate files)."""
+        return self._store_files(self._store_dir(MASTER_NAME), MASTER_NAME)[0]
+
+    def master_rows(self):
+        """Row count of the whole master store, without loading it."""
+        directory = self._store_dir(MASTER_NAME)
+        return count_rows(directory, MASTER_NAME)
+
+    def date_dimension(self):
+        """Shared date dimension written by stage1_pipeline.py."""
+        directory = self._store_dir(DATE_DIM_NAME)
+        key = fingerprint(self._store_files(directory, DATE_DIM_NAME), DATE_DIM_NAME)
+        if key not in _FRAMES:
+            shared = _shared_table(key)
+            _FRAMES[key] = (load_table(directory, DATE_DIM_NAME, schema=DATE_DIM_SCHEMA) if shared is None
+                            else apply_schema(shared.to_pandas(), DATE_DIM_SCHEMA))
+        return _FRAMES[key].copy()
+
+    def forecaster(self, name=FORECAST_PARAMS_NAME):
+        """Forecaster fitted and saved by stage1_forecast.py."""
+        return Forecaster.load(self._store_dir(name), name)
+
+    def forecast_hierarchy(self, level=None):
+        """Reconciled H2 forecast of every hierarchy node (Level, Node, Date, ...), optionally one level."""
+        filters = None if level is None else [('Level', '==', level)]
+        return load_table(self._store_dir(FORECAST_HIERARCHY_NAME), FORECAST_HIERARCHY_NAME, filters=filters)
+
+    def demand_cube(self, name=CUBE_NAME):
+        """(measure x route-stop x day) demand cube written by stage1_pipeline.py."""
+        for directory in self.search_dirs:
+            if os.path.exists(cube_path(directory, name)):
+                return DemandCube.load(directory, name)
+        raise FileNotFoundError(f"No '{name}' demand cube in {self.search_dirs}")
+
+    def load_profile(self, name=LOAD_PROFILE_NAME):
+        """(route x day x stop sequence) onboard load profile written by stage1_pipeline.py."""
+        for directory in self.search_dirs:
+            if os.path.exists(load_profile_path(directory, name)):
+                return LoadProfile.load(directory, name)
+        raise FileNotFoundError(f"No '{name}' load profile in {self.search_dirs}")
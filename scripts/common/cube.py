@@ -0,0 +1,208 @@
+"""
+DECODE X 2026 - Demand Cube
+===========================
+Boarding, alighting and Total_Pax of the master table as one dense
+(measure x route-stop pair x day) array, with the pair and calendar
+attributes alongside, so the stages' route x weekday, zone x day,
+year x route type ... breakdowns are array reductions instead of
+hash group-bys over every master row.
+
+  cube = ctx.demand_cube().window(end=TRAIN_END)        # history only, whatever was ingested since
+  cube.sum(by=['Route_Type', 'DayOfWeek'], where=[('Date', '>=', pd.Timestamp('2025-01-01'))])
+  cube.mean(by='Zone')                                  # per master row, like groupby().mean()
+  cube.sum(by=['Date', 'Route_Code'])                   # daily route totals
+  cube.days(by='Season', where=...)                     # service days per group
+
+Dimensions:
+  pairs  one per (Route_ID, Stop_ID) with PAIR_ATTRIBUTES (route code and
+         type, stop name, zone, stop type, sequence)
+  dates  one per service day with DATE_ATTRIBUTES (the master calendar
+         columns)
+
+`by` and `where` may use any attribute of either dimension; `where` takes
+the (column, op, value) filters of common.store. A query groups the
+selected pairs and days by their attributes and reduces the array with
+two one-hot matrix products (pairs, then days). The Records measure
+counts master rows, so groups with none are dropped and mean() is the
+per-row mean, exactly as the equivalent groupby on the master. The
+per-pair and per-day roll-ups (totals over the other axis) are computed
+once and serve the queries that only touch one dimension.
+
+stage1_pipeline.py writes the cube as <data_dir>/demand_cube.npz (a few
+MB); --ingest extends it by addition.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.dates import MASTER_CALENDAR_COLUMNS
+from common.schema import apply_schema
+from common.store import filter_mask
+
+CUBE_NAME = 'demand_cube'
+CUBE_MEASURES = ['Boarding_Count', 'Alighting_Count', 'Total_Pax', 'Records']
+PAIR_KEYS = ['Route_ID', 'Stop_ID']
+PAIR_ATTRIBUTES = PAIR_KEYS + ['Route_Code', 'Route_Type', 'Stop_Name', 'Zone', 'Stop_Type', 'Stop_Sequence']
+DATE_ATTRIBUTES = ['Date'] + MASTER_CALENDAR_COLUMNS
+# Master columns a cube is built from
+CUBE_COLUMNS = PAIR_ATTRIBUTES + DATE_ATTRIBUTES + CUBE_MEASURES[:-1]
+
+
+def cube_path(data_dir, name=CUBE_NAME):
+    """Path of a stored demand cube."""
+    return os.path.join(str(data_dir), f'{name}.npz')
+
+
+def _groups(frame, columns):
+    """Group code of every row of `frame` by `columns`, and the (sorted) group keys."""
+    if not columns:
+        return np.zeros(len(frame), dtype='int64'), pd.DataFrame(index=range(1))
+    grouped = frame.groupby(columns, observed=True, sort=True)
+    return grouped.ngroup().to_numpy(), grouped.size().index.to_frame(index=False)
+
+
+def _one_hot(codes, n_groups):
+    out = np.zeros((n_groups, len(codes)))
+    out[codes, np.arange(len(codes))] = 1.0
+    return out
+
+
+class DemandCube:
+    """Dense (measure x pair x day) demand array with attribute-based sum / mean queries."""
+
+    def __init__(self, pairs, dates, values, measures=CUBE_MEASURES):
+        self.pairs = pairs.reset_index(drop=True)
+        self.dates = dates.reset_index(drop=True)
+        self.values = np.asarray(values)
+        self.measures = list(measures)
+        # Roll-ups over each axis, for queries on one dimension only
+        self.pair_totals = self.values.sum(axis=2, dtype='int64')
+        self.date_totals = self.values.sum(axis=1, dtype='int64')
+
+    @classmethod
+    def from_master(cls, master_df):
+        """Cube of a master frame carrying CUBE_COLUMNS."""
+        pair_key = (master_df['Route_ID'].to_numpy(dtype='int64') << 32) + master_df['Stop_ID'].to_numpy(dtype='int64')
+        _, first_pair, p = np.unique(pair_key, return_index=True, return_inverse=True)
+        _, first_date, d = np.unique(master_df['Date'].to_numpy(dtype='datetime64[ns]'),
+                                     return_index=True, return_inverse=True)
+        shape = (len(first_pair), len(first_date))
+        cell = p * shape[1] + d
+        values = np.stack(
+            [np.bincount(cell, weights=master_df[col].to_numpy(dtype='float64'), minlength=np.prod(shape))
+             for col in CUBE_MEASURES[:-1]] + [np.bincount(cell, minlength=np.prod(shape))]
+        ).round().astype('int32').reshape((len(CUBE_MEASURES),) + shape)
+        return cls(master_df[PAIR_ATTRIBUTES].iloc[first_pair], master_df[DATE_ATTRIBUTES].iloc[first_date], values)
+
+    # ---------- Storage ----------
+
+    def save(self, data_dir, name=CUBE_NAME):
+        """Write the cube (values + attributes). Returns the path."""
+        arrays = {'values': self.values, 'measures': np.array(self.measures)}
+        for prefix, frame in (('pair', self.pairs), ('date', self.dates)):
+            for col in frame.columns:
+                column = frame[col]
+                if col == 'Date':
+                    arrays[f'{prefix}:{col}'] = column.to_numpy(dtype='datetime64[ns]')
+                elif column.dtype.kind in 'iuf':
+                    arrays[f'{prefix}:{col}'] = column.to_numpy()
+                else:  # categories and periods as text
+                    arrays[f'{prefix}:{col}'] = column.astype(str).to_numpy(dtype=str)
+        path = cube_path(data_dir, name)
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, data_dir, name=CUBE_NAME):
+        """DemandCube saved under `name` in `data_dir`."""
+        with np.load(cube_path(data_dir, name)) as stored:
+            frames = {prefix: pd.DataFrame({key.split(':', 1)[1]: stored[key] for key in stored.files
+                                            if key.startswith(f'{prefix}:')})
+                      for prefix in ('pair', 'date')}
+            return cls(apply_schema(frames['pair']), apply_schema(frames['date']), stored['values'],
+                       stored['measures'].tolist())
+
+    def extend(self, other):
+        """Cube covering both `self` and `other`; cells present in both are added."""
+        pairs = (pd.concat([self.pairs, other.pairs], ignore_index=True)
+                 .drop_duplicates(PAIR_KEYS).sort_values(PAIR_KEYS, ignore_index=True))
+        dates = (pd.concat([self.dates, other.dates], ignore_index=True)
+                 .drop_duplicates('Date').sort_values('Date', ignore_index=True))
+        pair_index = pd.MultiIndex.from_frame(pairs[PAIR_KEYS])
+        date_index = pd.DatetimeIndex(dates['Date'])
+        values = np.zeros((len(self.measures), len(pairs), len(dates)), dtype='int32')
+        for part in (self, other):
+            p = pair_index.get_indexer(pd.MultiIndex.from_frame(part.pairs[PAIR_KEYS]))
+            d = date_index.get_indexer(part.dates['Date'])
+            values[:, p[:, None], d[None, :]] += part.values
+        return DemandCube(apply_schema(pairs), apply_schema(dates), values, self.measures)
+
+    # ---------- Queries ----------
+
+    def window(self, start=None, end=None):
+        """Cube restricted to dates in [start, end]."""
+        days = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            days &= (self.dates['Date'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            days &= (self.dates['Date'] <= pd.Timestamp(end)).to_numpy()
+        return DemandCube(self.pairs, self.dates[days], self.values[:, :, days], self.measures)
+
+    def sum(self, by=(), where=None, measures=None):
+        """Measure totals per `by` group over the cells matching `where`.
+
+        Returns the `by` columns followed by `measures` (default: all but
+        Records), one row per group with at least one master row, sorted
+        by `by` - the frame groupby(by)[measures].sum().reset_index()
+        gives on the master.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        measures = [m for m in self.measures if m != 'Records'] if measures is None else list(measures)
+        where = list(where or [])
+        unknown = [col for col in by + [f[0] for f in where]
+                   if col not in self.pairs.columns and col not in self.dates.columns]
+        if unknown:
+            raise ValueError(f"Unknown cube attributes {unknown}")
+
+        pair_by = [col for col in by if col in self.pairs.columns]
+        date_by = [col for col in by if col not in pair_by]
+        pair_mask = filter_mask(self.pairs, [f for f in where if f[0] in self.pairs.columns])
+        date_mask = filter_mask(self.dates, [f for f in where if f[0] not in self.pairs.columns])
+        pair_codes, pair_keys = _groups(self.pairs[pair_mask], pair_by)
+        date_codes, date_keys = _groups(self.dates[date_mask], date_by)
+
+        rows = [self.measures.index(m) for m in dict.fromkeys(measures + ['Records'])]
+        if not date_by and date_mask.all():
+            block, date_codes = self.pair_totals[rows][:, pair_mask, None], np.zeros(1, dtype='int64')
+        elif not pair_by and pair_mask.all():
+            block, pair_codes = self.date_totals[rows][:, None, date_mask], np.zeros(1, dtype='int64')
+        else:
+            block = self.values[rows][:, pair_mask][:, :, date_mask]
+        totals = _one_hot(pair_codes, len(pair_keys)) @ block @ _one_hot(date_codes, len(date_keys)).T
+
+        out = pd.concat([pair_keys.iloc[np.repeat(np.arange(len(pair_keys)), len(date_keys))].reset_index(drop=True),
+                         date_keys.iloc[np.tile(np.arange(len(date_keys)), len(pair_keys))].reset_index(drop=True)],
+                        axis=1)
+        for i, m in enumerate(dict.fromkeys(measures + ['Records'])):
+            out[m] = totals[i].ravel().round().astype('int64')
+        out = out[out['Records'] > 0]
+        if by:
+            out = out.sort_values(by, kind='stable')
+        return out[by + measures].reset_index(drop=True)
+
+    def mean(self, by=(), where=None, measures=None):
+        """Per-master-row mean of `measures` per `by` group (groupby(by)[measures].mean())."""
+        measures = [m for m in self.measures if m != 'Records'] if measures is None else list(measures)
+        out = self.sum(by, where, measures + ['Records'])
+        out[measures] = out[measures].to_numpy(dtype='float64') / out[['Records']].to_numpy()
+        return out.drop(columns='Records')
+
+    def days(self, by=(), where=None):
+        """Distinct service days with master rows per `by` group (groupby(by)['Date'].nunique())."""
+        by = [by] if isinstance(by, str) else list(by)
+        daily = self.sum(list(dict.fromkeys(by + ['Date'])), where, ['Records'])
+        if not by:
+            return len(daily)
+        return daily.groupby(by, observed=True, sort=True).size().rename('Days').reset_index()
@@ -0,0 +1,82 @@
+"""
+DECODE X 2026 - Date Dimension
+==============================
+One row per calendar day carrying every calendar attribute the stages use:
+Year, Month, DayOfWeek, Dubai weekend flag (Fri-Sat), Quarter, ISO week,
+Dubai season and YearMonth period, keyed by an integer day number
+(Date_Key = days since 1970-01-01).
+
+stage1_pipeline.py builds the table once over history + forecast horizon
+and stores it next to the master dataset. Feature engineering is then a
+single vectorized lookup (add_calendar_features) instead of per-row
+Series.apply calls, and the forecast horizon reads the same table.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.joins import DimensionIndex, enrich
+from common.schema import DATE_DIM_SCHEMA, apply_schema
+
+DATE_DIM_NAME = 'date_dimension'
+
+WEEKEND_DAYS = [4, 5]  # Fri-Sat for Dubai
+SEASONS = ['Shoulder', 'Summer_Moderate', 'Winter_Peak']
+
+# Season per month (index 0 unused):
+# Winter_Peak (Nov-Mar), Summer_Moderate (Jun-Aug), Shoulder (Apr-May, Sep-Oct)
+SEASON_BY_MONTH = np.array([
+    None,
+    'Winter_Peak', 'Winter_Peak', 'Winter_Peak', 'Shoulder', 'Shoulder', 'Summer_Moderate',
+    'Summer_Moderate', 'Summer_Moderate', 'Shoulder', 'Shoulder', 'Winter_Peak', 'Winter_Peak',
+], dtype=object)
+
+# End of the training history. The Stage 1 model and every H1 2025 baseline
+# read the master up to here only, so drops ingested later (Q3 shock, Q4)
+# are never mistaken for history
+H1_START = pd.Timestamp('2025-01-01')
+TRAIN_END = pd.Timestamp('2025-06-30')
+
+# Columns stage1_pipeline.py adds to the master table, in order
+MASTER_CALENDAR_COLUMNS = ['Year', 'Month', 'DayOfWeek', 'IsWeekend', 'Quarter', 'Season', 'YearMonth']
+
+
+def dubai_season(months):
+    """Vectorized Dubai season label for an array of month numbers (1-12)."""
+    return SEASON_BY_MONTH[np.asarray(months, dtype=np.int64)]
+
+
+def date_key(dates):
+    """Integer day number (days since 1970-01-01) for datetimes."""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def build_date_dimension(start, end):
+    """Date dimension table with one row per day from `start` to `end` inclusive."""
+    dates = pd.date_range(start, end, freq='D')
+    iso = dates.isocalendar()
+    date_dim = pd.DataFrame({
+        'Date': dates,
+        'Date_Key': date_key(dates),
+        'Year': dates.year,
+        'Month': dates.month,
+        'DayOfWeek': dates.dayofweek,  # 0=Mon, 6=Sun
+        'IsWeekend': np.isin(dates.dayofweek, WEEKEND_DAYS).astype(int),
+        'Quarter': dates.quarter,
+        'ISO_Year': iso['year'].to_numpy(),
+        'ISO_Week': iso['week'].to_numpy(),
+        'Season': pd.Categorical(dubai_season(dates.month), categories=SEASONS),
+        'YearMonth': dates.to_period('M'),
+    })
+    return apply_schema(date_dim, DATE_DIM_SCHEMA)
+
+
+def add_calendar_features(df, date_dim, columns=MASTER_CALENDAR_COLUMNS):
+    """Attach calendar `columns` to `df` by day lookup on its Date column."""
+    calendar_idx = DimensionIndex('Calendar', date_dim, ['Date'], columns)
+    enriched, report = enrich(df, [calendar_idx])
+    unmatched = report.loc['Calendar', 'Unmatched']
+    if unmatched:
+        raise ValueError(f"{unmatched} rows fall outside the date dimension "
+                         f"({date_dim['Date'].min().date()} to {date_dim['Date'].max().date()})")
+    return enriched
@@ -0,0 +1,442 @@
+"""
+DECODE X 2026 - Vectorized Demand Forecast Engine
+=================================================
+The Stage 1 decomposition (growth trend x monthly seasonality x day-of-week,
+plus a damped congestion adjustment), computed for every series at once.
+
+  params = fit_components(daily_route, labels=['Route_Code', 'Route_Type'])
+  forecast_df = project(params, horizon)
+
+Forecaster wraps the pair with a persisted parameter table, so later
+stages generate any horizon from the stored components without the
+history or a refit:
+
+  Forecaster(labels=['Route_Code', 'Route_Type']).fit(daily_route).save(DATA_DIR)
+  q4_df = Forecaster.load(DATA_DIR).predict('2025-10-01', '2025-12-31')
+
+Forecast quantiles come from a residual bootstrap: the in-sample
+residuals of each series (actual minus the model on its history days)
+are resampled with replacement onto every forecast day with a fixed
+seed, and Forecast_P10/P50/P90/P95 are read off the paths
+(predict(..., quantiles=True)). Weekly and monthly totals resample whole
+runs of consecutive residuals (a circular block per period), so
+autocorrelated errors widen the period bands as they should. Paths are
+drawn a block of series at a time and only their quantiles are kept.
+
+Any horizon and cadence comes from the same parameters: predict(start,
+end, freq='D' | 'W' | 'M') evaluates the daily grid and sums it per ISO
+week or month, and horizon_tag() names the artifact (forecast_h2_2025,
+forecast_2026_2027_monthly, ...).
+
+fit_components() reduces a daily history to one row of parameters per
+series with grouped sums (np.bincount over series codes, no per-series
+loop; the trend and congestion lines use common/regression.py).
+project() evaluates those parameters on a (series x horizon day) grid
+with array indexing and flattens the grid into the forecast frame.
+A series is any key: Route_ID for the Stage 1 forecast, or
+[Route_ID, Stop_ID] for stop-level series.
+
+Components per series (same definitions as the original per-route loop):
+  - Trend: least-squares line through the monthly mean demand, months
+    numbered 0..n-1 in the order they appear in the history
+  - Seasonal: mean detrended demand per calendar month / overall mean
+  - DOW: mean detrended demand per weekday / mean of the weekday means
+  - Congestion: slope of mean demand against congestion level, applied
+    (damped) to the month's historical congestion vs the overall mean
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.dates import build_date_dimension
+from common.regression import ols_by_code
+from common.store import load_table, save_table, table_metadata, table_path
+
+FORECAST_PARAMS_NAME = 'forecast_params'
+STOP_FORECAST_PARAMS_NAME = 'forecast_params_stops'
+RESIDUALS_SUFFIX = '_residuals'   # Forecaster residual table: <params name>_residuals
+SERIES_KEYS = ['Route_ID']
+
+# Horizon calendar columns carried into the forecast frame (from the date dimension)
+FORECAST_CALENDAR_COLUMNS = ['Month', 'DayOfWeek', 'IsWeekend', 'Season']
+
+# Forecast cadences: date-dimension columns identifying a period, and the
+# calendar columns a period row carries (taken from its first day)
+FORECAST_FREQUENCIES = {
+    'D': {'period': ['Date'], 'calendar': FORECAST_CALENDAR_COLUMNS},
+    'W': {'period': ['ISO_Year', 'ISO_Week'], 'calendar': ['ISO_Year', 'ISO_Week', 'Month', 'Season']},
+    'M': {'period': ['YearMonth'], 'calendar': ['Year', 'Quarter', 'Month', 'Season']},
+}
+FREQUENCY_TAGS = {'D': '', 'W': '_weekly', 'M': '_monthly'}
+
+DEFAULT_CONGESTION = 3     # expected congestion for a month with no history
+CONGESTION_DAMPING = 0.3   # share of the congestion elasticity applied
+
+# Residual bootstrap for the forecast quantiles
+FORECAST_QUANTILES = {'P10': 0.10, 'P50': 0.50, 'P90': 0.90, 'P95': 0.95}
+FORECAST_DRAWS = 1000
+FORECAST_SEED = 42
+BOOTSTRAP_BLOCK_CELLS = 1 << 22   # series x day x draw cells drawn per block
+
+SEASONAL_COLUMNS = [f'Seasonal_{month}' for month in range(1, 13)]
+DOW_COLUMNS = [f'DOW_{day}' for day in range(7)]
+CONGESTION_COLUMNS = [f'Expected_Congestion_{month}' for month in range(1, 13)]
+COMPONENT_COLUMNS = (['Slope', 'Intercept', 'Trend_R2', 'Slope_SE', 'Growth_Rate', 'Base_Value',
+                      'Last_Date', 'Mean_Congestion', 'Cong_Slope']
+                     + SEASONAL_COLUMNS + DOW_COLUMNS + CONGESTION_COLUMNS)
+
+
+def _group_means(codes, n_groups, n_cells, cell, values):
+    """(n_groups x n_cells) means of `values` per (group, cell); NaN where empty."""
+    flat = codes * n_cells + cell
+    sums = np.bincount(flat, weights=values, minlength=n_groups * n_cells)
+    counts = np.bincount(flat, minlength=n_groups * n_cells)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts).reshape(n_groups, n_cells)
+
+
+def monthly_means(history, codes, value='Total_Pax'):
+    """Mean `value` per (series code, month), indexed by (code, year * 12 + month)."""
+    dates = history['Date']
+    period = (dates.dt.year * 12 + dates.dt.month).to_numpy()
+    return pd.Series(history[value].to_numpy(dtype='float64')).groupby([codes, period]).mean()
+
+
+def fit_components(history, keys=SERIES_KEYS, labels=(), value='Total_Pax', trend=None):
+    """Per-series decomposition parameters, indexed by `keys`.
+
+    `history` holds one row per series and day with Date, Month, DayOfWeek,
+    Congestion_Level and `value`; `labels` are carried through (first value
+    per series). Series are sorted by key. `trend` (a regression frame
+    indexed by series key, N = months) replaces the trend fit; the backtest
+    passes fits taken from prefix sums.
+    """
+    keys, labels = list(keys), list(labels)
+    series = history.groupby(keys, sort=True, observed=True)
+    codes = series.ngroup().to_numpy()
+    n_series = series.ngroups
+
+    params = series[labels].first() if labels else pd.DataFrame(index=series.size().index)
+    dates = history['Date']
+    y = history[value].to_numpy(dtype='float64')
+    month = history['Month'].to_numpy(dtype='int64')
+    congestion = history['Congestion_Level'].to_numpy(dtype='float64')
+
+    # ----- Trend: line through the monthly means -----
+    if trend is None:
+        monthly = monthly_means(history, codes, value)
+        trend = ols_by_code(monthly.index.get_level_values(0).to_numpy(),
+                            monthly.groupby(level=0).cumcount().to_numpy(dtype='float64'),
+                            monthly.to_numpy(), n_series)
+    else:
+        trend = trend.reindex(params.index)
+    slope, intercept = trend['Slope'].to_numpy(), trend['Intercept'].to_numpy()
+    n_months, mean_monthly = trend['N'].to_numpy(), trend['Mean_Y'].to_numpy()
+    growth = np.divide(slope, mean_monthly, out=np.zeros(n_series), where=mean_monthly > 0)
+
+    rows = np.bincount(codes, minlength=n_series)
+    first_date = series['Date'].transform('min')
+    days = (dates - first_date).dt.days.to_numpy()
+    detrended = y / (1 + growth[codes] * (days / 30))
+    overall = np.bincount(codes, weights=detrended, minlength=n_series) / rows
+
+    # ----- Seasonal and day-of-week multipliers -----
+    seasonal = _group_means(codes, n_series, 12, month - 1, detrended) / overall[:, None]
+    dow_avg = _group_means(codes, n_series, 7, history['DayOfWeek'].to_numpy(dtype='int64'), detrended)
+    dow = dow_avg / np.nanmean(dow_avg, axis=1, keepdims=True)
+
+    # ----- Congestion elasticity: line through mean demand per congestion level -----
+    level = pd.Series(y).groupby([codes, congestion]).mean()
+    cong = ols_by_code(level.index.get_level_values(0).to_numpy(),
+                       level.index.get_level_values(1).to_numpy(dtype='float64'),
+                       level.to_numpy(), n_series)
+    expected = _group_means(codes, n_series, 12, month - 1, congestion)
+
+    params['Slope'] = slope
+    params['Intercept'] = intercept
+    params['Trend_R2'] = trend['R2'].to_numpy()
+    params['Slope_SE'] = trend['Slope_SE'].to_numpy()
+    params['Growth_Rate'] = growth
+    # Trend value at the last known month, the origin of the projection
+    params['Base_Value'] = intercept + slope * (n_months - 1)
+    params['Last_Date'] = series['Date'].max()
+    params['Mean_Congestion'] = np.bincount(codes, weights=congestion, minlength=n_series) / rows
+    params['Cong_Slope'] = cong['Slope'].to_numpy()
+    params[SEASONAL_COLUMNS] = np.nan_to_num(seasonal, nan=1.0)
+    params[DOW_COLUMNS] = np.nan_to_num(dow, nan=1.0)
+    params[CONGESTION_COLUMNS] = np.nan_to_num(expected, nan=DEFAULT_CONGESTION)
+    return params
+
+
+def _evaluate(params, dates):
+    """Components of every series on `dates`: (trend, seasonal, dow, expected, forecast), each (series x day)."""
+    last = pd.DatetimeIndex(params['Last_Date'])
+
+    # Months ahead of each series' last known month: (series x day)
+    months_ahead = ((dates.year * 12 + dates.month).to_numpy()[None, :]
+                    - (last.year * 12 + last.month).to_numpy()[:, None])
+    trend = params['Base_Value'].to_numpy()[:, None] + params['Slope'].to_numpy()[:, None] * months_ahead
+
+    month_idx = dates.month.to_numpy() - 1
+    seasonal = params[SEASONAL_COLUMNS].to_numpy()[:, month_idx]
+    dow = params[DOW_COLUMNS].to_numpy()[:, dates.dayofweek.to_numpy()]
+    expected = params[CONGESTION_COLUMNS].to_numpy()[:, month_idx]
+
+    forecast = trend * seasonal * dow
+    mean_congestion = params['Mean_Congestion'].to_numpy()[:, None]
+    cong_adjustment = params['Cong_Slope'].to_numpy()[:, None] * (expected - mean_congestion)
+    forecast = forecast + cong_adjustment * CONGESTION_DAMPING
+    return trend, seasonal, dow, expected, forecast
+
+
+def residuals(params, history, value='Total_Pax'):
+    """In-sample residuals (actual - model) of every history row whose series is in `params`.
+
+    The model value of a history day is the projection of the fitted
+    components back onto that day, so the residuals carry the same
+    approximations as a forecast. Returns the history's key columns, Date
+    and Residual.
+    """
+    keys = list(params.index.names)
+    dates = pd.DatetimeIndex(np.unique(history['Date']))
+    fitted = _evaluate(params, dates)[-1]
+    if len(keys) == 1:
+        rows = params.index.get_indexer(history[keys[0]])
+    else:
+        rows = params.index.get_indexer(pd.MultiIndex.from_frame(history[keys]))
+    known = rows >= 0
+    cols = dates.get_indexer(history['Date'])
+    out = history.loc[known, keys + ['Date']].reset_index(drop=True)
+    out['Residual'] = history[value].to_numpy(dtype='float64')[known] - fitted[rows[known], cols[known]]
+    return out
+
+
+def bootstrap_quantiles(params, forecast, residual_df, draws=FORECAST_DRAWS, seed=FORECAST_SEED,
+                        quantiles=FORECAST_QUANTILES, period_starts=None):
+    """Quantiles of forecast + resampled residuals: {name: (series x day) array}.
+
+    `forecast` is the (series x day) model value of every series in
+    `params`; `residual_df` is a residuals() frame. Each daily path adds a
+    residual drawn (with replacement) from the same series' history to
+    every day. With `period_starts` (first day position of each period)
+    the quantiles are of each path's period totals, (series x period):
+    a period of L days adds the sum of L consecutive history residuals
+    from a random start, wrapping around the series' history (circular
+    block bootstrap), so correlated daily errors do not cancel as
+    independent draws would. A series without residuals keeps its point
+    forecast. Series are drawn in blocks of at most BOOTSTRAP_BLOCK_CELLS
+    paths x days.
+    """
+    keys = list(params.index.names)
+    n_series, n_days = forecast.shape
+    if len(keys) == 1:
+        rows = params.index.get_indexer(residual_df[keys[0]])
+    else:
+        rows = params.index.get_indexer(pd.MultiIndex.from_frame(residual_df[keys]))
+    known = rows >= 0
+    rows = rows[known]
+    values = residual_df['Residual'].to_numpy(dtype='float64')[known]
+    # Residual pool sorted by series (then date): series s owns pool[offsets[s]:offsets[s] + counts[s]];
+    # a series without residuals gets a single 0
+    if 'Date' in residual_df.columns:
+        order = np.lexsort((residual_df['Date'].to_numpy()[known], rows))
+    else:
+        order = np.argsort(rows, kind='stable')
+    counts = np.bincount(rows, minlength=n_series)
+    sizes = np.maximum(counts, 1)
+    offsets = np.cumsum(sizes) - sizes
+    pool = np.zeros(sizes.sum())
+    pool[np.repeat(offsets, counts) + np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)] = \
+        values[order]
+
+    if period_starts is None:
+        lengths = None
+    else:
+        lengths = np.diff(np.append(period_starts, n_days))
+        # Each series' pool twice over, as a running sum: a circular run of m < size residuals
+        # starting at k sums to cum[2 * offsets + k + m] - cum[2 * offsets + k]
+        doubled = np.repeat(offsets, 2 * sizes) + np.arange(2 * sizes.sum()) - np.repeat(2 * offsets, 2 * sizes)
+        doubled = np.where(doubled >= np.repeat(offsets + sizes, 2 * sizes), doubled - np.repeat(sizes, 2 * sizes),
+                           doubled)
+        cumulative = np.concatenate([[0.0], np.cumsum(pool[doubled])])
+        totals = np.add.reduceat(pool, offsets)
+        base = np.add.reduceat(forecast, period_starts, axis=1)
+
+    rng = np.random.default_rng(seed)
+    n_cols = n_days if lengths is None else len(lengths)
+    levels = np.empty((len(quantiles), n_series, n_cols))
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // (n_cols * draws))
+    for lo in range(0, n_series, block):
+        hi = min(lo + block, n_series)
+        size = sizes[lo:hi, None, None]
+        starts = (rng.random((hi - lo, n_cols, draws)) * size).astype('int64')
+        if lengths is None:
+            paths = forecast[lo:hi, :, None] + pool[offsets[lo:hi, None, None] + starts]
+        else:
+            run = lengths[None, :, None] % size
+            first = 2 * offsets[lo:hi, None, None] + starts
+            paths = (base[lo:hi, :, None] + (lengths[None, :, None] // size) * totals[lo:hi, None, None]
+                     + cumulative[first + run] - cumulative[first])
+        levels[:, lo:hi] = np.quantile(paths, list(quantiles.values()), axis=2)
+    return dict(zip(quantiles, levels))
+
+
+def period_starts(horizon, freq):
+    """Positions of the first day of each `freq` period in a date-ordered horizon."""
+    if freq not in FORECAST_FREQUENCIES:
+        raise ValueError(f"Unknown forecast frequency {freq!r}; expected one of {list(FORECAST_FREQUENCIES)}")
+    codes = horizon.groupby(FORECAST_FREQUENCIES[freq]['period'], sort=False, observed=True).ngroup().to_numpy()
+    return np.flatnonzero(np.diff(codes, prepend=-1))
+
+
+def project(params, horizon, value='Total_Pax', calendar=None,
+            residual_df=None, draws=FORECAST_DRAWS, seed=FORECAST_SEED, freq='D'):
+    """Forecast frame for every series in `params` over the `horizon` dates.
+
+    `horizon` is a date-dimension slice (Date plus the period and
+    `calendar` columns; calendar defaults to the frequency's). Rows are
+    ordered series by series, then by date. With a residuals() frame,
+    bootstrap quantile columns (Forecast_P10 ...) follow the point
+    forecast.
+
+    freq 'W' (ISO week) or 'M' (month) returns one row per series and
+    period instead: Date is the period's first day in the horizon, Days
+    its day count, the forecast and quantiles are period totals and the
+    components are period means.
+    """
+    calendar = FORECAST_FREQUENCIES[freq]['calendar'] if calendar is None else calendar
+    dates = pd.DatetimeIndex(horizon['Date'])
+    trend, seasonal, dow, expected, forecast = _evaluate(params, dates)
+    point = np.maximum(0, np.round(forecast)).astype('int64')
+
+    starts = None if freq == 'D' else period_starts(horizon, freq)
+    if starts is None:
+        days = None
+        first_days = np.arange(len(dates))
+    else:
+        days = np.diff(np.append(starts, len(dates)))
+        first_days = starts
+        point = np.add.reduceat(point, starts, axis=1)
+        trend, seasonal, dow, expected = (np.add.reduceat(component, starts, axis=1) / days
+                                          for component in (trend, seasonal, dow, expected))
+    n_series, n_rows = len(params), len(first_days)
+
+    out = {'Date': np.tile(dates.to_numpy()[first_days], n_series)}
+    index = params.index.to_frame(index=False)
+    for col in index.columns:
+        out[col] = np.repeat(index[col].to_numpy(), n_rows)
+    for col in [col for col in params.columns if col not in COMPONENT_COLUMNS]:  # labels
+        out[col] = np.repeat(params[col].to_numpy(), n_rows)
+    if days is not None:
+        out['Days'] = np.tile(days, n_series)
+    out[f'Forecast_{value}'] = point.ravel()
+    if residual_df is not None:
+        levels = bootstrap_quantiles(params, forecast, residual_df, draws, seed, period_starts=starts)
+        for name, level in levels.items():
+            out[f'Forecast_{name}'] = np.maximum(0, np.round(level)).astype('int64').ravel()
+    out['Trend_Component'] = np.round(trend).astype('int64').ravel()
+    out['Seasonal_Multiplier'] = np.round(seasonal, 3).ravel()
+    out['DOW_Multiplier'] = np.round(dow, 3).ravel()
+    out['Expected_Congestion'] = np.round(expected, 1).ravel()
+    for col in calendar:
+        out[col] = np.tile(horizon[col].to_numpy()[first_days], n_series)
+    return pd.DataFrame(out)
+
+
+def horizon_tag(start, end, freq='D'):
+    """Artifact tag of a forecast horizon: 'h2_2025', 'q4_2025', '2026_2027_monthly', ...
+
+    Whole quarters, halves and years get their calendar name; any other
+    range is tagged by its first and last day.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    whole = start == start.to_period('M').start_time and end == end.to_period('M').end_time.normalize()
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if whole and start.month == 1 and end.month == 12:
+        tag = str(start.year) if start.year == end.year else f'{start.year}_{end.year}'
+    elif whole and months == 6 and start.month in (1, 7):
+        tag = f'h{start.month // 6 + 1}_{start.year}'
+    elif whole and months == 3 and start.month % 3 == 1:
+        tag = f'q{start.month // 3 + 1}_{start.year}'
+    else:
+        tag = f'{start:%Y%m%d}_{end:%Y%m%d}'
+    return tag + FREQUENCY_TAGS[freq]
+
+
+def reconcile_to_totals(child_df, parent_df, keys, value='Forecast_Total_Pax'):
+    """Integer child forecasts that sum exactly to the parent's `value` per `keys`.
+
+    Each child keeps its share of its group's model total (equal shares if
+    that total is 0); shares of the parent value are rounded by largest
+    remainder. Returns a Series aligned with child_df.
+    """
+    codes = child_df.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    target = (child_df[keys].merge(parent_df[keys + [value]], on=keys, how='left')[value]
+              .fillna(0).to_numpy(dtype='float64'))
+    raw = child_df[value].to_numpy(dtype='float64')
+
+    totals = np.bincount(codes, weights=raw)[codes]
+    counts = np.bincount(codes)[codes]
+    share = np.where(totals > 0, raw / np.where(totals > 0, totals, 1), 1 / counts)
+    exact = share * target
+    floor = np.floor(exact)
+    # Units left after flooring go to the largest remainders of each group
+    short = np.rint(target - np.bincount(codes, weights=floor)[codes])
+    rank = pd.Series(exact - floor).groupby(codes).rank(method='first', ascending=False).to_numpy() - 1
+    return pd.Series((floor + (rank < short)).astype('int64'), index=child_df.index, name=value)
+
+
+class Forecaster:
+    """Per-series decomposition fitted once, projected over any horizon."""
+
+    def __init__(self, keys=SERIES_KEYS, labels=(), value='Total_Pax'):
+        self.keys = list(keys)
+        self.labels = list(labels)
+        self.value = value
+        self.params = None
+        self.residuals = None
+
+    def fit(self, history):
+        """Fit every series in `history` (see fit_components) and keep its residuals. Returns self."""
+        self.params = fit_components(history, self.keys, self.labels, self.value)
+        self.residuals = residuals(self.params, history, self.value)
+        return self
+
+    def predict(self, start, end, date_dim=None, quantiles=False, draws=FORECAST_DRAWS, seed=FORECAST_SEED,
+                freq='D'):
+        """Forecast frame for start..end (inclusive), daily or per week / month (freq 'W' / 'M').
+
+        Calendar columns come from `date_dim` if it covers the range,
+        otherwise from a date dimension built for the range. quantiles=True
+        adds the residual-bootstrap columns Forecast_P10/P50/P90/P95.
+        """
+        if self.params is None:
+            raise ValueError("Forecaster has no parameters; fit() or load() it first")
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if date_dim is None or date_dim['Date'].min() > start or date_dim['Date'].max() < end:
+            horizon = build_date_dimension(start, end)
+        else:
+            horizon = date_dim[(date_dim['Date'] >= start) & (date_dim['Date'] <= end)]
+        if quantiles and self.residuals is None:
+            raise ValueError("Forecaster has no residuals; fit() it or load() one saved after fit()")
+        return project(self.params, horizon, self.value,
+                       residual_df=self.residuals if quantiles else None, draws=draws, seed=seed, freq=freq)
+
+    def save(self, data_dir, name=FORECAST_PARAMS_NAME):
+        """Write the parameter table (one row per series) and the residuals. Returns the parameter path."""
+        if self.residuals is not None:
+            save_table(self.residuals, data_dir, f'{name}{RESIDUALS_SUFFIX}')
+        return save_table(self.params.reset_index(), data_dir, name,
+                          metadata={'keys': self.keys, 'labels': self.labels, 'value': self.value})
+
+    @classmethod
+    def load(cls, data_dir, name=FORECAST_PARAMS_NAME):
+        """Forecaster with the parameters saved under `name` in `data_dir`."""
+        metadata = table_metadata(table_path(data_dir, name))
+        model = cls(metadata['keys'], metadata['labels'], metadata['value'])
+        model.params = load_table(data_dir, name).set_index(model.keys)
+        if os.path.exists(table_path(data_dir, f'{name}{RESIDUALS_SUFFIX}')):
+            model.residuals = load_table(data_dir, f'{name}{RESIDUALS_SUFFIX}')
+        return model
@@ -0,0 +1,222 @@
+"""
+DECODE X 2026 - Stop Geometry
+=============================
+Great-circle geometry of the stop network: a KD-tree over the stops for
+radius and nearest-neighbour queries, and the haversine length of every
+consecutive stop pair of Route_Stop_Mapping.csv, so passenger-km, segment
+density and catchment overlap are array lookups.
+
+  index = ctx.stop_index()
+  index.nearest(25.20, 55.27, k=3)       # (km, Stop_IDs) of the 3 closest stops
+  index.within(25.20, 55.27, 1.0)        # Stop_IDs within 1 km
+  segments = ctx.segment_lengths()       # Route_ID, From_Seq, To_Seq, ..., Segment_km
+  km = segment_array(segments, profile.route_ids, n_seq - 1)
+  distance = trip_distances(km)          # (route x origin x destination) on-route km
+
+The tree splits the stops' unit vectors on the sphere (x, y, z), so the
+straight-line (chord) distance it prunes on is monotone in the
+great-circle distance:
+
+  chord = 2 sin(d / 2R)        d = 2R asin(chord / 2)
+
+Nodes are flat arrays (index range, bounding box, children) built by
+median splits on the widest axis; a query walks them with an explicit
+stack (radius) or a bound-ordered heap (nearest), testing only the leaves
+whose box is within reach.
+
+DataContext.segment_lengths() caches the segment table in
+<data_dir>/.cache, keyed by the content of the stops and mapping files.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+LEAF_SIZE = 8
+CATCHMENT_RADIUS_KM = 1.0
+SEGMENT_LENGTHS_NAME = 'segment_lengths'
+SEGMENT_COLUMNS = ['Route_ID', 'From_Seq', 'To_Seq', 'From_Stop_ID', 'To_Stop_ID', 'Segment_km']
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between broadcastable arrays of degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(np.asarray(lat, dtype='float64')), np.radians(np.asarray(lon, dtype='float64'))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _chord(km):
+    return 2 * np.sin(np.minimum(np.asarray(km, dtype='float64') / (2 * EARTH_RADIUS_KM), np.pi / 2))
+
+
+def _arc_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+class StopIndex:
+    """KD-tree over stop coordinates with radius and k-nearest queries in km."""
+
+    def __init__(self, stop_ids, latitude, longitude, leaf_size=LEAF_SIZE):
+        self.stop_ids = np.asarray(stop_ids)
+        self.points = _unit_vectors(latitude, longitude)
+        self.order = np.arange(len(self.stop_ids))
+        start, end, left, right, low, high = [], [], [], [], [], []
+
+        def build(lo, hi):
+            node = len(start)
+            block = self.points[self.order[lo:hi]]
+            start.append(lo), end.append(hi), left.append(-1), right.append(-1)
+            low.append(block.min(axis=0)), high.append(block.max(axis=0))
+            if hi - lo > leaf_size:
+                axis = (high[node] - low[node]).argmax()
+                mid = (lo + hi) // 2
+                self.order[lo:hi] = self.order[lo:hi][np.argpartition(block[:, axis], mid - lo)]
+                left[node] = build(lo, mid)
+                right[node] = build(mid, hi)
+            return node
+
+        if len(self.stop_ids):
+            build(0, len(self.stop_ids))
+        self.start, self.end = np.array(start, dtype='int64'), np.array(end, dtype='int64')
+        self.left, self.right = np.array(left, dtype='int64'), np.array(right, dtype='int64')
+        self.low, self.high = np.array(low).reshape(-1, 3), np.array(high).reshape(-1, 3)
+
+    @classmethod
+    def from_stops(cls, stops_df, leaf_size=LEAF_SIZE):
+        """Index of a Bus_Stops frame (Stop_ID, Latitude, Longitude)."""
+        return cls(stops_df['Stop_ID'].to_numpy(), stops_df['Latitude'].to_numpy(),
+                   stops_df['Longitude'].to_numpy(), leaf_size)
+
+    def _box_chord(self, point, node):
+        gap = np.maximum(self.low[node] - point, 0) + np.maximum(point - self.high[node], 0)
+        return np.sqrt(gap @ gap)
+
+    def _leaf(self, point, node):
+        members = self.order[self.start[node]:self.end[node]]
+        return members, np.linalg.norm(self.points[members] - point, axis=1)
+
+    def _within(self, point, chord):
+        found, stack = [], [0] if len(self.stop_ids) else []
+        while stack:
+            node = stack.pop()
+            if self._box_chord(point, node) > chord:
+                continue
+            if self.left[node] < 0:
+                members, distance = self._leaf(point, node)
+                found.append(members[distance <= chord])
+            else:
+                stack.extend((self.left[node], self.right[node]))
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype='int64')
+
+    def _nearest(self, point, k):
+        best_chord, best = np.full(k, np.inf), np.full(k, -1, dtype='int64')
+        heap = [(0.0, 0)] if len(self.stop_ids) else []
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if bound > best_chord[-1]:
+                break
+            if self.left[node] < 0:
+                members, distance = self._leaf(point, node)
+                chords, candidates = np.concatenate([best_chord, distance]), np.concatenate([best, members])
+                keep = np.argsort(chords, kind='stable')[:k]
+                best_chord, best = chords[keep], candidates[keep]
+            else:
+                for child in (self.left[node], self.right[node]):
+                    heapq.heappush(heap, (self._box_chord(point, child), child))
+        return best_chord, best
+
+    def within(self, latitude, longitude, radius_km):
+        """Stop_IDs within `radius_km` of a point, or a list of them per point for arrays."""
+        points = _unit_vectors(np.atleast_1d(latitude), np.atleast_1d(longitude))
+        found = [self.stop_ids[self._within(point, _chord(radius_km))] for point in points]
+        return found[0] if np.ndim(latitude) == 0 else found
+
+    def nearest(self, latitude, longitude, k=1):
+        """(distance_km, Stop_IDs) of the `k` closest stops, shape (k,) or (points, k) for arrays.
+
+        Missing neighbours (k above the stop count) are inf / -1.
+        """
+        points = _unit_vectors(np.atleast_1d(latitude), np.atleast_1d(longitude))
+        chords, found = zip(*(self._nearest(point, k) for point in points)) if len(points) else ((), ())
+        chords = np.array(chords).reshape(len(points), k)
+        distance = np.where(np.isfinite(chords), _arc_km(chords), np.inf)
+        found = np.array(found, dtype='int64').reshape(len(points), k)
+        stop_ids = (np.where(found >= 0, self.stop_ids[np.maximum(found, 0)], -1) if len(self.stop_ids)
+                    else np.full(found.shape, -1, dtype='int64'))
+        return (distance[0], stop_ids[0]) if np.ndim(latitude) == 0 else (distance, stop_ids)
+
+    def pairs_within(self, radius_km):
+        """Every ordered pair of distinct stops within `radius_km`: Stop_ID, Neighbour_ID, Distance_km."""
+        chord = _chord(radius_km)
+        matches = [self._within(point, chord) for point in self.points]
+        i = np.repeat(np.arange(len(self.points)), [len(m) for m in matches])
+        j = np.concatenate(matches) if matches else np.empty(0, dtype='int64')
+        distinct = i != j
+        i, j = i[distinct], j[distinct]
+        return pd.DataFrame({
+            'Stop_ID': self.stop_ids[i],
+            'Neighbour_ID': self.stop_ids[j],
+            'Distance_km': _arc_km(np.linalg.norm(self.points[i] - self.points[j], axis=1)),
+        })
+
+
+def segment_lengths(mapping_df, stops_df):
+    """Haversine length of every consecutive stop pair of each route (SEGMENT_COLUMNS)."""
+    mapping = mapping_df.sort_values(['Route_ID', 'Stop_Sequence'])
+    coords = stops_df.set_index('Stop_ID')[['Latitude', 'Longitude']].reindex(mapping['Stop_ID'])
+    route = mapping['Route_ID'].to_numpy()
+    seq, stop = mapping['Stop_Sequence'].to_numpy(), mapping['Stop_ID'].to_numpy()
+    lat, lon = coords['Latitude'].to_numpy(), coords['Longitude'].to_numpy()
+    link = route[1:] == route[:-1]
+    return pd.DataFrame({
+        'Route_ID': route[1:][link],
+        'From_Seq': seq[:-1][link],
+        'To_Seq': seq[1:][link],
+        'From_Stop_ID': stop[:-1][link],
+        'To_Stop_ID': stop[1:][link],
+        'Segment_km': haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:])[link],
+    }, columns=SEGMENT_COLUMNS)
+
+
+def segment_array(segments_df, route_ids, n_segments):
+    """(route x segment) km aligned with `route_ids`; segment s joins sequences s+1 and s+2, zero past a route's end."""
+    km = np.zeros((len(route_ids), n_segments))
+    rows = pd.Index(route_ids).get_indexer(segments_df['Route_ID'])
+    cols = segments_df['From_Seq'].to_numpy() - 1
+    keep = (rows >= 0) & (cols < n_segments)
+    km[rows[keep], cols[keep]] = segments_df['Segment_km'].to_numpy()[keep]
+    return km
+
+
+def trip_distances(segment_km):
+    """(..., S, S) on-route km between stop sequences from (..., S - 1) segment lengths."""
+    position = np.concatenate([np.zeros(segment_km.shape[:-1] + (1,)), np.cumsum(segment_km, axis=-1)], axis=-1)
+    return np.abs(position[..., None, :] - position[..., :, None])
+
+
+def catchment_overlap(index, mapping_df, radius_km=CATCHMENT_RADIUS_KM):
+    """Share of each route's stops within `radius_km` of another route's stops.
+
+    Returns a route x route frame (index and columns Route_ID); row a,
+    column b is the share of route a's stops that have a stop of route b
+    within the radius (shared stops count, the diagonal is 1).
+    """
+    route_ids = np.unique(mapping_df['Route_ID'])
+    stop_pos = pd.Index(index.stop_ids)
+    serves = np.zeros((len(route_ids), len(stop_pos)))
+    serves[np.searchsorted(route_ids, mapping_df['Route_ID']), stop_pos.get_indexer(mapping_df['Stop_ID'])] = 1
+    near = np.eye(len(stop_pos))
+    pairs = index.pairs_within(radius_km)
+    near[stop_pos.get_indexer(pairs['Stop_ID']), stop_pos.get_indexer(pairs['Neighbour_ID'])] = 1
+    # Stops within reach of each route, then the overlap with every route's own stops
+    reach = (serves @ near) > 0
+    overlap = (serves @ reach.T) / serves.sum(axis=1, keepdims=True)
+    labels = pd.Index(route_ids, name='Route_ID')
+    return pd.DataFrame(overlap, index=labels, columns=labels)
@@ -0,0 +1,169 @@
+"""
+DECODE X 2026 - Forecast Hierarchy & Reconciliation
+===================================================
+The levels the stages report demand at - network, route type, zone,
+route and route-stop pair - as one summing matrix, and a reconciliation
+that makes forecasts at all levels add up in one linear-algebra pass.
+
+  hierarchy = Hierarchy(ctx.mapping(), ctx.routes(), ctx.stops())
+  base = hierarchy.matrix(base_forecasts, dates)         # (node x day), NaN = no forecast
+  bottom = hierarchy.reconcile(base, fixed_levels=['Route'])
+  coherent = hierarchy.aggregate(bottom)                 # every node, every day
+
+The bottom series are the mapped (Route_ID, Stop_ID) pairs. Every other
+node is a sum of bottom series, so all node values are y = S b with S the
+(node x bottom) summing matrix. S is kept sparse as coordinate arrays
+(one 1 per node a bottom series belongs to); route types and routes nest,
+zones cut across routes, and each level partitions the bottom series.
+
+reconcile() is the weighted least-squares (MinT-diagonal) projection of
+the base forecasts onto coherent values:
+
+  b = argmin (S b - y)' W (S b - y)   subject to  S_f b = y_f
+
+with structural weights W = 1 / (bottom series in the node), nodes
+without a base forecast weighted 0, and S_f the rows of the levels held
+fixed (e.g. the published route forecast). All days are solved at once
+as right-hand sides of one KKT system. When absent base forecasts leave
+some bottom series indistinguishable the system is rank-deficient and
+the minimum-norm least-squares solution splits their total evenly.
+"""
+
+import numpy as np
+import pandas as pd
+
+FORECAST_HIERARCHY_NAME = 'forecast_hierarchy_h2_2025'
+HIERARCHY_LEVELS = ['Network', 'Route_Type', 'Zone', 'Route', 'Stop']
+NETWORK_NODE = 'Network'
+
+
+class Hierarchy:
+    """Summing structure of the mapped route-stop pairs over HIERARCHY_LEVELS."""
+
+    def __init__(self, mapping_df, routes_df, stops_df):
+        bottom = (mapping_df[['Route_ID', 'Stop_ID']].drop_duplicates()
+                  .merge(routes_df[['Route_ID', 'Route_Code', 'Route_Type']], on='Route_ID')
+                  .merge(stops_df[['Stop_ID', 'Zone']], on='Stop_ID')
+                  .sort_values(['Route_ID', 'Stop_ID'])
+                  .reset_index(drop=True))
+        # Node label of every bottom series at every level
+        bottom['Network'] = NETWORK_NODE
+        bottom['Route'] = bottom['Route_Code'].astype(str)
+        bottom['Stop'] = bottom['Route'] + '/' + bottom['Stop_ID'].astype(str)
+        self.bottom = bottom
+
+        nodes, rows, self.codes = [], [], {}
+        for level in HIERARCHY_LEVELS:
+            codes, labels = pd.factorize(bottom[level].astype(str), sort=True)
+            self.codes[level] = codes
+            rows.append(len(nodes) + codes)
+            nodes.extend((level, label) for label in labels)
+        self.nodes = pd.DataFrame(nodes, columns=['Level', 'Node'])
+        # Sparse S: entry (rows[i], cols[i]) = 1
+        self.rows = np.concatenate(rows)
+        self.cols = np.tile(np.arange(len(bottom)), len(HIERARCHY_LEVELS))
+        self.nodes['Size'] = np.bincount(self.rows, minlength=len(self.nodes))
+        self._index = pd.MultiIndex.from_frame(self.nodes[['Level', 'Node']])
+
+    def node_labels(self, frame, level):
+        """Node label at `level` of every row of `frame` (which carries Route_ID and/or Stop_ID)."""
+        if level == 'Network':
+            return pd.Series(NETWORK_NODE, index=frame.index)
+        keys = {'Route_Type': ['Route_ID'], 'Zone': ['Stop_ID'], 'Route': ['Route_ID'],
+                'Stop': ['Route_ID', 'Stop_ID']}[level]
+        lookup = self.bottom.drop_duplicates(keys)[keys + [level]]
+        labels = frame[keys].merge(lookup, on=keys, how='left')[level]
+        return pd.Series(labels.to_numpy(), index=frame.index)
+
+    def node_history(self, daily, levels, value='Total_Pax'):
+        """Daily history of every node at `levels` from a bottom-level daily frame.
+
+        `daily` has one row per (Date, Route_ID, Stop_ID) with `value` and
+        Congestion_Level; node demand is summed, congestion averaged.
+        Returns Date, Level, Node, value, Congestion_Level.
+        """
+        frames = []
+        for level in levels:
+            frame = daily[['Date', value, 'Congestion_Level']].copy()
+            frame['Node'] = self.node_labels(daily, level)
+            frame = frame.groupby(['Date', 'Node'], observed=True).agg(
+                {value: 'sum', 'Congestion_Level': 'mean'}).reset_index()
+            frame.insert(1, 'Level', level)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def matrix(self, frame, dates, value='Forecast_Total_Pax'):
+        """(node x day) array of `value` from a long frame with Level, Node, Date; NaN where absent."""
+        dates = pd.DatetimeIndex(dates)
+        rows = self._index.get_indexer(pd.MultiIndex.from_frame(frame[['Level', 'Node']].astype(str)))
+        cols = dates.get_indexer(frame['Date'])
+        if (rows < 0).any() or (cols < 0).any():
+            raise ValueError("Frame has nodes or dates outside the hierarchy")
+        out = np.full((len(self.nodes), len(dates)), np.nan)
+        out[rows, cols] = frame[value].to_numpy(dtype='float64')
+        return out
+
+    def aggregate(self, bottom):
+        """Every node's value, S @ bottom, for a (bottom series x day) array."""
+        bottom = np.asarray(bottom, dtype='float64')
+        out = np.zeros((len(self.nodes), bottom.shape[1]))
+        np.add.at(out, self.rows, bottom[self.cols])
+        return out
+
+    def bottom_rows(self, frame):
+        """Position in self.bottom of every (Route_ID, Stop_ID) row of `frame`."""
+        index = pd.MultiIndex.from_frame(self.bottom[['Route_ID', 'Stop_ID']])
+        return index.get_indexer(pd.MultiIndex.from_frame(frame[['Route_ID', 'Stop_ID']]))
+
+    def reconcile(self, base, fixed_levels=()):
+        """Coherent (bottom series x day) values closest to the (node x day) `base` forecasts.
+
+        Nodes at `fixed_levels` keep their base values exactly; those must
+        be present for every day.
+        """
+        base = np.asarray(base, dtype='float64')
+        n_bottom = len(self.bottom)
+        present = ~np.isnan(base)
+        weights = 1.0 / self.nodes['Size'].to_numpy()
+
+        # S'WS: each level partitions the bottom series, so two series in the
+        # same node share that node's weight. Absent base values have weight 0.
+        # (A node missing on some days only is treated as absent throughout.)
+        node_weight = np.where(present.all(axis=1), weights, 0.0)
+        gram = np.zeros((n_bottom, n_bottom))
+        offset = 0
+        for level in HIERARCHY_LEVELS:
+            codes = self.codes[level]
+            gram += (codes[:, None] == codes[None, :]) * node_weight[offset + codes][:, None]
+            offset += codes.max() + 1
+        rhs = np.zeros((n_bottom, base.shape[1]))
+        np.add.at(rhs, self.cols, node_weight[self.rows][:, None] * np.nan_to_num(base[self.rows]))
+
+        fixed = np.flatnonzero(self.nodes['Level'].isin(fixed_levels).to_numpy())
+        if not present[fixed].all():
+            raise ValueError(f"Fixed levels {list(fixed_levels)} need a base value for every node and day")
+        # KKT system [[S'WS, C'], [C, 0]] [b; lambda] = [S'Wy; y_f], C = fixed rows of S
+        constraint = np.zeros((len(fixed), n_bottom))
+        position = np.full(len(self.nodes), -1)
+        position[fixed] = np.arange(len(fixed))
+        member = position[self.rows] >= 0
+        constraint[position[self.rows[member]], self.cols[member]] = 1.0
+        kkt = np.block([[gram, constraint.T], [constraint, np.zeros((len(fixed), len(fixed)))]])
+        target = np.vstack([rhs, base[fixed]])
+        if np.linalg.matrix_rank(kkt) < len(kkt):
+            # Series no weighted node tells apart (e.g. two pairs without a base
+            # forecast in the same route and zone): minimum-norm split between them
+            solution = np.linalg.lstsq(kkt, target, rcond=None)[0]
+        else:
+            solution = np.linalg.solve(kkt, target)
+        return solution[:n_bottom]
+
+    def to_frame(self, values, dates, value='Forecast_Total_Pax'):
+        """Long frame (Level, Node, Date, value) of a (node x day) array."""
+        dates = pd.DatetimeIndex(dates)
+        return pd.DataFrame({
+            'Level': np.repeat(self.nodes['Level'].to_numpy(), len(dates)),
+            'Node': np.repeat(self.nodes['Node'].to_numpy(), len(dates)),
+            'Date': np.tile(dates.to_numpy(), len(self.nodes)),
+            value: np.asarray(values).ravel(),
+        })
@@ -0,0 +1,195 @@
+"""
+DECODE X 2026 - Incremental Ridership Ingestion
+===============================================
+Appends a new ridership/traffic drop (e.g. Shock_Ridership_2025_Q3.csv +
+Shock_Traffic_2025_Q3.csv) to an existing master store without rebuilding it.
+
+  1. Validate the drop against the master schema and the stored dimensions
+  2. Enrich only the new rows (same dimension lookups as the full build)
+  3. Append them as a new partition of the master store
+  4. Fold them into the running aggregates (monthly, route-daily) and the
+     stored load profile and demand cube
+
+stage1_pipeline.py uses master_dimensions() and running_aggregates() for
+the full build too, so both paths produce identical rows and aggregates.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+from common.cube import DemandCube, cube_path
+from common.dates import DATE_DIM_NAME, add_calendar_features, build_date_dimension
+from common.joins import DimensionIndex, enrich
+from common.loads import LoadProfile, load_profile_path
+from common.schema import DATE_DIM_SCHEMA, MASTER_SCHEMA, apply_schema
+from common.store import (MASTER_NAME, append_partition, list_partitions, load_table,
+                          save_table)
+
+RIDERSHIP_COLUMNS = ['Ridership_ID', 'Route_ID', 'Stop_ID', 'Date', 'Boarding_Count', 'Alighting_Count']
+TRAFFIC_COLUMNS = ['Date', 'Congestion_Level', 'Avg_Speed_kmph']
+
+# Route attributes some drops carry inline (shock / out-of-time files)
+INLINE_ROUTE_COLUMNS = ['Route_Code', 'Route_Type']
+
+MONTHLY_AGG_NAME = 'agg_monthly'
+ROUTE_DAILY_AGG_NAME = 'agg_route_daily'
+AGG_KEYS = {MONTHLY_AGG_NAME: ['YearMonth'], ROUTE_DAILY_AGG_NAME: ['Route_ID', 'Date']}
+AGG_MEASURES = ['Total_Pax', 'Boarding_Count', 'Alighting_Count']
+
+
+def master_dimensions(routes_df, stops_df, mapping_df, traffic_df):
+    """Dimension lookups that turn ridership rows into master rows."""
+    return [
+        DimensionIndex('Stop', stops_df, ['Stop_ID'],
+                       ['Stop_Name', 'Latitude', 'Longitude', 'Stop_Type', 'Zone']),
+        DimensionIndex('Route', routes_df, ['Route_ID'],
+                       ['Route_Code', 'Route_Length_km', 'Avg_Travel_Time_Min', 'Route_Type']),
+        DimensionIndex('Mapping', mapping_df, ['Route_ID', 'Stop_ID'],
+                       ['Stop_Sequence', 'Dwell_Time_Min']),
+        DimensionIndex('Traffic', traffic_df, ['Date'],
+                       ['Congestion_Level', 'Avg_Speed_kmph']),
+    ]
+
+
+def running_aggregates(master_df):
+    """Monthly and route-daily aggregates; sums and counts, so they merge by addition."""
+    def _aggregate(keys):
+        grouped = master_df.groupby(keys)
+        agg = grouped[AGG_MEASURES].sum()
+        agg['Records'] = grouped.size()
+        return agg.reset_index()
+
+    return {name: _aggregate(keys) for name, keys in AGG_KEYS.items()}
+
+
+def merge_aggregates(left, right):
+    """Merge two sets of running aggregates (same names) by adding their sums and counts."""
+    merged = {}
+    for name in left:
+        combined = pd.concat([left[name], right[name]], ignore_index=True)
+        merged[name] = combined.groupby(AGG_KEYS[name], as_index=False).sum()
+    return merged
+
+
+def save_aggregates(aggregates, data_dir):
+    """Write each running aggregate as its own table."""
+    return {name: save_table(df, data_dir, name) for name, df in aggregates.items()}
+
+
+def _check_columns(df, required, label):
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        raise ValueError(f"{label} is missing columns {missing}")
+    nulls = df[required].isnull().sum()
+    nulls = nulls[nulls > 0]
+    if len(nulls):
+        raise ValueError(f"{label} has nulls: {nulls.to_dict()}")
+
+
+def validate_drop(ridership_df, traffic_df, routes_df, known_dates):
+    """Check a new drop against the master schema. Returns typed (ridership, traffic).
+
+    Raises ValueError on missing/null columns, negative counts, duplicate IDs
+    or traffic dates, inline route attributes that disagree with the route
+    dimension, or dates the store already holds.
+    """
+    _check_columns(ridership_df, RIDERSHIP_COLUMNS, 'Ridership drop')
+    _check_columns(traffic_df, TRAFFIC_COLUMNS, 'Traffic drop')
+
+    ridership_df = ridership_df.copy()
+    traffic_df = traffic_df[TRAFFIC_COLUMNS].copy()
+    ridership_df['Date'] = pd.to_datetime(ridership_df['Date'])
+    traffic_df['Date'] = pd.to_datetime(traffic_df['Date'])
+
+    counts = ridership_df[['Boarding_Count', 'Alighting_Count']]
+    if not all(pd.api.types.is_integer_dtype(dtype) for dtype in counts.dtypes):
+        raise ValueError("Boarding_Count / Alighting_Count must be integers")
+    if (counts < 0).any().any():
+        raise ValueError("Ridership drop has negative boarding/alighting counts")
+    if ridership_df['Ridership_ID'].duplicated().any():
+        raise ValueError("Ridership drop has duplicate Ridership_ID values")
+    if traffic_df['Date'].duplicated().any():
+        raise ValueError("Traffic drop has more than one row per date")
+
+    # Inline route attributes are derived from the route dimension in the
+    # master; accept them only if they agree, then drop them
+    inline = [col for col in INLINE_ROUTE_COLUMNS if col in ridership_df.columns]
+    if inline:
+        expected = ridership_df[['Route_ID']].merge(routes_df[['Route_ID'] + inline],
+                                                    on='Route_ID', how='left')
+        for col in inline:
+            mismatched = (expected[col].to_numpy() != ridership_df[col].to_numpy()).sum()
+            if mismatched:
+                raise ValueError(f"{mismatched} drop rows have a {col} that disagrees with Bus_Routes.csv")
+
+    overlap = np.intersect1d(ridership_df['Date'].unique(), known_dates)
+    if len(overlap):
+        raise ValueError(f"{len(overlap)} drop dates are already in the master store "
+                         f"(first: {pd.Timestamp(overlap[0]).date()})")
+
+    return ridership_df[RIDERSHIP_COLUMNS], traffic_df
+
+
+def ingest_drop(data_dir, ridership_path, traffic_path, tag=None):
+    """Validate, enrich and append one ridership/traffic drop. Returns a summary dict."""
+    tag = tag or os.path.splitext(os.path.basename(ridership_path))[0]
+    ingested = [os.path.basename(path).split('_', 1)[1] for path in list_partitions(data_dir, MASTER_NAME)]
+    if f'{tag}.parquet' in ingested:
+        raise ValueError(f"Partition '{tag}' has already been ingested")
+
+    routes_df = pd.read_csv(os.path.join(data_dir, 'Bus_Routes.csv'))
+    stops_df = pd.read_csv(os.path.join(data_dir, 'Bus_Stops.csv'))
+    mapping_df = pd.read_csv(os.path.join(data_dir, 'Route_Stop_Mapping.csv'))
+
+    route_daily = load_table(data_dir, ROUTE_DAILY_AGG_NAME)
+    ridership_df, traffic_df = validate_drop(
+        pd.read_csv(ridership_path), pd.read_csv(traffic_path), routes_df,
+        pd.to_datetime(route_daily['Date']).unique())
+
+    # Enrich only the new rows
+    ridership_df['Total_Pax'] = ridership_df['Boarding_Count'] + ridership_df['Alighting_Count']
+    new_df, join_report = enrich(ridership_df, master_dimensions(routes_df, stops_df, mapping_df, traffic_df))
+    unmatched = join_report['Unmatched']
+    if unmatched.any():
+        raise ValueError(f"Drop rows with no dimension match: {unmatched[unmatched > 0].to_dict()}")
+
+    # Extend the date dimension if the drop runs past it
+    date_dim = load_table(data_dir, DATE_DIM_NAME, schema=DATE_DIM_SCHEMA)
+    if new_df['Date'].max() > date_dim['Date'].max():
+        date_dim = build_date_dimension(date_dim['Date'].min(), new_df['Date'].max())
+        save_table(date_dim, data_dir, DATE_DIM_NAME)
+    new_df = apply_schema(add_calendar_features(new_df, date_dim))[list(MASTER_SCHEMA)]
+
+    partition_path = append_partition(new_df, data_dir, MASTER_NAME, tag)
+
+    # Running aggregates: route-daily gains new (route, day) keys only, so the
+    # partial is appended; a drop may extend an existing month, so monthly is
+    # merged by addition and rewritten (one row per month)
+    partials = running_aggregates(new_df)
+    append_partition(partials[ROUTE_DAILY_AGG_NAME], data_dir, ROUTE_DAILY_AGG_NAME, tag)
+    # (stored YearMonth is 'YYYY-MM' text)
+    monthly = merge_aggregates(
+        {MONTHLY_AGG_NAME: load_table(data_dir, MONTHLY_AGG_NAME)},
+        {MONTHLY_AGG_NAME: partials[MONTHLY_AGG_NAME].astype({'YearMonth': str})},
+    )[MONTHLY_AGG_NAME]
+    save_table(monthly, data_dir, MONTHLY_AGG_NAME)
+
+    # Load profiles and the demand cube merge by addition; a tree built before they existed has none to extend
+    profile_path = cube_file = None
+    if os.path.exists(load_profile_path(data_dir)):
+        profile_path = LoadProfile.load(data_dir).extend(LoadProfile.from_master(new_df)).save(data_dir)
+    if os.path.exists(cube_path(data_dir)):
+        cube_file = DemandCube.load(data_dir).extend(DemandCube.from_master(new_df)).save(data_dir)
+
+    return {
+        'tag': tag,
+        'rows': len(new_df),
+        'dates': (new_df['Date'].min().date(), new_df['Date'].max().date()),
+        'routes': new_df['Route_ID'].nunique(),
+        'total_pax': int(new_df['Total_Pax'].sum()),
+        'partition': partition_path,
+        'load_profile': profile_path,
+        'demand_cube': cube_file,
+        'monthly': monthly,
+    }
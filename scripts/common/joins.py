@@ -0,0 +1,85 @@
+"""
+DECODE X 2026 - Index-Based Dimension Joins
+===========================================
+Attaches dimension attributes (stops, routes, route-stop mapping, traffic)
+to a ridership fact table without chained DataFrame.merge calls.
+
+Every dimension key here is a small dense integer (Stop_ID, Route_ID) or a
+calendar day, so each dimension is indexed once into a flat lookup array
+(key -> row position). Enrichment is then a single gather pass: one
+position lookup per dimension and one take per attribute column, with the
+fact table copied exactly once.
+
+Usage:
+    stop_idx = DimensionIndex('Stop', stops_df, ['Stop_ID'], ['Zone', 'Stop_Type'])
+    master_df, report = enrich(ridership_df, [stop_idx, ...])
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _key_codes(values):
+    """Integer codes for a key column (calendar days for datetimes)."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy().astype('datetime64[D]').astype(np.int64)
+    return np.asarray(values, dtype=np.int64)
+
+
+class DimensionIndex:
+    """Dense key -> row-position lookup over one dimension table."""
+
+    def __init__(self, name, table, keys, columns):
+        self.name = name
+        self.keys = list(keys)
+        self.columns = list(columns)
+        self.values = {col: table[col].to_numpy() for col in self.columns}
+
+        codes = [_key_codes(table[k]) for k in self.keys]
+        self.offsets = [c.min() for c in codes]
+        self.shape = tuple(int(c.max() - off) + 1 for c, off in zip(codes, self.offsets))
+        flat = np.ravel_multi_index([c - off for c, off in zip(codes, self.offsets)], self.shape)
+
+        if len(np.unique(flat)) != len(flat):
+            raise ValueError(f"{name} dimension has duplicate keys on {self.keys}; "
+                             f"a join would multiply fact rows")
+
+        self.lookup = np.full(int(np.prod(self.shape)), -1, dtype=np.int64)
+        self.lookup[flat] = np.arange(len(flat))
+
+    def positions(self, fact_df):
+        """Row position in the dimension for every fact row (-1 = no match)."""
+        local = [_key_codes(fact_df[k]) - off for k, off in zip(self.keys, self.offsets)]
+        in_range = np.ones(len(fact_df), dtype=bool)
+        for codes, size in zip(local, self.shape):
+            in_range &= (codes >= 0) & (codes < size)
+
+        pos = np.full(len(fact_df), -1, dtype=np.int64)
+        if in_range.any():
+            flat = np.ravel_multi_index([codes[in_range] for codes in local], self.shape)
+            pos[in_range] = self.lookup[flat]
+        return pos
+
+
+def enrich(fact_df, indexes):
+    """Left-join every dimension onto `fact_df` in one gather pass.
+
+    Returns (enriched_df, report); report has one row per dimension with the
+    row count after that join and the fact rows whose key found no match.
+    Dimension keys are unique, so the row count can never change.
+    """
+    columns = {col: fact_df[col].to_numpy() for col in fact_df.columns}
+    report = []
+    for idx in indexes:
+        pos = idx.positions(fact_df)
+        for col in idx.columns:
+            # allow_fill: unmatched rows become NaN, exactly like a left merge
+            columns[col] = pd.api.extensions.take(idx.values[col], pos, allow_fill=True)
+        report.append({
+            'Dimension': idx.name,
+            'Rows': len(pos),
+            'Unmatched': int((pos < 0).sum()),
+        })
+
+    enriched = pd.DataFrame(columns, index=fact_df.index, copy=False)
+    return enriched, pd.DataFrame(report).set_index('Dimension')
@@ -0,0 +1,188 @@
+"""
+DECODE X 2026 - Onboard Load Profiles
+=====================================
+Estimated onboard load at every stop of every route on every day, built
+in one grouped cumulative pass over the master and kept as a dense
+(route x day x stop sequence) array.
+
+  profile = LoadProfile.from_master(master_df)       # or ctx.load_profile()
+  profile.save(DATA_DIR)
+  recent = profile.window('2025-01-01', '2025-06-30')
+  recent.peak_quantiles([0.5, 0.95])    # P50 / P95 of the daily peak, per route
+  recent.peak_segments()                # how often each stop is the day's peak
+  recent.mean_profile(route_id)         # average board / alight / onboard by stop
+
+For route r, day d and stop sequence s:
+
+  onboard[r, d, s] = sum over stops 1..s of (boarding - alighting)
+
+i.e. the load on the segment leaving stop s. Boarding and alighting are
+scattered into the array with one bincount each and the onboard load is a
+single cumsum along the sequence axis, so every route-day profile costs
+the same O(rows) pass. Positions past a route's last stop repeat its final
+load; route-days without data are zero and flagged in `observed`.
+
+The arrays are stored uncompressed as <data_dir>/load_profile.npz (int32,
+a few MB for the full history). Profiles merge by addition, which is how
+stage1_pipeline.py --ingest extends the stored one with a new drop.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+LOAD_PROFILE_NAME = 'load_profile'
+LOAD_PROFILE_COLUMNS = ['Date', 'Route_ID', 'Stop_Sequence', 'Boarding_Count', 'Alighting_Count']
+
+
+def load_profile_path(data_dir, name=LOAD_PROFILE_NAME):
+    """Path of a stored load profile."""
+    return os.path.join(str(data_dir), f'{name}.npz')
+
+
+class LoadProfile:
+    """Dense (route x day x stop sequence) boarding, alighting and onboard arrays."""
+
+    def __init__(self, route_ids, dates, boarding, alighting, observed):
+        self.route_ids = np.asarray(route_ids)
+        self.dates = pd.DatetimeIndex(dates)
+        self.boarding = np.asarray(boarding, dtype='int32')
+        self.alighting = np.asarray(alighting, dtype='int32')
+        self.observed = np.asarray(observed, dtype=bool)
+        self.onboard = np.cumsum(self.boarding - self.alighting, axis=2, dtype='int32')
+        # Sequences a route serves: 1..last one with any boarding or alighting
+        served = ((self.boarding != 0) | (self.alighting != 0)).any(axis=1)
+        self.n_stops = np.where(served.any(axis=1), served.shape[1] - served[:, ::-1].argmax(axis=1), 0)
+
+    @property
+    def sequences(self):
+        return np.arange(1, self.boarding.shape[2] + 1)
+
+    @classmethod
+    def from_master(cls, master_df):
+        """Profile of every route-day in a frame with the LOAD_PROFILE_COLUMNS."""
+        route_ids, r = np.unique(master_df['Route_ID'].to_numpy(), return_inverse=True)
+        dates, d = np.unique(master_df['Date'].to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+        s = master_df['Stop_Sequence'].to_numpy(dtype='int64') - 1
+        if (s < 0).any():
+            raise ValueError("Stop_Sequence must start at 1")
+        shape = (len(route_ids), len(dates), int(s.max()) + 1)
+        cell = np.ravel_multi_index((r, d, s), shape)
+
+        def scatter(col):
+            counts = np.bincount(cell, weights=master_df[col].to_numpy(dtype='float64'), minlength=np.prod(shape))
+            return counts.reshape(shape).round().astype('int32')
+
+        observed = np.zeros(shape[:2], dtype=bool)
+        observed[r, d] = True
+        return cls(route_ids, dates, scatter('Boarding_Count'), scatter('Alighting_Count'), observed)
+
+    # ---------- Storage ----------
+
+    def save(self, data_dir, name=LOAD_PROFILE_NAME):
+        """Write the profile arrays. Returns the path."""
+        path = load_profile_path(data_dir, name)
+        np.savez(path, route_ids=self.route_ids, dates=self.dates.to_numpy(dtype='datetime64[D]'),
+                 boarding=self.boarding, alighting=self.alighting, observed=self.observed)
+        return path
+
+    @classmethod
+    def load(cls, data_dir, name=LOAD_PROFILE_NAME):
+        """LoadProfile saved under `name` in `data_dir`."""
+        with np.load(load_profile_path(data_dir, name)) as stored:
+            return cls(stored['route_ids'], stored['dates'], stored['boarding'], stored['alighting'],
+                       stored['observed'])
+
+    def extend(self, other):
+        """Profile covering both `self` and `other`; cells present in both are added."""
+        route_ids = np.union1d(self.route_ids, other.route_ids)
+        dates = self.dates.union(other.dates)
+        shape = (len(route_ids), len(dates), max(self.boarding.shape[2], other.boarding.shape[2]))
+        boarding, alighting = np.zeros(shape, dtype='int32'), np.zeros(shape, dtype='int32')
+        observed = np.zeros(shape[:2], dtype=bool)
+        for part in (self, other):
+            r = np.searchsorted(route_ids, part.route_ids)[:, None]
+            d = dates.get_indexer(part.dates)[None, :]
+            n_seq = part.boarding.shape[2]
+            boarding[r, d, :n_seq] += part.boarding
+            alighting[r, d, :n_seq] += part.alighting
+            observed[r, d] |= part.observed
+        return LoadProfile(route_ids, dates, boarding, alighting, observed)
+
+    # ---------- Queries ----------
+
+    def window(self, start=None, end=None, routes=None):
+        """Profile restricted to dates in [start, end] and optionally some Route_IDs."""
+        days = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            days &= self.dates >= pd.Timestamp(start)
+        if end is not None:
+            days &= self.dates <= pd.Timestamp(end)
+        rows = np.ones(len(self.route_ids), dtype=bool) if routes is None else np.isin(self.route_ids, routes)
+        return LoadProfile(self.route_ids[rows], self.dates[days], self.boarding[rows][:, days],
+                           self.alighting[rows][:, days], self.observed[rows][:, days])
+
+    def route_index(self, route_id):
+        position = np.flatnonzero(self.route_ids == route_id)
+        if not len(position):
+            raise KeyError(f"Route {route_id} is not in the load profile")
+        return position[0]
+
+    def daily_peaks(self):
+        """Peak onboard load and the stop it occurs after, per observed route-day.
+
+        Returns Route_ID, Date, Peak_Onboard, Peak_Sequence (ties go to the
+        earliest stop).
+        """
+        r, d = np.nonzero(self.observed)
+        cells = self.onboard[r, d]
+        return pd.DataFrame({
+            'Route_ID': self.route_ids[r],
+            'Date': self.dates[d],
+            'Peak_Onboard': cells.max(axis=1),
+            'Peak_Sequence': cells.argmax(axis=1) + 1,
+        })
+
+    def peak_quantiles(self, quantiles=(0.5, 0.95)):
+        """Quantiles of the daily peak onboard load per route (index Route_ID, one column per quantile)."""
+        peaks = np.where(self.observed, self.onboard.max(axis=2), np.nan)
+        values = np.nanquantile(peaks, quantiles, axis=1).T
+        return pd.DataFrame(values, index=pd.Index(self.route_ids, name='Route_ID'),
+                            columns=[f'P{round(q * 100)}' for q in quantiles])
+
+    def peak_segments(self):
+        """Days each stop sequence carries the day's peak load, per route.
+
+        Returns Route_ID, Stop_Sequence, Days, Share (of the route's observed
+        days), most frequent peak first within each route.
+        """
+        n_routes, _, n_seq = self.onboard.shape
+        peak_seq = self.onboard.argmax(axis=2)
+        r, d = np.nonzero(self.observed)
+        counts = np.bincount(r * n_seq + peak_seq[r, d], minlength=n_routes * n_seq).reshape(n_routes, n_seq)
+        routes, seqs = np.nonzero(counts)
+        frame = pd.DataFrame({
+            'Route_ID': self.route_ids[routes],
+            'Stop_Sequence': seqs + 1,
+            'Days': counts[routes, seqs],
+            'Share': counts[routes, seqs] / self.observed.sum(axis=1)[routes],
+        })
+        return frame.sort_values(['Route_ID', 'Days', 'Stop_Sequence'],
+                                 ascending=[True, False, True], ignore_index=True)
+
+    def mean_profile(self, route_id):
+        """Average boarding, alighting and onboard load by stop over the route's observed days.
+
+        Returns Stop_Sequence, Boarding_Count, Alighting_Count, Est_Onboard
+        for the sequences the route serves.
+        """
+        r = self.route_index(route_id)
+        days = self.observed[r]
+        n_stops = self.n_stops[r]
+        return pd.DataFrame({
+            'Stop_Sequence': self.sequences[:n_stops],
+            'Boarding_Count': self.boarding[r, days, :n_stops].mean(axis=0),
+            'Alighting_Count': self.alighting[r, days, :n_stops].mean(axis=0),
+            'Est_Onboard': self.onboard[r, days, :n_stops].mean(axis=0),
+        })
@@ -0,0 +1,289 @@
+"""
+DECODE X 2026 - Forecast Model Zoo
+==================================
+Several candidate models per series, fitted in a process pool, cached on
+disk and picked per series by holdout backtest error.
+
+  zoo = select_models(daily_route, keys=['Route_ID'], cache_dir=ctx.cache_dir)
+  zoo.scores      # WAPE / MAPE / bias of every (series, model) on the holdout
+  zoo.selected    # best model per series
+  forecast_df = zoo.predict('2025-07-01', '2025-12-31')
+
+Candidates (MODEL_ZOO), all plain numpy:
+  decomposition   the Stage 1 trend x monthly x DOW (+ congestion) model
+  holt_winters    additive Holt-Winters, weekly and annual seasonality
+  damped_trend    additive Holt with a damped trend, weekly seasonality
+  seasonal_naive  the same weekday 52 weeks earlier
+
+Every candidate is fitted twice per series: on the history minus the last
+`holdout_days` (scored against those days) and on the full history (kept
+for forecasting). A fit is cached under
+.cache/models/<series keys>/<blake2b(series data, model, hyperparameters,
+holdout, MODEL_CODE_VERSION)>.pkl, so after a new data drop only series
+whose rows changed are refitted. MODEL_CODE_VERSION digests the source of
+this module and common.forecasting, so editing a candidate refits it.
+Fits a run neither produced nor loaded are deleted from its keys'
+directory.
+
+Pool workers are spawned, so a script calling select_models(jobs > 1)
+must keep its top-level work under `if __name__ == '__main__':`.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common import forecasting
+from common.forecasting import SERIES_KEYS, fit_components, project
+
+MODEL_CACHE_DIR = 'models'
+HOLDOUT_DAYS = 91
+ANNUAL_PERIOD = 365
+NAIVE_SEASON = 364   # 52 weeks: same weekday a year earlier
+
+# fit(series, **hyperparams) -> state; forecast(state, dates) -> values
+Candidate = namedtuple('Candidate', ['fit', 'forecast', 'hyperparams'])
+
+
+# ---------- Candidates ----------
+
+def _series_frame(series):
+    dates = pd.DatetimeIndex(series['Date'])
+    return pd.DataFrame({'Date': dates, 'Series': 0, 'Total_Pax': series['y'],
+                         'Congestion_Level': series['congestion'],
+                         'Month': dates.month, 'DayOfWeek': dates.dayofweek})
+
+
+def _fit_decomposition(series):
+    return fit_components(_series_frame(series), keys=['Series'])
+
+
+def _forecast_decomposition(state, dates):
+    forecast = project(state, pd.DataFrame({'Date': pd.DatetimeIndex(dates)}), calendar=())
+    return forecast['Forecast_Total_Pax'].to_numpy(dtype='float64')
+
+
+def _daily(series):
+    """Series on a gap-free daily index (gaps carried forward)."""
+    y = pd.Series(series['y'], index=pd.DatetimeIndex(series['Date']))
+    return y.asfreq('D').ffill()
+
+
+def _annual_index(dates):
+    return np.minimum(pd.DatetimeIndex(dates).dayofyear.to_numpy() - 1, ANNUAL_PERIOD - 1)
+
+
+def _fit_smoothing(series, alpha, beta, phi, gamma_week, gamma_year, annual):
+    """Additive (damped) Holt-Winters; initial state from the first year (or weeks) of data."""
+    y_series = _daily(series)
+    y, dates = y_series.to_numpy(dtype='float64'), y_series.index
+    weekday, day_of_year = dates.dayofweek.to_numpy(), _annual_index(dates)
+    annual = annual and len(y) >= 2 * ANNUAL_PERIOD
+
+    init = y[:ANNUAL_PERIOD - 1] if annual else y[:min(len(y), 8 * 7)]
+    level = init.mean()
+    trend = (y[ANNUAL_PERIOD - 1:2 * (ANNUAL_PERIOD - 1)].mean() - level) / (ANNUAL_PERIOD - 1) if annual else 0.0
+    week = np.bincount(weekday[:len(init)], weights=init - level, minlength=7) / np.maximum(
+        np.bincount(weekday[:len(init)], minlength=7), 1)
+    year = np.zeros(ANNUAL_PERIOD)
+    if annual:
+        rest = pd.Series(init - level - week[weekday[:len(init)]]).rolling(15, center=True, min_periods=1).mean()
+        year[day_of_year[:len(init)]] = rest.to_numpy()
+
+    for t in range(len(y)):
+        d, k = weekday[t], day_of_year[t]
+        prior = level + phi * trend
+        new_level = alpha * (y[t] - week[d] - year[k]) + (1 - alpha) * prior
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        week[d] = gamma_week * (y[t] - new_level - year[k]) + (1 - gamma_week) * week[d]
+        if annual:
+            year[k] = gamma_year * (y[t] - new_level - week[d]) + (1 - gamma_year) * year[k]
+        level = new_level
+    return {'level': level, 'trend': trend, 'phi': phi, 'week': week, 'year': year,
+            'last_date': dates[-1]}
+
+
+def _forecast_smoothing(state, dates):
+    dates = pd.DatetimeIndex(dates)
+    steps = (dates - state['last_date']).days.to_numpy()
+    phi = state['phi']
+    # Sum of phi^1..phi^h (h for an undamped trend)
+    damping = steps.astype('float64') if phi == 1 else phi * (1 - phi ** steps) / (1 - phi)
+    return (state['level'] + damping * state['trend']
+            + state['week'][dates.dayofweek.to_numpy()] + state['year'][_annual_index(dates)])
+
+
+def _fit_naive(series, season):
+    return {'history': _daily(series), 'season': season}
+
+
+def _forecast_naive(state, dates):
+    history, season = state['history'], state['season']
+    dates = pd.DatetimeIndex(dates)
+    # Step back whole seasons until the day is inside the history
+    seasons_back = np.ceil((dates - history.index[-1]).days.to_numpy() / season).clip(min=1)
+    source = dates - pd.to_timedelta(seasons_back * season, unit='D')
+    return history.reindex(source).to_numpy(dtype='float64')
+
+
+MODEL_ZOO = {
+    'decomposition': Candidate(_fit_decomposition, _forecast_decomposition, {}),
+    'holt_winters': Candidate(_fit_smoothing, _forecast_smoothing,
+                              {'alpha': 0.1, 'beta': 0.001, 'phi': 1.0, 'gamma_week': 0.05,
+                               'gamma_year': 0.2, 'annual': True}),
+    'damped_trend': Candidate(_fit_smoothing, _forecast_smoothing,
+                              {'alpha': 0.2, 'beta': 0.01, 'phi': 0.9, 'gamma_week': 0.05,
+                               'gamma_year': 0.0, 'annual': False}),
+    'seasonal_naive': Candidate(_fit_naive, _forecast_naive, {'season': NAIVE_SEASON}),
+}
+
+
+# ---------- Fitting, caching, selection ----------
+
+def _code_version():
+    digest = hashlib.blake2b(digest_size=8)
+    for path in (__file__, forecasting.__file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Cached fits of older candidate code (or fit_components / project) never match
+MODEL_CODE_VERSION = _code_version()
+
+
+def series_digest(series):
+    """Content digest of one series' dates, values and congestion."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in ('Date', 'y', 'congestion'):
+        digest.update(np.ascontiguousarray(series[part]).tobytes())
+    return digest.digest()
+
+
+def fit_key(digest, model, hyperparams, holdout_days):
+    """Cache key of one (series, model, hyperparameters, holdout) fit under MODEL_CODE_VERSION."""
+    key = hashlib.blake2b(digest, digest_size=12)
+    key.update(repr((model, sorted(hyperparams.items()), holdout_days, MODEL_CODE_VERSION)).encode())
+    return key.hexdigest()
+
+
+def _fit_candidate(series, model, hyperparams, holdout_days):
+    """Worker: holdout score and full-history state of one candidate on one series."""
+    candidate = MODEL_ZOO[model]
+    cut = len(series['Date']) - holdout_days
+    train = {part: values[:cut] for part, values in series.items()}
+    forecast = np.maximum(candidate.forecast(candidate.fit(train, **hyperparams), series['Date'][cut:]), 0)
+    actual = series['y'][cut:]
+    error = forecast - actual
+    positive = actual > 0
+    return {
+        'WAPE': np.abs(error).sum() / actual.sum() * 100,
+        'MAPE': np.mean(np.abs(error[positive]) / actual[positive]) * 100,
+        'Bias': error.sum() / actual.sum() * 100,
+        'state': candidate.fit(series, **hyperparams),
+    }
+
+
+class ModelZoo:
+    """Scores of every candidate per series, and the best model's fitted state."""
+
+    def __init__(self, keys, labels, scores, states):
+        self.keys, self.labels = keys, labels
+        self.scores = scores
+        best = scores.loc[scores.groupby(keys, sort=False)['WAPE'].idxmin()]
+        self.selected = best.set_index(keys)
+        self.states = states
+
+    def predict(self, start, end):
+        """Daily forecast of every series from its selected model (Date, keys, labels, Model, Forecast_Total_Pax)."""
+        dates = pd.date_range(start, end, freq='D')
+        frames = []
+        for series_key, row in self.selected.iterrows():
+            values = MODEL_ZOO[row['Model']].forecast(self.states[(series_key, row['Model'])], dates)
+            frame = pd.DataFrame({'Date': dates})
+            for col, value in zip(self.keys, series_key if isinstance(series_key, tuple) else (series_key,)):
+                frame[col] = value
+            for col in self.labels:
+                frame[col] = row[col]
+            frame['Model'] = row['Model']
+            frame['Forecast_Total_Pax'] = np.maximum(0, np.round(values)).astype('int64')
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+
+def select_models(history, keys=SERIES_KEYS, labels=(), value='Total_Pax', models=None,
+                  holdout_days=HOLDOUT_DAYS, cache_dir=None, jobs=None):
+    """Fit every candidate on every series (cached), score on the holdout, pick the best per series.
+
+    `history` has one row per series and day with `value` and
+    Congestion_Level. Returns a ModelZoo; its `fitted` attribute counts
+    the fits that were not in the cache. Cached fits of the same `keys`
+    that this call did not use are deleted.
+    """
+    keys, labels = list(keys), list(labels)
+    models = list(MODEL_ZOO) if models is None else list(models)
+    history = history.sort_values(keys + ['Date'])
+    series_list = []
+    for series_key, frame in history.groupby(keys, sort=True, observed=True):
+        series = {'Date': frame['Date'].to_numpy(dtype='datetime64[ns]'),
+                  'y': frame[value].to_numpy(dtype='float64'),
+                  'congestion': frame['Congestion_Level'].to_numpy(dtype='float64')}
+        series_key = series_key[0] if len(keys) == 1 else series_key
+        series_list.append((series_key, frame[labels].iloc[0].tolist(), series, series_digest(series)))
+
+    # Route- and stop-level runs share the cache but never each other's fits
+    model_dir = os.path.join(cache_dir, MODEL_CACHE_DIR, '-'.join(keys)) if cache_dir else None
+    results, tasks, used = {}, [], set()
+    for series_key, _, series, digest in series_list:
+        for model in models:
+            hyperparams = MODEL_ZOO[model].hyperparams
+            path = (os.path.join(model_dir, f'{fit_key(digest, model, hyperparams, holdout_days)}.pkl')
+                    if model_dir else None)
+            if path:
+                used.add(os.path.basename(path))
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    results[(series_key, model)] = pickle.load(f)
+            else:
+                tasks.append(((series_key, model), path, (series, model, hyperparams, holdout_days)))
+
+    if tasks:
+        if jobs == 1:
+            fits = [_fit_candidate(*args) for _, _, args in tasks]
+        else:
+            context = multiprocessing.get_context('spawn')
+            workers = jobs or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                fits = list(pool.map(_fit_candidate, *zip(*[args for _, _, args in tasks]),
+                                     chunksize=max(1, len(tasks) // (4 * workers))))
+        if model_dir:
+            os.makedirs(model_dir, exist_ok=True)
+        for (task_key, path, _), fit in zip(tasks, fits):
+            results[task_key] = fit
+            if path:
+                with open(path, 'wb') as f:
+                    pickle.dump(fit, f)
+    if model_dir and os.path.isdir(model_dir):
+        # Fits of superseded data drops or code (and flat ones from before the per-keys layout) are dead weight
+        stale = [os.path.join(model_dir, entry) for entry in os.listdir(model_dir) if entry not in used]
+        parent = os.path.dirname(model_dir)
+        stale += [os.path.join(parent, entry) for entry in os.listdir(parent) if entry.endswith('.pkl')]
+        for path in stale:
+            os.remove(path)
+
+    rows = []
+    for series_key, series_labels, _, _ in series_list:
+        key_values = series_key if isinstance(series_key, tuple) else (series_key,)
+        for model in models:
+            fit = results[(series_key, model)]
+            rows.append(list(key_values) + series_labels + [model, fit['WAPE'], fit['MAPE'], fit['Bias']])
+    scores = pd.DataFrame(rows, columns=keys + labels + ['Model', 'WAPE', 'MAPE', 'Bias'])
+    zoo = ModelZoo(keys, labels, scores, {key: fit['state'] for key, fit in results.items()})
+    zoo.fitted = len(tasks)
+    return zoo
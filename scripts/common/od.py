@@ -0,0 +1,98 @@
+"""
+DECODE X 2026 - Origin-Destination Estimation
+=============================================
+Stop-to-stop trip matrices per route-day from boarding and alighting
+counts alone, by iterative proportional fitting (IPF) over the
+stop-to-stop matrix (one triangle per direction) - every route-day at once
+as one batched array.
+
+  profile = ctx.load_profile().window('2025-01-01', '2025-06-30')
+  od = estimate_od(profile.boarding, profile.alighting)
+  od.trips              # (route x day x origin x destination) trips
+  od.converged          # per route-day convergence flag
+  outbound, inbound = segment_flows(od.trips)   # passengers per segment and direction
+
+The counts are per stop over both directions of travel (terminals see
+boardings and alightings alike), so a trip boarding at sequence i may
+alight at any j != i: outbound trips (j > i) fill the upper triangle of
+the matrix, inbound trips (j < i) the lower one. Each route-day's
+alightings are first scaled to its boardings so both margins share one
+total. IPF then alternates
+
+  T[i, j] *= boarding[i] / sum_j T[i, j]       (row scaling)
+  T[i, j] *= alighting[j] / sum_i T[i, j]      (column scaling)
+
+from the `seed` (uniform off the diagonal unless given, e.g. a
+distance-decay prior) until every route-day's largest margin error is
+below `tol` of its total, or `max_iter` is reached. Route-days that miss
+the tolerance keep their closest fit and are flagged as not converged.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+IPF_TOLERANCE = 1e-6
+IPF_MAX_ITER = 500
+
+ODEstimate = namedtuple('ODEstimate', ['trips', 'converged', 'iterations', 'max_error'])
+
+
+def _scale(current, target):
+    return np.divide(target, current, out=np.zeros_like(current), where=current > 0)
+
+
+def balanced_margins(boarding, alighting):
+    """Float margins (last axis = stop sequence) with alightings scaled to each route-day's boardings."""
+    boarding = np.array(boarding, dtype='float64')
+    alighting = np.array(alighting, dtype='float64')
+    alighting *= _scale(alighting.sum(axis=-1, keepdims=True), boarding.sum(axis=-1, keepdims=True))
+    return boarding, alighting
+
+
+def estimate_od(boarding, alighting, seed=None, tol=IPF_TOLERANCE, max_iter=IPF_MAX_ITER):
+    """IPF trip matrices for (..., stop sequence) boarding and alighting arrays.
+
+    Leading axes (e.g. route x day) are independent problems solved
+    together. Returns ODEstimate(trips (..., S, S), converged (...),
+    iterations, max_error (...)) with max_error relative to each problem's
+    total.
+    """
+    boarding, alighting = balanced_margins(boarding, alighting)
+    n_seq = boarding.shape[-1]
+    off_diagonal = 1.0 - np.eye(n_seq)
+    trips = np.broadcast_to(off_diagonal if seed is None else seed * off_diagonal,
+                            boarding.shape + (n_seq,)).copy()
+    total = np.maximum(boarding.sum(axis=-1), 1.0)
+
+    for iteration in range(1, max_iter + 1):
+        trips *= _scale(trips.sum(axis=-1), boarding)[..., :, None]
+        trips *= _scale(trips.sum(axis=-2), alighting)[..., None, :]
+        # Columns now match; the error left is in the rows
+        max_error = np.abs(trips.sum(axis=-1) - boarding).max(axis=-1) / total
+        if (max_error < tol).all():
+            break
+    return ODEstimate(trips, max_error < tol, iteration, max_error)
+
+
+def segment_flows(trips):
+    """Outbound and inbound passengers on each segment s <-> s+1 of (..., S, S) trip matrices.
+
+    Returns two (..., S - 1) arrays: outbound segment s carries the trips
+    with origin <= s < destination, inbound the trips with
+    destination <= s < origin.
+    """
+    n_seq = trips.shape[-1]
+    origin, destination = np.arange(n_seq)[:, None], np.arange(n_seq)[None, :]
+    segment = np.arange(n_seq - 1)[:, None, None]
+    outbound = (origin <= segment) & (destination > segment)      # (segment, origin, destination)
+    return (np.einsum('...ij,sij->...s', trips, outbound.astype('float64')),
+            np.einsum('...ij,sij->...s', trips, outbound.transpose(0, 2, 1).astype('float64')))
+
+
+def trip_lengths(trips):
+    """Mean trip length in stops of (..., S, S) trip matrices."""
+    n_seq = trips.shape[-1]
+    hops = np.abs(np.arange(n_seq)[None, :] - np.arange(n_seq)[:, None])
+    return np.divide((trips * hops).sum(axis=(-2, -1)), trips.sum(axis=(-2, -1)),
+                     out=np.zeros(trips.shape[:-2]), where=trips.sum(axis=(-2, -1)) > 0)
@@ -0,0 +1,156 @@
+"""
+DECODE X 2026 - Online Forecast Updating
+========================================
+Folds each new day of actuals into the Stage 1 decomposition state with
+exponential smoothing, so the forward forecast can be refreshed daily at
+a cost independent of the history length.
+
+  online = OnlineForecaster.from_forecaster(ctx.forecaster())   # first run
+  online = OnlineForecaster.load(DATA_DIR)                      # later runs
+  online.update(new_days).save(DATA_DIR)
+  forward_df = online.predict('2025-07-01', '2025-09-30')
+
+The state is the Forecaster parameter table itself (one row per series),
+with Base_Value read as the current deseasonalised level, Slope as the
+trend per month and Last_Date as the last day folded in; predict() is
+the batch projection over that state. For a day with demand y, month m
+and weekday d (Holt-Winters, multiplicative, per series):
+
+  x      = y - congestion adjustment (damped, as in the batch model)
+  prior  = level + slope * days since the last update / DAYS_PER_MONTH
+  level  = ALPHA * x / (seasonal_m * dow_d) + (1 - ALPHA) * prior
+  w      = 1 - (1 - BETA) ** (months since the last update)
+  slope  = w * clip(level change per month, +-SLOPE_CAP * level) + (1 - w) * slope
+  dow_d  = GAMMA * x / (level * seasonal_m) + (1 - GAMMA) * dow_d
+
+BETA is a per-month weight, so daily steps move the trend by a day's
+share of it, and the cap keeps a one-off level shift (which the level
+absorbs within days) from turning into a persistent trend.
+holdout_wape() replays the update without the last HOLDOUT_DAYS days and
+scores both the updated and the untouched state on them.
+
+DOW multipliers are renormalised to mean 1 after each update. Monthly
+seasonality (one observation per year) stays at its batch value. Each
+day costs O(series); days already folded in are skipped, so re-running
+an update over overlapping actuals is harmless.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.forecasting import (CONGESTION_COLUMNS, CONGESTION_DAMPING, DOW_COLUMNS, SEASONAL_COLUMNS,
+                                Forecaster)
+
+ONLINE_STATE_NAME = 'forecast_state'
+DAYS_PER_MONTH = 365.25 / 12
+
+ALPHA = 0.10   # level smoothing
+BETA = 0.10    # trend smoothing, per month of data
+SLOPE_CAP = 0.02   # largest level change per month (share of level) a day feeds the trend
+HOLDOUT_DAYS = 28
+GAMMA = 0.05   # day-of-week smoothing
+
+
+class OnlineForecaster(Forecaster):
+    """Forecaster whose parameters are updated in place as daily actuals arrive."""
+
+    @classmethod
+    def from_forecaster(cls, model):
+        """Online state starting from a fitted (or loaded) Forecaster."""
+        online = cls(model.keys, model.labels, model.value)
+        online.params = model.params.copy()
+        return online
+
+    def update(self, actuals, alpha=ALPHA, beta=BETA, gamma=GAMMA):
+        """Fold daily actuals into the state, day by day. Returns self.
+
+        `actuals` has one row per series and day: Date, the key columns,
+        the value and optionally Congestion_Level (the month's expected
+        congestion is used where it is missing).
+        """
+        if self.params is None:
+            raise ValueError("OnlineForecaster has no state; from_forecaster() or load() it first")
+        params = self.params
+        if len(self.keys) == 1:
+            rows = params.index.get_indexer(actuals[self.keys[0]])
+        else:
+            rows = params.index.get_indexer(pd.MultiIndex.from_frame(actuals[self.keys]))
+        if (rows < 0).any():
+            raise ValueError(f"{(rows < 0).sum()} actual rows belong to series the state does not know")
+
+        days = actuals['Date'].to_numpy(dtype='datetime64[ns]')
+        last = pd.DatetimeIndex(params['Last_Date']).to_numpy().copy()
+        fresh = days > last[rows]
+        congestion = (actuals['Congestion_Level'].to_numpy(dtype='float64')
+                      if 'Congestion_Level' in actuals else np.full(len(actuals), np.nan))
+        # Fresh rows in date order, one slice per day
+        order = np.flatnonzero(fresh)[np.argsort(days[fresh], kind='stable')]
+        rows, days, congestion = rows[order], days[order], congestion[order]
+        values = actuals[self.value].to_numpy(dtype='float64')[order]
+        unique_days, starts = np.unique(days, return_index=True)
+        ends = np.append(starts[1:], len(days))
+
+        level = params['Base_Value'].to_numpy(dtype='float64').copy()
+        slope = params['Slope'].to_numpy(dtype='float64').copy()
+        seasonal = params[SEASONAL_COLUMNS].to_numpy(dtype='float64')
+        dow = params[DOW_COLUMNS].to_numpy(dtype='float64').copy()
+        expected = params[CONGESTION_COLUMNS].to_numpy(dtype='float64')
+        mean_congestion = params['Mean_Congestion'].to_numpy(dtype='float64')
+        cong_slope = params['Cong_Slope'].to_numpy(dtype='float64')
+
+        for day, start, end in zip(unique_days, starts, ends):
+            r, y, c = rows[start:end], values[start:end], congestion[start:end]
+            day = pd.Timestamp(day)
+            month, weekday = day.month - 1, day.dayofweek
+            c = np.where(np.isnan(c), expected[r, month], c)
+            x = y - cong_slope[r] * (c - mean_congestion[r]) * CONGESTION_DAMPING
+
+            gap = (day.to_datetime64() - last[r]) / np.timedelta64(1, 'D') / DAYS_PER_MONTH
+            prior = level[r] + slope[r] * gap
+            season = seasonal[r, month] * dow[r, weekday]
+            new_level = alpha * x / np.where(season > 0, season, 1) + (1 - alpha) * prior
+            weight = 1 - (1 - beta) ** gap
+            change = np.clip((new_level - level[r]) / gap, -SLOPE_CAP * level[r], SLOPE_CAP * level[r])
+            slope[r] = weight * change + (1 - weight) * slope[r]
+            level_season = new_level * seasonal[r, month]
+            dow[r, weekday] = (gamma * x / np.where(level_season > 0, level_season, 1)
+                               + (1 - gamma) * dow[r, weekday])
+            dow[r] /= dow[r].mean(axis=1, keepdims=True)
+            level[r] = new_level
+            last[r] = day.to_datetime64()
+
+        params['Base_Value'] = level
+        params['Slope'] = slope
+        params[DOW_COLUMNS] = dow
+        params['Last_Date'] = last
+        return self
+
+    def holdout_wape(self, actuals, days=HOLDOUT_DAYS):
+        """WAPE (%) on the last `days` days of `actuals` of this state updated with the rest vs left as is.
+
+        Returns {'updated': ..., 'static': ...}, or None when `actuals`
+        does not reach past the holdout. The state itself is not changed.
+        """
+        cutoff = actuals['Date'].max() - pd.Timedelta(days=days)
+        holdout = actuals[actuals['Date'] > cutoff]
+        if holdout.empty or not (actuals['Date'] <= cutoff).any():
+            return None
+        updated = OnlineForecaster.from_forecaster(self).update(actuals[actuals['Date'] <= cutoff])
+        scores = {}
+        for label, model in (('updated', updated), ('static', self)):
+            forecast = model.predict(holdout['Date'].min(), holdout['Date'].max())
+            merged = holdout.merge(forecast[['Date'] + self.keys + [f'Forecast_{self.value}']],
+                                   on=['Date'] + self.keys)
+            actual = merged[self.value].to_numpy(dtype='float64')
+            error = merged[f'Forecast_{self.value}'].to_numpy(dtype='float64') - actual
+            scores[label] = np.abs(error).sum() / actual.sum() * 100
+        return scores
+
+    def save(self, data_dir, name=ONLINE_STATE_NAME):
+        """Write the state table (one row per series). Returns its path."""
+        return super().save(data_dir, name)
+
+    @classmethod
+    def load(cls, data_dir, name=ONLINE_STATE_NAME):
+        """OnlineForecaster with the state saved under `name` in `data_dir`."""
+        return super().load(data_dir, name)
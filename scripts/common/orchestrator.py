@@ -0,0 +1,176 @@
+"""
+DECODE X 2026 - Dependency-Aware Stage Orchestrator
+===================================================
+Runs the stage scripts as a DAG instead of the old exec() runners.
+
+Each Stage declares the files it reads and writes (paths relative to the
+data directory, globs allowed). A stage depends on every stage that
+produces one of its inputs. Before a stage runs, its inputs, its script
+and the shared common/ modules are fingerprinted; when that fingerprint
+matches the last successful run and all outputs still exist, the stage is
+skipped. Stages whose dependencies are settled run concurrently, each as
+its own Python process with stdout captured to its report file.
+
+Stage declarations live in scripts/runners/run_all.py.
+"""
+
+import fnmatch
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from common.context import CACHE_DIR_NAME, fingerprint
+from common.paths import DATA_DIR_ENV, DATA_SEARCH_DIRS
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMON_DIR = os.path.join(SCRIPTS_DIR, 'common')
+STATE_FILE = 'orchestrator_state.json'
+
+
+class Stage:
+    """One stage script with its declared input and output files."""
+
+    def __init__(self, name, script, inputs=(), outputs=(), report=None):
+        self.name = name
+        self.script = script  # relative to scripts/
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.report = report  # stdout capture, relative to the data directory
+
+    def __repr__(self):
+        return f'Stage({self.name!r})'
+
+
+def _matches(pattern, produced):
+    """True if an input pattern names a file another stage produces."""
+    return any(fnmatch.fnmatch(out, pattern) or fnmatch.fnmatch(pattern, out) for out in produced)
+
+
+def dependencies(stages):
+    """Stage name -> names of the stages producing one of its inputs."""
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = [other.name for other in stages
+                            if other is not stage and any(_matches(i, other.outputs) for i in stage.inputs)]
+    return deps
+
+
+def with_upstream(stages, names):
+    """`names` plus every stage they transitively depend on, in declaration order."""
+    deps = dependencies(stages)
+    wanted, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name not in deps:
+            raise ValueError(f"Unknown stage '{name}' (known: {', '.join(deps)})")
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+class Orchestrator:
+    """Skips unchanged stages and runs ready ones concurrently."""
+
+    def __init__(self, stages, data_dir, jobs=4, force=False, dry_run=False):
+        self.stages = stages
+        self.data_dir = str(data_dir)
+        self.jobs = jobs
+        self.force = force
+        self.dry_run = dry_run
+        self.deps = dependencies(stages)
+        self.state_path = os.path.join(self.data_dir, CACHE_DIR_NAME, STATE_FILE)
+        self.state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    # ---------- Fingerprints ----------
+
+    def _resolve(self, pattern):
+        for sub in DATA_SEARCH_DIRS:
+            found = sorted(glob.glob(os.path.join(self.data_dir, sub, pattern)))
+            if found:
+                return found
+        return []
+
+    def input_key(self, stage):
+        """Fingerprint of a stage's script, the common/ modules and its input files."""
+        code = [os.path.join(SCRIPTS_DIR, stage.script)] + sorted(glob.glob(os.path.join(COMMON_DIR, '*.py')))
+        files = [path for pattern in stage.inputs for path in self._resolve(pattern)]
+        return fingerprint(code + files, stage.inputs)
+
+    def outputs_exist(self, stage):
+        return all(self._resolve(pattern) for pattern in stage.outputs)
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+
+    # ---------- Execution ----------
+
+    def _execute(self, stage):
+        env = dict(os.environ, **{DATA_DIR_ENV: self.data_dir})
+        report_path = os.path.join(self.data_dir, stage.report or f'output/{stage.name}_output.txt')
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        start = time.time()
+        with open(report_path, 'w', encoding='utf-8') as report:
+            result = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, stage.script)],
+                                    cwd=self.data_dir, env=env, stdout=report, stderr=subprocess.STDOUT)
+        return result.returncode, time.time() - start, report_path
+
+    def run(self):
+        """Run every stage whose inputs changed. Returns {stage name: status}."""
+        status = {}
+        pending = list(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                ready = [stage for stage in pending
+                         if all(d in status for d in self.deps[stage.name])]
+                if not ready and not running:
+                    raise RuntimeError(f"Dependency cycle among {[stage.name for stage in pending]}")
+
+                for stage in ready:
+                    pending.remove(stage)
+                    dep_status = [status[d] for d in self.deps[stage.name]]
+                    if any(s in ('failed', 'blocked') for s in dep_status):
+                        status[stage.name] = 'blocked'
+                        print(f"  [blocked] {stage.name}: upstream stage failed")
+                        continue
+
+                    key = self.input_key(stage)
+                    unchanged = self.state.get(stage.name) == key and self.outputs_exist(stage)
+                    if unchanged and not self.force:
+                        status[stage.name] = 'skipped'
+                        print(f"  [skip]    {stage.name}: inputs unchanged")
+                    elif self.dry_run:
+                        status[stage.name] = 'would run'
+                        print(f"  [dry-run] {stage.name}: would run ({stage.script})")
+                    else:
+                        print(f"  [run]     {stage.name}: {stage.script}")
+                        running[pool.submit(self._execute, stage)] = (stage, key)
+
+                if not running:
+                    continue  # only skips/blocks this round; re-check what became ready
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = running.pop(future)
+                    returncode, elapsed, report_path = future.result()
+                    if returncode == 0:
+                        status[stage.name] = 'ran'
+                        self.state[stage.name] = key
+                        self._save_state()
+                        print(f"  [done]    {stage.name} in {elapsed:.1f}s -> {report_path}")
+                    else:
+                        status[stage.name] = 'failed'
+                        self.state.pop(stage.name, None)
+                        self._save_state()
+                        print(f"  [FAILED]  {stage.name} (exit {returncode}) -> see {report_path}")
+        return status
@@ -0,0 +1,21 @@
+"""
+DECODE X 2026 - Data Directory Resolution
+=========================================
+Every stage script keeps its own default DATA_DIR. The orchestrator
+(scripts/runners/run_all.py) runs them against one shared directory by
+setting DECODEX_DATA_DIR, which overrides that default.
+
+Files are looked up in DATA_SEARCH_DIRS under the data directory: the
+flat layout the orchestrator and stages 1-2 write first, then the
+data/generated, data/raw, data/shock layout of the repo checkout.
+"""
+
+import os
+
+DATA_DIR_ENV = 'DECODEX_DATA_DIR'
+DATA_SEARCH_DIRS = ('', 'data/generated', 'data/raw', 'data/shock')
+
+
+def data_dir(default):
+    """$DECODEX_DATA_DIR if set, else the calling script's `default`."""
+    return os.environ.get(DATA_DIR_ENV) or default
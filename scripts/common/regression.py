@@ -0,0 +1,92 @@
+"""
+DECODE X 2026 - Grouped Least-Squares Kernel
+============================================
+Simple linear regression y = slope * x + intercept for every group at
+once, from grouped sufficient statistics instead of one np.polyfit call
+per group.
+
+  fits = grouped_ols(daily, x='Congestion_Level', y='Total_Pax', by='Period')
+  fits.loc['Q3', 'Slope']
+
+Per group the kernel needs only n, the means of x and y and the centered
+sums Sxx, Sxy, Syy (the same information as n, Sum x, Sum y, Sum x^2,
+Sum xy, Sum y^2, kept centered so large values do not cancel). They come
+from a few np.bincount passes over the group codes, so any grouping
+(route, stop, route type, zone, period) costs one pass over the rows.
+
+Returned per group: N, Mean_X, Mean_Y, Slope, Intercept, R2, Slope_SE,
+Intercept_SE. A group whose x never varies gets slope 0 and intercept
+mean(y); standard errors need n > 2 and are NaN otherwise.
+"""
+
+import numpy as np
+import pandas as pd
+
+OLS_COLUMNS = ['N', 'Mean_X', 'Mean_Y', 'Slope', 'Intercept', 'R2', 'Slope_SE', 'Intercept_SE']
+
+
+def ols_from_moments(n, mean_x, mean_y, sxx, sxy, syy):
+    """OLS fit per group from its sufficient statistics (arrays, one entry per group)."""
+    n = np.asarray(n, dtype='float64')
+    slope = np.divide(sxy, sxx, out=np.zeros_like(n), where=sxx > 0)
+    intercept = mean_y - slope * mean_x
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = np.where(syy > 0, slope * sxy / syy, np.nan)
+        # Residual sum of squares, clipped at 0 against rounding
+        sigma2 = np.where(n > 2, np.maximum(syy - slope * sxy, 0) / (n - 2), np.nan)
+        slope_se = np.where(sxx > 0, np.sqrt(sigma2 / sxx), np.nan)
+        intercept_se = np.where(sxx > 0, np.sqrt(sigma2 * (1 / n + mean_x ** 2 / sxx)), np.nan)
+
+    return pd.DataFrame({'N': n.astype('int64'), 'Mean_X': mean_x, 'Mean_Y': mean_y,
+                         'Slope': slope, 'Intercept': intercept, 'R2': r2,
+                         'Slope_SE': slope_se, 'Intercept_SE': intercept_se})
+
+
+def ols_from_sums(n, sx, sy, sxx, sxy, syy):
+    """OLS fit per group from raw sums (n, Sum x, Sum y, Sum x^2, Sum xy, Sum y^2).
+
+    Raw sums add up, so prefix sums over ordered rows give the fit of every
+    prefix in O(1) each (see common/backtest.py).
+    """
+    n = np.asarray(n, dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x, mean_y = sx / n, sy / n
+    return ols_from_moments(n, mean_x, mean_y,
+                            np.maximum(sxx - n * mean_x ** 2, 0),
+                            sxy - n * mean_x * mean_y,
+                            np.maximum(syy - n * mean_y ** 2, 0))
+
+
+def ols_by_code(codes, x, y, n_groups=None):
+    """OLS fit per group code (0..n_groups-1) of y on x. Returns a frame indexed by code."""
+    codes = np.asarray(codes)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n_groups = int(codes.max()) + 1 if n_groups is None else n_groups
+
+    n = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.bincount(codes, weights=x, minlength=n_groups) / n
+        mean_y = np.bincount(codes, weights=y, minlength=n_groups) / n
+    dx = x - mean_x[codes]
+    dy = y - mean_y[codes]
+    sxx = np.bincount(codes, weights=dx * dx, minlength=n_groups)
+    sxy = np.bincount(codes, weights=dx * dy, minlength=n_groups)
+    syy = np.bincount(codes, weights=dy * dy, minlength=n_groups)
+    return ols_from_moments(n, mean_x, mean_y, sxx, sxy, syy)
+
+
+def grouped_ols(df, x, y, by=None):
+    """OLS fit of df[y] on df[x] per `by` group (column name or list), or overall.
+
+    Returns one row per group (indexed like a groupby on `by`) with OLS_COLUMNS.
+    """
+    if by is None:
+        fits = ols_by_code(np.zeros(len(df), dtype='int64'), df[x], df[y], n_groups=1)
+        fits.index = pd.Index(['all'])
+        return fits
+    groups = df.groupby(by, sort=True, observed=True)
+    fits = ols_by_code(groups.ngroup().to_numpy(), df[x], df[y], n_groups=groups.ngroups)
+    fits.index = groups.size().index
+    return fits
@@ -0,0 +1,92 @@
+"""
+DECODE X 2026 - Master Table Dtype Schema
+=========================================
+Declared compact dtypes for the master analytical dataset.
+
+  - Dimension strings (stop/route names, zones, types, season) -> category
+  - Small bounded integers (month, day-of-week, congestion, sequence) -> int8/int16
+  - Counts and IDs -> int32/int16, measurements -> float32
+
+stage1_pipeline.py applies the schema at build time and every loader
+enforces it, so all stages see the same dtypes whatever file they came from.
+
+NOTE: grouping by a categorical column must pass observed=True, otherwise
+pandas emits the full cartesian product of the category levels.
+"""
+
+import pandas as pd
+
+MASTER_SCHEMA = {
+    # Keys & counts
+    'Ridership_ID': 'int32',
+    'Route_ID': 'int16',
+    'Stop_ID': 'int16',
+    'Date': 'datetime64[ns]',
+    'Boarding_Count': 'int32',
+    'Alighting_Count': 'int32',
+    'Total_Pax': 'int32',
+    # Stop dimension
+    'Stop_Name': 'category',
+    'Latitude': 'float32',
+    'Longitude': 'float32',
+    'Stop_Type': 'category',
+    'Zone': 'category',
+    # Route dimension
+    'Route_Code': 'category',
+    'Route_Length_km': 'float32',
+    'Avg_Travel_Time_Min': 'int16',
+    'Route_Type': 'category',
+    # Route-stop mapping
+    'Stop_Sequence': 'int8',
+    'Dwell_Time_Min': 'float32',
+    # Traffic
+    'Congestion_Level': 'int8',
+    'Avg_Speed_kmph': 'float32',
+    # Calendar features
+    'Year': 'int16',
+    'Month': 'int8',
+    'DayOfWeek': 'int8',
+    'IsWeekend': 'int8',
+    'Quarter': 'int8',
+    'Season': 'category',
+    'YearMonth': 'period[M]',
+}
+
+
+# One row per calendar day (common/dates.py)
+DATE_DIM_SCHEMA = {
+    'Date': 'datetime64[ns]',
+    'Date_Key': 'int32',
+    'Year': 'int16',
+    'Month': 'int8',
+    'DayOfWeek': 'int8',
+    'IsWeekend': 'int8',
+    'Quarter': 'int8',
+    'ISO_Year': 'int16',
+    'ISO_Week': 'int8',
+    'Season': 'category',
+    'YearMonth': 'period[M]',
+}
+
+
+def apply_schema(df, schema=MASTER_SCHEMA):
+    """Cast every schema column present in `df` to its declared dtype (in place, returns df)."""
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype.startswith('datetime'):
+            df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def memory_report(df):
+    """Per-column dtype and deep memory footprint (bytes), largest first."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Dtype': df.dtypes.astype(str),
+        'Bytes': usage,
+    })
+    report.index.name = 'Column'
+    return report.sort_values('Bytes', ascending=False)
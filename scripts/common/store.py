@@ -0,0 +1,232 @@
+"""
+DECODE X 2026 - Columnar Master Store
+=====================================
+The master analytical dataset is written once by stage1_pipeline.py as a
+typed, compressed Parquet file. Every downstream stage reads it back with
+column projection, so dates arrive already parsed and only the columns a
+stage actually uses are decoded.
+
+The CSV remains available as an optional export (and as a read fallback
+for trees built before the Parquet store existed). Either way the loader
+enforces the compact dtypes declared in common.schema.
+
+Smaller derived tables (e.g. the date dimension) go through the same
+save_table / load_table pair.
+
+Incremental ingestion (stage1_pipeline.py --ingest) never rewrites a table:
+new rows are written as a tagged partition file under `<name>.parts/` and
+load_table returns the base file followed by every partition. A full
+rebuild through save_table drops the partitions it supersedes.
+
+Slices: a table saved with `row_groups=[keys]` is sorted by those keys and
+written as one Parquet row group per distinct key. The master uses
+Year/Month (optionally Year/Month/Route_ID), so each month is its own
+row group, and the row-group min/max statistics act as the partition
+index. load_table(filters=...) pushes the predicates down to them, and
+only matching row groups are read. Appended partitions reuse the base
+table's keys.
+
+  load_master(data_dir, columns=['Date', 'Total_Pax'], start='2025-01-01')
+  load_master(data_dir, routes=[3, 7], start='2024-07-01', end='2024-12-31')
+"""
+
+import glob
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common.schema import MASTER_SCHEMA, apply_schema
+
+MASTER_NAME = 'master_analytical_dataset'
+COMPRESSION = 'zstd'
+
+# Row-group keys of the master store; save_master(by_route=True) adds Route_ID
+MASTER_ROW_GROUPS = ['Year', 'Month']
+# Prefix of the Parquet key-value metadata entries save_table writes (row-group keys etc.)
+METADATA_PREFIX = b'decodex.'
+
+
+def table_path(data_dir, name, fmt='parquet'):
+    """Path of a stored table in the given format ('parquet' or 'csv')."""
+    return os.path.join(str(data_dir), f'{name}.{fmt}')
+
+
+def master_path(data_dir, fmt='parquet'):
+    """Path of the master dataset in the given format ('parquet' or 'csv')."""
+    return table_path(data_dir, MASTER_NAME, fmt)
+
+
+def partition_dir(data_dir, name):
+    """Directory holding the appended partitions of a stored table."""
+    return os.path.join(str(data_dir), f'{name}.parts')
+
+
+def list_partitions(data_dir, name):
+    """Appended partition files of a table, in append order."""
+    return sorted(glob.glob(os.path.join(partition_dir(data_dir, name), '*.parquet')))
+
+
+def to_storable(df):
+    """Copy of `df` with Period columns as 'YYYY-MM' text (Parquet/Arrow-safe)."""
+    out_df = df.copy()
+    for col in out_df.columns:
+        if isinstance(out_df[col].dtype, pd.PeriodDtype):
+            # Same text the CSV always carried
+            out_df[col] = out_df[col].astype(str)
+    return out_df
+
+
+def table_metadata(path):
+    """Key-value metadata a Parquet table was saved with (see save_table)."""
+    metadata = pq.read_schema(path).metadata or {}
+    return {key[len(METADATA_PREFIX):].decode(): json.loads(value)
+            for key, value in metadata.items() if key.startswith(METADATA_PREFIX)}
+
+
+def row_group_keys(path):
+    """Row-group keys a Parquet file was written with (None if unsliced)."""
+    return table_metadata(path).get('row_groups')
+
+
+def _write_parquet(df, path, row_groups=None, metadata=None):
+    """Write `df` to `path`, one row group per distinct `row_groups` key if given."""
+    metadata = dict(metadata or {})
+    if not row_groups and not metadata:
+        df.to_parquet(path, index=False, compression=COMPRESSION)
+        return
+
+    if row_groups:
+        metadata['row_groups'] = row_groups
+        df = df.sort_values(row_groups, kind='stable', ignore_index=True)
+        group_ids = df.groupby(row_groups, sort=False, observed=True).ngroup().to_numpy()
+        starts = np.flatnonzero(np.diff(group_ids, prepend=-1))
+    else:
+        starts = np.array([0])
+    stops = np.append(starts[1:], len(df))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        **{METADATA_PREFIX + key.encode(): json.dumps(value).encode() for key, value in metadata.items()},
+    })
+    with pq.ParquetWriter(path, table.schema, compression=COMPRESSION) as writer:
+        for start, stop in zip(starts, stops):
+            writer.write_table(table.slice(start, stop - start), row_group_size=max(stop - start, 1))
+
+
+def save_table(df, data_dir, name, export_csv=False, row_groups=None, metadata=None):
+    """Write `df` as Parquet (and optionally as CSV). Returns the Parquet path.
+
+    `metadata` (JSON-serializable values) is kept in the Parquet footer and
+    read back with table_metadata(). This is a full rewrite: partitions
+    appended since the last save are removed.
+    """
+    out_df = to_storable(df)
+
+    output_path = table_path(data_dir, name)
+    _write_parquet(out_df, output_path, row_groups, metadata)
+    shutil.rmtree(partition_dir(data_dir, name), ignore_errors=True)
+    if export_csv:
+        out_df.to_csv(table_path(data_dir, name, 'csv'), index=False)
+    return output_path
+
+
+def append_partition(df, data_dir, name, tag):
+    """Append `df` to a stored table as partition `tag`. Returns the partition path.
+
+    The partition is sliced into row groups the same way as the base table.
+    """
+    base_path = table_path(data_dir, name)
+    if not os.path.exists(base_path):
+        raise FileNotFoundError(f"No base table '{name}' in {data_dir}; run a full build first")
+
+    part_dir = partition_dir(data_dir, name)
+    os.makedirs(part_dir, exist_ok=True)
+    # Zero-padded sequence number keeps append order under a sorted listing
+    seq = len(list_partitions(data_dir, name))
+    output_path = os.path.join(part_dir, f'{seq:05d}_{tag}.parquet')
+    _write_parquet(to_storable(df), output_path, row_group_keys(base_path))
+    return output_path
+
+
+def filter_mask(df, filters):
+    """Boolean mask of the rows of `df` matching every (column, op, value) filter;
+    op is '>=', '<=', '==' or 'in'."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        values = df[col]
+        if op == 'in':
+            mask &= values.isin(value).to_numpy()
+        else:
+            mask &= {'>=': values.ge, '<=': values.le, '==': values.eq}[op](value).to_numpy()
+    return mask
+
+
+def apply_filters(df, filters):
+    """Rows of `df` matching every (column, op, value) filter (see filter_mask)."""
+    return df[filter_mask(df, filters)].reset_index(drop=True)
+
+
+def load_table(data_dir, name, columns=None, schema=None, filters=None):
+    """Load a stored table (base + appended partitions), reading only `columns`,
+    and enforce `schema` if given.
+
+    `filters` is a list of (column, op, value) predicates, all of which must
+    hold. For Parquet they are pushed down, so row groups whose statistics
+    rule them out are never read.
+    """
+    parquet_path = table_path(data_dir, name)
+    if os.path.exists(parquet_path):
+        parts = [pd.read_parquet(path, columns=columns, filters=filters or None)
+                 for path in [parquet_path] + list_partitions(data_dir, name)]
+        df = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+    else:
+        filter_columns = [col for col, _, _ in filters or []]
+        usecols = None if columns is None else list(dict.fromkeys(columns + filter_columns))
+        df = pd.read_csv(table_path(data_dir, name, 'csv'), usecols=usecols)
+        if filters:
+            df = apply_filters(apply_schema(df, schema) if schema else df, filters)
+            df = df if columns is None else df[columns]
+    return apply_schema(df, schema) if schema else df
+
+
+def count_rows(data_dir, name):
+    """Row count of a stored Parquet table (base + partitions), from the file footers only."""
+    paths = [table_path(data_dir, name)] + list_partitions(data_dir, name)
+    return sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+
+
+def master_filters(start=None, end=None, routes=None):
+    """Filters selecting master rows with start <= Date <= end and Route_ID in routes."""
+    filters = []
+    if start is not None:
+        filters.append(('Date', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('Date', '<=', pd.Timestamp(end)))
+    if routes is not None:
+        filters.append(('Route_ID', 'in', [int(route) for route in routes]))
+    return filters
+
+
+def save_master(master_df, data_dir, export_csv=False, by_route=False):
+    """Write the master table as Parquet (and optionally as CSV). Returns the Parquet path.
+
+    Rows are sliced into one row group per month, or per month and route
+    with `by_route`.
+    """
+    row_groups = MASTER_ROW_GROUPS + ['Route_ID'] if by_route else MASTER_ROW_GROUPS
+    return save_table(master_df, data_dir, MASTER_NAME, export_csv=export_csv, row_groups=row_groups)
+
+
+def load_master(data_dir, columns=None, start=None, end=None, routes=None):
+    """Load the master table, reading only `columns` (all columns if None).
+
+    `start` / `end` (inclusive dates) and `routes` (Route_IDs) restrict the
+    rows; only the row groups that can hold matching rows are read.
+    """
+    return load_table(data_dir, MASTER_NAME, columns=columns, schema=MASTER_SCHEMA,
+                      filters=master_filters(start, end, routes))
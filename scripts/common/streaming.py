@@ -0,0 +1,164 @@
+"""
+DECODE X 2026 - Chunked Streaming Master Build
+==============================================
+Builds the master store from a ridership CSV of any size in bounded-size
+chunks (stage1_pipeline.py --chunksize N). Each chunk is enriched against
+the in-memory dimension tables, given its calendar features and compact
+dtypes, and appended straight to the master store; only the dimensions,
+one chunk and a few small partial aggregates are ever held in memory.
+The load profile and demand cube are folded in chunk by chunk with their
+extend() methods, as ingest_drop does for a new drop.
+
+The Step 4 integrity counters and Step 6 diagnostics are kept as partials
+(sums, counts, min/max, distinct-value sets) that merge across chunks by
+addition. The in-memory build fills the same objects from the whole table
+in one update, so both paths print the same report.
+"""
+
+import pandas as pd
+
+from common.cube import DemandCube
+from common.dates import add_calendar_features
+from common.ingest import merge_aggregates, running_aggregates
+from common.joins import enrich
+from common.loads import LoadProfile
+from common.schema import apply_schema
+from common.store import MASTER_NAME, append_partition, save_master, table_path
+
+# Step 6 diagnostics: group keys -> measures summed per group
+DIAGNOSTIC_GROUPS = {
+    'yearly': (['Year'], ['Total_Pax']),
+    'seasonal': (['Season'], ['Total_Pax']),
+    'daytype': (['IsWeekend'], ['Total_Pax']),
+    'routetype': (['Route_Type'], ['Total_Pax']),
+    'zone': (['Zone'], ['Total_Pax']),
+    'congestion': (['Congestion_Level'], ['Total_Pax', 'Avg_Speed_kmph', 'Boarding_Count', 'Alighting_Count']),
+    'stops': (['Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type'], ['Total_Pax']),
+    'routes': (['Route_ID', 'Route_Code', 'Route_Type'], ['Total_Pax']),
+    'monthly': (['YearMonth'], ['Total_Pax']),
+}
+
+# Step 4 distinct-value listings (order of first appearance, like Series.unique)
+LISTED_COLUMNS = ['Route_Type', 'Zone', 'Stop_Type']
+
+
+class IntegrityCounters:
+    """Row counts, nulls per column, value ranges and distinct keys, mergeable across chunks."""
+
+    def __init__(self):
+        self.rows_in = 0
+        self.rows_out = 0
+        self.nulls = None
+        self.joins = None
+        self.pax_sum = 0
+        self.pax_min = None
+        self.pax_max = None
+        self.date_min = None
+        self.date_max = None
+        self.routes = set()
+        self.stops = set()
+        self.dates = set()
+        self.listed = {col: {} for col in LISTED_COLUMNS}
+
+    def update(self, rows_in, master_df, join_report):
+        """Fold one enriched chunk (before calendar features) into the counters."""
+        self.rows_in += rows_in
+        self.rows_out += len(master_df)
+        nulls = master_df.isnull().sum()
+        self.nulls = nulls if self.nulls is None else self.nulls.add(nulls, fill_value=0).astype('int64')
+        self.joins = join_report if self.joins is None else self.joins + join_report
+
+        pax = master_df['Total_Pax']
+        self.pax_sum += int(pax.sum())
+        self.pax_min = pax.min() if self.pax_min is None else min(self.pax_min, pax.min())
+        self.pax_max = pax.max() if self.pax_max is None else max(self.pax_max, pax.max())
+        dates = master_df['Date']
+        self.date_min = dates.min() if self.date_min is None else min(self.date_min, dates.min())
+        self.date_max = dates.max() if self.date_max is None else max(self.date_max, dates.max())
+
+        self.routes.update(master_df['Route_ID'].unique().tolist())
+        self.stops.update(master_df['Stop_ID'].unique().tolist())
+        self.dates.update(dates.unique().tolist())
+        for col, seen in self.listed.items():
+            seen.update(dict.fromkeys(master_df[col].unique().tolist()))
+
+    @property
+    def pax_mean(self):
+        return self.pax_sum / self.rows_out
+
+
+class DiagnosticAggregates:
+    """Per-group sums and record counts for the Step 6 diagnostics, mergeable across chunks."""
+
+    def __init__(self, groups=DIAGNOSTIC_GROUPS):
+        self.groups = groups
+        self.partials = {}
+
+    def update(self, master_df):
+        """Fold one chunk (with calendar features and schema applied) into the partials."""
+        for name, (keys, measures) in self.groups.items():
+            grouped = master_df.groupby(keys, observed=True)
+            # float64 sums: float32 running sums would drift over many chunks
+            partial = grouped[measures].sum().astype({
+                col: 'float64' for col in measures if pd.api.types.is_float_dtype(master_df[col])
+            })
+            partial['Records'] = grouped.size()
+            if name in self.partials:
+                merged = pd.concat([self.partials[name], partial])
+                partial = merged.groupby(level=list(range(merged.index.nlevels)), observed=True).sum()
+            self.partials[name] = partial
+
+    def sums(self, name):
+        """Per-group sums plus a Records count."""
+        return self.partials[name]
+
+    def means(self, name):
+        """Per-group means of every measure plus a Records count."""
+        partial = self.partials[name]
+        means = partial.drop(columns='Records').div(partial['Records'], axis=0)
+        means['Records'] = partial['Records']
+        return means
+
+
+def stream_master(ridership_path, dimensions, date_dim, data_dir, chunksize, export_csv=False,
+                  by_route=False):
+    """Enrich and store the master table chunk by chunk.
+
+    Returns (integrity, diagnostics, aggregates, load_profile, cube,
+    n_chunks); aggregates are the running monthly/route-daily tables from
+    common.ingest. `by_route` is passed on to save_master.
+    """
+    integrity = IntegrityCounters()
+    diagnostics = DiagnosticAggregates()
+    aggregates = load_profile = cube = None
+    csv_path = table_path(data_dir, MASTER_NAME, 'csv')
+
+    n_chunks = 0
+    for chunk in pd.read_csv(ridership_path, chunksize=chunksize):
+        rows_in = len(chunk)
+        chunk['Total_Pax'] = chunk['Boarding_Count'] + chunk['Alighting_Count']
+        chunk['Date'] = pd.to_datetime(chunk['Date'])
+
+        master_chunk, join_report = enrich(chunk, dimensions)
+        integrity.update(rows_in, master_chunk, join_report)
+
+        master_chunk = apply_schema(add_calendar_features(master_chunk, date_dim))
+        diagnostics.update(master_chunk)
+        partials = running_aggregates(master_chunk)
+        aggregates = partials if aggregates is None else merge_aggregates(aggregates, partials)
+        # A day split across chunks adds up in extend(), like a drop extending a stored day
+        profile_part, cube_part = LoadProfile.from_master(master_chunk), DemandCube.from_master(master_chunk)
+        load_profile = profile_part if load_profile is None else load_profile.extend(profile_part)
+        cube = cube_part if cube is None else cube.extend(cube_part)
+
+        # First chunk replaces the stored master (and its old partitions)
+        if n_chunks == 0:
+            save_master(master_chunk, data_dir, by_route=by_route)
+        else:
+            append_partition(master_chunk, data_dir, MASTER_NAME, f'chunk{n_chunks:05d}')
+        if export_csv:
+            master_chunk.to_csv(csv_path, mode='w' if n_chunks == 0 else 'a',
+                                header=n_chunks == 0, index=False)
+        n_chunks += 1
+
+    return integrity, diagnostics, aggregates, load_profile, cube, n_chunks
@@ -0,0 +1,153 @@
+"""
+DECODE X 2026 - Incremental Corridor Views
+==========================================
+The corridor scorecards (route efficiency, overload / waste risk, stop
+bottlenecks, zone pressure) as a materialized view that is kept current
+by folding in only the days appended since it was last refreshed.
+
+  view = CorridorView.refresh(ctx, start='2025-01-01', end='2025-06-30')
+  route_df = view.summary(['Route_ID', 'Route_Code', 'Route_Type'])
+  zone_df = view.summary('Zone')
+
+The stored state (<data_dir>/corridor_view.parquet) has one row per
+route-stop pair with the sufficient statistics of every master row from
+`start` to `end` (open-ended if None): Records, the sum of each
+VIEW_MEASURES column and the sum of squares of Total_Pax, plus the pair's
+fixed attributes. Sums, counts and
+sums of squares merge by addition, so a refresh reads only the master row
+groups after the view's Last_Date and adds their partial aggregates.
+summary() rolls the pairs up to any grouping and derives per-row means and
+the Total_Pax standard deviation from the sums alone:
+
+  mean = sum / n        std = sqrt((sum_sq - sum^2 / n) / (n - 1))
+
+The view records the master partitions it has folded in. A refresh folds
+incrementally only when the master gained partitions that all start after
+Last_Date; a full master rebuild (new base file), a removed partition, a
+drop dated at or before Last_Date (ingested out of order) or a different
+`start` / `end` rebuilds the view from the window.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.store import MASTER_NAME, list_partitions, load_table, save_table, table_metadata, table_path
+
+CORRIDOR_VIEW_NAME = 'corridor_view'
+PAIR_KEYS = ['Route_ID', 'Route_Code', 'Route_Type', 'Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type']
+# Per-pair constants, carried as attributes
+PAIR_FIXED = ['Route_Length_km', 'Avg_Travel_Time_Min', 'Dwell_Time_Min', 'Stop_Sequence']
+VIEW_MEASURES = ['Total_Pax', 'Boarding_Count', 'Alighting_Count', 'Congestion_Level', 'Avg_Speed_kmph',
+                 'Dwell_Time_Min']
+VIEW_COLUMNS = ['Date'] + PAIR_KEYS + list(dict.fromkeys(PAIR_FIXED + VIEW_MEASURES))
+
+
+def pair_aggregates(rows):
+    """Sufficient statistics per route-stop pair of master `rows` (VIEW_COLUMNS)."""
+    grouped = rows.groupby(PAIR_KEYS, observed=True, sort=True)
+    out = grouped[PAIR_FIXED].first()
+    out['Records'] = grouped.size()
+    sums = grouped[VIEW_MEASURES].sum().astype('float64')
+    out[[f'{m}_Sum' for m in VIEW_MEASURES]] = sums.to_numpy()
+    out['Total_Pax_SumSq'] = (rows['Total_Pax'].astype('float64') ** 2).groupby(
+        [rows[k] for k in PAIR_KEYS], observed=True, sort=True).sum().to_numpy()
+    return out.reset_index()
+
+
+def merge_pair_aggregates(left, right):
+    """Pair statistics of two row sets: counts and sums add, fixed attributes are kept."""
+    combined = pd.concat([left, right], ignore_index=True)
+    grouped = combined.groupby(PAIR_KEYS, observed=True, sort=True)
+    additive = [col for col in combined.columns if col not in PAIR_KEYS + PAIR_FIXED]
+    out = grouped[PAIR_FIXED].first()
+    out[additive] = grouped[additive].sum()
+    return out.reset_index()
+
+
+def _master_stamp(ctx):
+    """Size and mtime of the master's base file; changes only on a full rebuild."""
+    stat = os.stat(ctx.master_file())
+    return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+
+def _master_partitions(ctx):
+    """File names of the partitions appended to the master (by --ingest)."""
+    return [os.path.basename(path) for path in list_partitions(os.path.dirname(ctx.master_file()), MASTER_NAME)]
+
+
+def _folds_in_order(ctx, folded, last_date):
+    """True if the master only gained partitions since `folded`, all dated after `last_date`."""
+    current = _master_partitions(ctx)
+    if not set(folded) <= set(current):
+        return False
+    directory = os.path.dirname(ctx.master_file())
+    for name in set(current) - set(folded):
+        dates = pd.read_parquet(os.path.join(directory, f'{MASTER_NAME}.parts', name), columns=['Date'])['Date']
+        if len(dates) and dates.min() <= last_date:
+            return False
+    return True
+
+
+class CorridorView:
+    """Route-stop sufficient statistics from `start` to `end`, rolled up on demand."""
+
+    def __init__(self, pairs, start, last_date, folded_rows=0, end=None):
+        self.pairs = pairs
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end) if end is not None else None
+        self.last_date = pd.Timestamp(last_date) if last_date is not None else None
+        self.folded_rows = folded_rows   # master rows read by the refresh that produced this view
+
+    @classmethod
+    def refresh(cls, ctx, start, end=None, name=CORRIDOR_VIEW_NAME):
+        """View over master rows from `start` to `end`, updated with the days added since it was saved."""
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end) if end is not None else None
+        window = {'start': str(start.date()), 'end': str(end.date()) if end is not None else None}
+        stamp = _master_stamp(ctx)
+        path = table_path(ctx.data_dir, name)
+        pairs, last_date, metadata = None, None, {}
+        if os.path.exists(path):
+            metadata = table_metadata(path)
+            if {key: metadata.get(key) for key in window} == window and metadata.get('master') == stamp:
+                last_date = pd.Timestamp(metadata['last_date']) if metadata.get('last_date') else None
+                if last_date is not None and _folds_in_order(ctx, metadata.get('partitions', []), last_date):
+                    pairs = load_table(ctx.data_dir, name)
+                else:
+                    last_date = None
+
+        fold_from = start if last_date is None else max(start, last_date + pd.Timedelta(days=1))
+        partitions = _master_partitions(ctx)
+        rows = ctx.master(columns=VIEW_COLUMNS, start=fold_from, end=end)
+        if pairs is None or len(rows) or partitions != metadata.get('partitions'):
+            partial = pair_aggregates(rows)
+            pairs = partial if pairs is None else merge_pair_aggregates(pairs, partial)
+            if len(rows):
+                last_date = rows['Date'].max()
+            save_table(pairs, ctx.data_dir, name, metadata={
+                **window, 'last_date': str(last_date.date()) if last_date is not None else None,
+                'master': stamp, 'partitions': partitions})
+        return cls(pairs, start, last_date, folded_rows=len(rows), end=end)
+
+    def summary(self, by):
+        """Rows, sums, per-row means and Total_Pax standard deviation per `by` group.
+
+        Columns: `by`, Records, <measure>_Sum and <measure>_Mean for each
+        VIEW_MEASURES column, Total_Pax_Std, the pair attributes in
+        PAIR_FIXED (first per group) and Num_Stops (distinct stops).
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        grouped = self.pairs.groupby(by, observed=True, sort=True)
+        sum_cols = [f'{m}_Sum' for m in VIEW_MEASURES]
+        out = grouped[['Records'] + sum_cols + ['Total_Pax_SumSq']].sum()
+        n = out['Records'].to_numpy(dtype='float64')
+        for m in VIEW_MEASURES:
+            out[f'{m}_Mean'] = out[f'{m}_Sum'] / n
+        total = out['Total_Pax_Sum'].to_numpy()
+        variance = (out['Total_Pax_SumSq'].to_numpy() - total * total / n) / np.where(n > 1, n - 1, np.nan)
+        out['Total_Pax_Std'] = np.sqrt(np.maximum(variance, 0))
+        out[PAIR_FIXED] = grouped[PAIR_FIXED].first()
+        out['Num_Stops'] = grouped['Stop_ID'].nunique()
+        return out.drop(columns='Total_Pax_SumSq').reset_index()
@@ -0,0 +1,107 @@
+"""
+Run the full analysis as a dependency graph (see common/orchestrator.py).
+
+    python scripts/runners/run_all.py                 # everything that changed
+    python scripts/runners/run_all.py stage2_charts   # one stage + whatever upstream changed
+    python scripts/runners/run_all.py --dry-run       # show what would run
+    python scripts/runners/run_all.py --force         # ignore fingerprints, rerun all
+
+Unchanged stages are skipped; independent stages run concurrently.
+Reports go to <data dir>/output/stage*/ as before.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.orchestrator import Orchestrator, Stage, with_upstream
+from common.paths import data_dir
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+
+MASTER = ['master_analytical_dataset.parquet', 'master_analytical_dataset.parts/*.parquet']
+ROUTES, STOPS, MAPPING = 'Bus_Routes.csv', 'Bus_Stops.csv', 'Route_Stop_Mapping.csv'
+FORECAST = 'forecast_h2_2025.csv'
+FORECAST_PARAMS = 'forecast_params.parquet'
+FORECAST_HIERARCHY = 'forecast_hierarchy_h2_2025.parquet'
+LOAD_PROFILE = 'load_profile.npz'
+CUBE = 'demand_cube.npz'
+STOP_FORECAST = ['forecast_stops_h2_2025.csv', 'forecast_params_stops.parquet']
+RESIDUALS = ['forecast_params_residuals.parquet', 'forecast_params_stops_residuals.parquet']
+REVISED = 'revised_forecast_q4_2025.csv'
+SHOCK = ['Shock_Ridership_2025_Q3.csv', 'Shock_Traffic_2025_Q3.csv']
+Q4 = ['OutOfTime_Ridership_2025_Q4.csv', 'OutOfTime_Traffic_2025_Q4.csv']
+
+STAGES = [
+    Stage('pipeline', 'stage1/stage1_pipeline.py',
+          inputs=[ROUTES, STOPS, MAPPING, 'Train_Ridership_2022_to_2025H1.csv', 'Train_Traffic_2022_to_2025H1.csv'],
+          outputs=[MASTER[0], 'date_dimension.parquet', 'agg_monthly.parquet', 'agg_route_daily.parquet',
+                   LOAD_PROFILE, CUBE],
+          report='output/stage1/stage1_output.txt'),
+    Stage('forecast', 'stage1/stage1_forecast.py',
+          inputs=MASTER + ['date_dimension.parquet', ROUTES, STOPS, MAPPING],
+          outputs=[FORECAST, FORECAST_PARAMS, FORECAST_HIERARCHY] + STOP_FORECAST + RESIDUALS,
+          report='output/stage1/forecast_output.txt'),
+    Stage('backtest', 'stage1/stage1_backtest.py',
+          inputs=MASTER + ['date_dimension.parquet'],
+          outputs=['backtest_scores.csv', 'backtest_errors.parquet'],
+          report='output/stage1/backtest_output.txt'),
+    Stage('model_selection', 'stage1/stage1_model_selection.py',
+          inputs=MASTER,
+          outputs=['model_selection.csv', 'forecast_zoo_h2_2025.csv'],
+          report='output/stage1/model_selection_output.txt'),
+    Stage('corridor', 'stage1/stage1_corridor_analysis.py',
+          inputs=MASTER + [FORECAST, ROUTES, STOPS, MAPPING, LOAD_PROFILE, CUBE],
+          outputs=['corridor_view.parquet', 'route_od.parquet', 'segment_flows.parquet',
+                   'route_geometry.parquet'],
+          report='output/stage1/corridor_output.txt'),
+    Stage('fleet', 'stage1/stage1_fleet_reallocation.py',
+          inputs=[CUBE, FORECAST, ROUTES, MAPPING],
+          report='output/stage1/fleet_output.txt'),
+    Stage('stage1_charts', 'stage1/stage1_visualizations.py',
+          inputs=MASTER + [CUBE, FORECAST, ROUTES],
+          outputs=['charts/0*.png', 'charts/1[0-2]_*.png'],
+          report='output/stage1/visualizations_output.txt'),
+    Stage('growth_charts', 'stage1/growth_decomposition.py',
+          inputs=MASTER + [FORECAST, FORECAST_HIERARCHY],
+          outputs=['charts/13_growth_decomposition.png', 'charts/14_growth_decomposition_season.png'],
+          report='output/stage1/growth_output.txt'),
+    Stage('stage2', 'stage2/stage2_shock_analysis.py',
+          inputs=MASTER + [CUBE, FORECAST, FORECAST_PARAMS, ROUTES, STOPS, MAPPING] + SHOCK,
+          outputs=[REVISED],
+          report='output/stage2/stage2_output.txt'),
+    Stage('stage2_charts', 'stage2/stage2_visualizations.py',
+          inputs=[CUBE, FORECAST, REVISED, ROUTES, SHOCK[0]],
+          outputs=['charts/s2_*.png'],
+          report='output/stage2/visualizations_output.txt'),
+    Stage('stage3', 'stage3/stage3_accountability.py',
+          inputs=MASTER + [FORECAST, FORECAST_PARAMS, REVISED, ROUTES] + SHOCK + Q4,
+          report='output/stage3/stage3_output.txt'),
+    Stage('stage3_charts', 'stage3/stage3_visualizations.py',
+          outputs=['charts/stage3/s3_*.png'],
+          report='output/stage3/visualizations_output.txt'),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the analysis stages as a dependency graph')
+    parser.add_argument('stages', nargs='*', help='stages to bring up to date (default: all)')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='data directory shared by all stages')
+    parser.add_argument('--jobs', type=int, default=4, help='stages run concurrently (default: 4)')
+    parser.add_argument('--force', action='store_true', help='rerun stages even if their inputs are unchanged')
+    parser.add_argument('--dry-run', action='store_true', help='only report which stages would run')
+    args = parser.parse_args(argv)
+
+    stages = with_upstream(STAGES, args.stages) if args.stages else STAGES
+    print(f"Orchestrating {len(stages)} stages in {args.data_dir}")
+    status = Orchestrator(stages, args.data_dir, jobs=args.jobs,
+                          force=args.force, dry_run=args.dry_run).run()
+
+    failed = [name for name, s in status.items() if s in ('failed', 'blocked')]
+    counts = {s: list(status.values()).count(s) for s in dict.fromkeys(status.values())}
+    print("Done: " + ", ".join(f"{n} {s}" for s, n in counts.items()))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
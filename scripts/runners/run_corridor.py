@@ -1,5 +1,6 @@
-"""Wrapper to run corridor analysis and capture output."""
+"""Bring the corridor analysis (and anything upstream that changed) up to date via run_all.py."""
 import sys
-sys.stdout = open(r'c:\Users\asus\Desktop\decodex\corridor_output.txt', 'w', encoding='utf-8')
-exec(open(r'c:\Users\asus\Desktop\decodex\stage1_corridor_analysis.py', encoding='utf-8').read())
-sys.stdout.close()
+
+from run_all import main
+
+sys.exit(main(['corridor'] + sys.argv[1:]))
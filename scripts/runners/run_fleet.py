@@ -1,5 +1,6 @@
-"""Wrapper to run fleet reallocation and capture output."""
+"""Bring the fleet reallocation (and anything upstream that changed) up to date via run_all.py."""
 import sys
-sys.stdout = open(r'c:\Users\asus\Desktop\decodex\fleet_output.txt', 'w', encoding='utf-8')
-exec(open(r'c:\Users\asus\Desktop\decodex\stage1_fleet_reallocation.py', encoding='utf-8').read())
-sys.stdout.close()
+
+from run_all import main
+
+sys.exit(main(['fleet'] + sys.argv[1:]))
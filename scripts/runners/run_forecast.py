@@ -1,5 +1,6 @@
-"""Wrapper to run forecast and capture output."""
+"""Bring the Stage 1 H2 2025 forecast (and anything upstream that changed) up to date via run_all.py."""
 import sys
-sys.stdout = open(r'c:\Users\asus\Desktop\decodex\forecast_output.txt', 'w', encoding='utf-8')
-exec(open(r'c:\Users\asus\Desktop\decodex\stage1_forecast.py', encoding='utf-8').read())
-sys.stdout.close()
+
+from run_all import main
+
+sys.exit(main(['forecast'] + sys.argv[1:]))
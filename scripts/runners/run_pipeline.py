@@ -1,14 +1,6 @@
-"""Quick wrapper to run the pipeline and capture output to a file."""
+"""Bring the Stage 1 master merge & diagnostics (and anything upstream that changed) up to date via run_all.py."""
 import sys
-import os
 
-os.chdir(r'c:\Users\asus\Desktop\decodex')
+from run_all import main
 
-# Redirect stdout to file
-original_stdout = sys.stdout
-with open('stage1_output.txt', 'w', encoding='utf-8') as f:
-    sys.stdout = f
-    exec(open('stage1_pipeline.py', encoding='utf-8').read(), {'__file__': r'c:\Users\asus\Desktop\decodex\stage1_pipeline.py'})
-    sys.stdout = original_stdout
-
-print("Done! Results written to stage1_output.txt")
+sys.exit(main(['pipeline'] + sys.argv[1:]))
@@ -0,0 +1,105 @@
+"""
+Run the four Stage 1 consumers (corridor, fleet, charts, growth) in a
+process pool over one shared copy of the base frames.
+
+    python scripts/runners/run_stage1_parallel.py [--data-dir DIR] [--jobs N]
+
+The parent loads the master, forecast, routes and mapping once through
+DataContext and publishes them as memory-mapped Arrow files (see
+common/context.py). Each worker runs one script with its DataContext
+mapping those files instead of re-reading the store, and writes its stdout
+to the same report file run_all.py uses (output/stage1/*.txt). Needs
+stage1_pipeline.py and stage1_forecast.py to have run.
+"""
+import argparse
+import multiprocessing
+import os
+import runpy
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.context import CACHE_DIR_NAME, SHARED_DIR_ENV, DataContext, publish_shared
+from common.paths import DATA_DIR_ENV, data_dir
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, script relative to scripts/, report relative to the data directory), in report order
+CONSUMERS = [
+    ('corridor', 'stage1/stage1_corridor_analysis.py', 'output/stage1/corridor_output.txt'),
+    ('fleet', 'stage1/stage1_fleet_reallocation.py', 'output/stage1/fleet_output.txt'),
+    ('stage1_charts', 'stage1/stage1_visualizations.py', 'output/stage1/visualizations_output.txt'),
+    ('growth_charts', 'stage1/growth_decomposition.py', 'output/stage1/growth_output.txt'),
+]
+
+
+def _run_consumer(script, report_path, data_dir, shared_dir):
+    """Worker: run one script with stdout/stderr going to its report. Returns (ok, seconds)."""
+    os.environ[DATA_DIR_ENV] = data_dir
+    os.environ[SHARED_DIR_ENV] = shared_dir
+    os.chdir(data_dir)
+    start = time.time()
+    ok = True
+    with open(report_path, 'w', encoding='utf-8') as report, redirect_stdout(report), redirect_stderr(report):
+        try:
+            runpy.run_path(os.path.join(SCRIPTS_DIR, script), run_name='__main__')
+        except SystemExit as exc:
+            ok = exc.code in (None, 0)
+        except Exception:
+            traceback.print_exc()
+            ok = False
+    return ok, time.time() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Stage 1 consumers in parallel over shared frames')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='data directory shared by all stages')
+    parser.add_argument('--jobs', type=int, default=len(CONSUMERS), help='worker processes (default: 4)')
+    args = parser.parse_args(argv)
+    data_dir = os.path.abspath(args.data_dir)
+
+    start = time.time()
+    ctx = DataContext(data_dir)
+    master_df = ctx.master()
+    ctx.forecast()
+    ctx.routes()
+    ctx.mapping()
+    shared_dir = os.path.join(data_dir, CACHE_DIR_NAME, f'shared-{os.getpid()}')
+    paths = publish_shared(shared_dir)
+    size_mb = sum(os.path.getsize(path) for path in paths) / 1e6
+    print(f"Published {len(paths)} frames ({len(master_df):,} master rows, {size_mb:.1f} MB) "
+          f"in {time.time() - start:.1f}s")
+    del master_df
+
+    failed = []
+    try:
+        # spawn: a forked child would inherit the parent's Arrow thread pools mid-use
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=args.jobs, mp_context=context) as pool:
+            futures = []
+            for name, script, report in CONSUMERS:
+                report_path = os.path.join(data_dir, report)
+                os.makedirs(os.path.dirname(report_path), exist_ok=True)
+                futures.append((name, report_path,
+                                pool.submit(_run_consumer, script, report_path, data_dir, shared_dir)))
+            for name, report_path, future in futures:
+                ok, elapsed = future.result()
+                if ok:
+                    print(f"  [done]    {name} in {elapsed:.1f}s -> {report_path}")
+                else:
+                    failed.append(name)
+                    print(f"  [FAILED]  {name} -> see {report_path}")
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    print(f"Done in {time.time() - start:.1f}s: {len(CONSUMERS) - len(failed)} ran, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
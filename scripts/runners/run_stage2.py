@@ -1,5 +1,6 @@
-"""Wrapper to run Stage 2 analysis and capture output."""
+"""Bring the Stage 2 shock analysis (and anything upstream that changed) up to date via run_all.py."""
 import sys
-sys.stdout = open(r'c:\Users\asus\Desktop\decodex\stage2_output.txt', 'w', encoding='utf-8')
-exec(open(r'c:\Users\asus\Desktop\decodex\stage2_shock_analysis.py', encoding='utf-8').read())
-sys.stdout.close()
+
+from run_all import main
+
+sys.exit(main(['stage2'] + sys.argv[1:]))
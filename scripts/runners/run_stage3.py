@@ -1,4 +1,6 @@
+"""Bring the Stage 3 accountability audit (and anything upstream that changed) up to date via run_all.py."""
 import sys
-sys.stdout = open(r'c:\Users\asus\Desktop\decodex\output\stage3\stage3_output.txt', 'w', encoding='utf-8')
-exec(open(r'c:\Users\asus\Desktop\decodex\scripts\stage3\stage3_accountability.py', encoding='utf-8').read())
-sys.stdout.close()
+
+from run_all import main
+
+sys.exit(main(['stage3'] + sys.argv[1:]))
@@ -14,14 +14,19 @@ from matplotlib.patches import Patch
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import TRAIN_END
+from common.paths import data_dir
 
-DATA_DIR = Path(r'c:\Users\asus\Desktop\decodex')
+DATA_DIR = Path(data_dir(r'c:\Users\asus\Desktop\decodex'))
 CHART_DIR = DATA_DIR / 'charts'
+CHART_DIR.mkdir(exist_ok=True)
 
-master_df = pd.read_csv(DATA_DIR / 'master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
-forecast_df = pd.read_csv(DATA_DIR / 'forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
+ctx = DataContext(DATA_DIR)
+master_df = ctx.master(columns=['Date', 'Route_Type', 'Season', 'Total_Pax'], end=TRAIN_END)
+forecast_df = ctx.forecast()
 
 COLORS = {
     'City': '#2196F3', 'Express': '#F44336', 'Feeder': '#4CAF50', 'Intercity': '#FF9800',
@@ -41,11 +46,11 @@ def add_inference(ax, text, x=0.02, y=0.02, fontsize=9):
 # ============================================================
 
 # Historical: 2022, 2023, 2024, 2025 H1
-hist = master_df.groupby([master_df['Date'].dt.year, 'Route_Type'])['Total_Pax'].sum().reset_index()
+hist = master_df.groupby([master_df['Date'].dt.year, 'Route_Type'], observed=True)['Total_Pax'].sum().reset_index()
 hist.columns = ['Year', 'Route_Type', 'Total_Pax']
 
-# 2025 H2 forecast by route type
-fcast_by_type = forecast_df.groupby('Route_Type')['Forecast_Total_Pax'].sum().reset_index()
+# 2025 H2 forecast by route type (reconciled hierarchy level, coherent with the route forecast)
+fcast_by_type = ctx.forecast_hierarchy(level='Route_Type').groupby('Node')['Forecast_Total_Pax'].sum().reset_index()
 fcast_by_type.columns = ['Route_Type', 'Total_Pax']
 fcast_by_type['Year'] = 2025
 
@@ -150,13 +155,9 @@ print("Saved: 13_growth_decomposition.png")
 # ============================================================
 fig, ax = plt.subplots(figsize=(12, 7))
 
-def dubai_season(m):
-    if m in [11, 12, 1, 2, 3]: return 'Winter Peak'
-    elif m in [6, 7, 8]: return 'Summer Moderate'
-    else: return 'Shoulder'
-
-master_df['Season'] = master_df['Date'].dt.month.apply(dubai_season)
-forecast_df['Season'] = forecast_df['Date'].dt.month.apply(dubai_season)
+# Season codes (Winter_Peak, ...) from the shared date dimension, shown with spaces
+master_df['Season'] = master_df['Season'].astype(str).str.replace('_', ' ')
+forecast_df['Season'] = forecast_df['Season'].str.replace('_', ' ')
 
 # Historical by season
 hist_season = master_df.groupby([master_df['Date'].dt.year, 'Season'])['Total_Pax'].sum().reset_index()
@@ -0,0 +1,128 @@
+"""
+DECODE X 2026 - Stage 1: Rolling-Origin Forecast Backtest
+==========================================================
+How well would the Stage 1 decomposition have forecast the past?
+
+Re-fits the route-level model at every month start from 2023 onward
+(using only the history before that origin) and scores its 1-6 month
+forecasts against the actuals:
+  1. Accuracy by horizon (all routes)
+  2. Route type x horizon (WAPE)
+  3. Route scorecard (MAPE / WAPE / bias over all horizons)
+
+Usage: python stage1_backtest.py [--start 2023-01-01] [--horizon 6] [--jobs N]
+"""
+
+import argparse
+import time
+import warnings
+warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import pandas as pd
+from common.backtest import BACKTEST_HORIZON_MONTHS, rolling_origin, score
+from common.context import DataContext
+from common.dates import TRAIN_END, add_calendar_features
+from common.paths import data_dir
+from common.store import save_table
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+OUTPUT_DIR = DATA_DIR
+BACKTEST_ERRORS_NAME = 'backtest_errors'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the Stage 1 forecast')
+    parser.add_argument('--start', default='2023-01-01', help='first forecast origin (month start)')
+    parser.add_argument('--horizon', type=int, default=BACKTEST_HORIZON_MONTHS, help='months ahead per origin')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("ROLLING-ORIGIN BACKTEST: STAGE 1 DECOMPOSITION FORECAST")
+    print("=" * 70)
+
+    # ============================================================
+    # 1. DAILY ROUTE HISTORY (same aggregation as stage1_forecast.py)
+    # ============================================================
+    ctx = DataContext(DATA_DIR)
+    master_df = ctx.master(columns=['Date', 'Route_ID', 'Route_Code', 'Route_Type',
+                                    'Total_Pax', 'Congestion_Level'], end=TRAIN_END)
+    daily_route = master_df.groupby(['Date', 'Route_ID', 'Route_Code', 'Route_Type'], observed=True).agg({
+        'Total_Pax': 'sum',
+        'Congestion_Level': 'first'
+    }).reset_index()
+    daily_route = add_calendar_features(daily_route, ctx.date_dimension(), ['Month', 'DayOfWeek'])
+
+    last_date = daily_route['Date'].max()
+    origins = pd.date_range(args.start, last_date, freq='MS')
+    print(f"  History: {daily_route['Date'].min().date()} to {last_date.date()}, "
+          f"{daily_route['Route_ID'].nunique()} routes")
+    print(f"  Origins: {len(origins)} month starts ({origins[0].date()} to {origins[-1].date()}), "
+          f"horizons 1-{args.horizon} months")
+
+    # ============================================================
+    # 2. RE-FIT AT EVERY ORIGIN (process pool)
+    # ============================================================
+    start = time.time()
+    errors = rolling_origin(daily_route, origins, keys=['Route_ID'], labels=['Route_Code', 'Route_Type'],
+                            horizon_months=args.horizon, jobs=args.jobs)
+    print(f"  Backtest forecasts: {len(errors):,} route-days in {time.time() - start:.1f}s")
+
+    # ============================================================
+    # 3. ACCURACY BY HORIZON
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SECTION 1: ACCURACY BY HORIZON (all routes)")
+    print("=" * 70)
+    by_horizon = score(errors, 'Horizon')
+    print(f"\n  {'Horizon':<10} {'Days':>8} {'MAPE':>8} {'WAPE':>8} {'Bias':>8}")
+    for horizon, row in by_horizon.iterrows():
+        print(f"  {horizon:>2} month{'s' if horizon > 1 else ' '} {row['Days']:>8,.0f} "
+              f"{row['MAPE']:>7.1f}% {row['WAPE']:>7.1f}% {row['Bias']:>+7.1f}%")
+
+    # ============================================================
+    # 4. ROUTE TYPE x HORIZON
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SECTION 2: WAPE BY ROUTE TYPE x HORIZON")
+    print("=" * 70)
+    by_type = score(errors, ['Route_Type', 'Horizon'])
+    wape = by_type['WAPE'].unstack('Horizon')
+    print("\n  " + f"{'Route_Type':<12}" + "".join(f"{f'h={h}':>8}" for h in wape.columns))
+    for rtype, row in wape.iterrows():
+        print("  " + f"{rtype:<12}" + "".join(f"{v:>7.1f}%" for v in row))
+    type_bias = score(errors, 'Route_Type')['Bias']
+    print("\n  Bias (all horizons): " + ", ".join(f"{t} {b:+.1f}%" for t, b in type_bias.items()))
+
+    # ============================================================
+    # 5. ROUTE SCORECARD
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SECTION 3: ROUTE SCORECARD (all origins and horizons)")
+    print("=" * 70)
+    by_route = score(errors, ['Route_Code', 'Route_Type']).sort_values('WAPE', ascending=False)
+    print(f"\n  {'Route':<8} {'Type':<12} {'MAPE':>8} {'WAPE':>8} {'Bias':>8}")
+    for (rcode, rtype), row in by_route.iterrows():
+        print(f"  {rcode:<8} {rtype:<12} {row['MAPE']:>7.1f}% {row['WAPE']:>7.1f}% {row['Bias']:>+7.1f}%")
+
+    # ============================================================
+    # 6. SAVE
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SAVING BACKTEST")
+    print("=" * 70)
+    scores = score(errors, ['Route_ID', 'Route_Code', 'Route_Type', 'Horizon']).reset_index()
+    scores_path = f'{OUTPUT_DIR}/backtest_scores.csv'
+    scores.round(3).to_csv(scores_path, index=False)
+    print(f"  Route x horizon scores: {scores_path}")
+    print(f"  Backtest forecasts: {save_table(errors, OUTPUT_DIR, BACKTEST_ERRORS_NAME)}")
+
+    print("\n" + "=" * 70)
+    print("[DONE] BACKTEST COMPLETE")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
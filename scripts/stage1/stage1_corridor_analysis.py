@@ -9,8 +9,21 @@ import pandas as pd
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
-
-DATA_DIR = r'c:\Users\asus\Desktop\decodex'
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END, WEEKEND_DAYS
+from common.geo import CATCHMENT_RADIUS_KM, catchment_overlap, segment_array, trip_distances
+from common.od import estimate_od, segment_flows, trip_lengths
+from common.paths import data_dir
+from common.store import save_table
+from common.views import CorridorView
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+ROUTE_OD_NAME = 'route_od'
+SEGMENT_FLOWS_NAME = 'segment_flows'
+ROUTE_GEOMETRY_NAME = 'route_geometry'
 
 # ============================================================
 # 1. LOAD DATA
@@ -19,14 +32,20 @@ print("=" * 70)
 print("CORRIDOR OVERLOAD & CAPACITY WASTE ANALYSIS")
 print("=" * 70)
 
-master_df = pd.read_csv(f'{DATA_DIR}/master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
-forecast_df = pd.read_csv(f'{DATA_DIR}/forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
-routes_df = pd.read_csv(f'{DATA_DIR}/Bus_Routes.csv')
-mapping_df = pd.read_csv(f'{DATA_DIR}/Route_Stop_Mapping.csv')
-
-print(f"  Master: {len(master_df):,} rows | Forecast: {len(forecast_df):,} rows")
+ctx = DataContext(DATA_DIR)
+# Scorecards (sections A, D, E) come from the incremental corridor view: only
+# days appended since its last refresh are read from the master. Every H1 read
+# ends at TRAIN_END, so ingested drops (Q3 shock, Q4) stay out of the baseline
+view = CorridorView.refresh(ctx, start=H1_START, end=TRAIN_END)
+forecast_df = ctx.forecast()
+routes_df = ctx.routes()
+mapping_df = ctx.mapping()
+cube = ctx.demand_cube().window(end=TRAIN_END)
+H1_2025 = [('Date', '>=', H1_START), ('Date', '<=', TRAIN_END)]
+H2_2024 = [('Date', '>=', pd.Timestamp('2024-07-01')), ('Date', '<=', pd.Timestamp('2024-12-31'))]
+
+print(f"  Master: {ctx.master_rows():,} rows | Forecast: {len(forecast_df):,} rows")
+print(f"  Corridor view: {view.start.date()} to {view.last_date.date()}, {view.folded_rows:,} new rows folded in")
 
 # ============================================================
 # 2. ROUTE-LEVEL EFFICIENCY METRICS
@@ -36,18 +55,14 @@ print("SECTION A: ROUTE EFFICIENCY SCORECARD")
 print("=" * 70)
 
 # Use 2025 H1 data as the most recent actuals
-recent = master_df[master_df['Date'] >= '2025-01-01'].copy()
-
-route_metrics = recent.groupby(['Route_ID', 'Route_Code', 'Route_Type']).agg({
-    'Total_Pax': ['sum', 'mean', 'std'],
-    'Boarding_Count': 'sum',
-    'Alighting_Count': 'sum',
-    'Congestion_Level': 'mean',
-    'Avg_Speed_kmph': 'mean',
-    'Route_Length_km': 'first',
-    'Avg_Travel_Time_Min': 'first',
-    'Dwell_Time_Min': 'mean'
-}).reset_index()
+route_metrics = view.summary(['Route_ID', 'Route_Code', 'Route_Type'])[[
+    'Route_ID', 'Route_Code', 'Route_Type',
+    'Total_Pax_Sum', 'Total_Pax_Mean', 'Total_Pax_Std',
+    'Boarding_Count_Sum', 'Alighting_Count_Sum',
+    'Congestion_Level_Mean', 'Avg_Speed_kmph_Mean',
+    'Route_Length_km', 'Avg_Travel_Time_Min',
+    'Dwell_Time_Min_Mean'
+]]
 
 route_metrics.columns = [
     'Route_ID', 'Route_Code', 'Route_Type',
@@ -107,9 +122,8 @@ print(f"\n  Pax/km threshold (P75): {pax_km_threshold:.1f}")
 forecast_growth = forecast_df.groupby(['Route_Code', 'Route_Type'])['Forecast_Total_Pax'].mean().reset_index()
 forecast_growth.columns = ['Route_Code', 'Route_Type', 'Forecast_Avg_Pax']
 
-h2_2024 = master_df[(master_df['Date'] >= '2024-07-01') & (master_df['Date'] <= '2024-12-31')]
-hist_avg = h2_2024.groupby(['Route_Code', 'Route_Type']).agg({'Total_Pax': 'sum'}).reset_index()
-hist_days = h2_2024['Date'].nunique()
+hist_avg = cube.sum(by=['Route_Code', 'Route_Type'], where=H2_2024, measures=['Total_Pax'])
+hist_days = cube.days(where=H2_2024)
 hist_avg['Hist_Daily_Avg'] = hist_avg['Total_Pax'] / hist_days
 hist_avg = hist_avg[['Route_Code', 'Route_Type', 'Hist_Daily_Avg']]
 
@@ -178,14 +192,12 @@ print("SECTION D: STOP-LEVEL BOTTLENECKS")
 print("=" * 70)
 
 # Find stops that are disproportionately loaded relative to their route
-stop_analysis = recent.groupby(['Route_ID', 'Route_Code', 'Route_Type', 
-                                 'Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type']).agg({
-    'Total_Pax': ['sum', 'mean'],
-    'Boarding_Count': 'mean',
-    'Alighting_Count': 'mean',
-    'Dwell_Time_Min': 'first',
-    'Stop_Sequence': 'first'
-}).reset_index()
+stop_analysis = view.summary(['Route_ID', 'Route_Code', 'Route_Type',
+                              'Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type'])[[
+    'Route_ID', 'Route_Code', 'Route_Type', 'Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type',
+    'Total_Pax_Sum', 'Total_Pax_Mean', 'Boarding_Count_Mean', 'Alighting_Count_Mean',
+    'Dwell_Time_Min', 'Stop_Sequence'
+]]
 
 stop_analysis.columns = ['Route_ID', 'Route_Code', 'Route_Type',
                           'Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type',
@@ -233,26 +245,20 @@ print("\n" + "=" * 70)
 print("SECTION E: ZONE CORRIDOR PRESSURE MATRIX")
 print("=" * 70)
 
-zone_pressure = recent.groupby('Zone').agg({
-    'Total_Pax': ['sum', 'mean'],
-    'Boarding_Count': 'sum',
-    'Alighting_Count': 'sum',
-    'Congestion_Level': 'mean',
-    'Avg_Speed_kmph': 'mean'
-}).reset_index()
+zone_pressure = view.summary('Zone')[[
+    'Zone', 'Total_Pax_Sum', 'Total_Pax_Mean', 'Boarding_Count_Sum', 'Alighting_Count_Sum',
+    'Congestion_Level_Mean', 'Avg_Speed_kmph_Mean', 'Num_Stops'
+]]
 
 zone_pressure.columns = ['Zone', 'Total_Pax', 'Avg_Pax', 'Total_Board', 
-                           'Total_Alight', 'Avg_Congestion', 'Avg_Speed']
+                           'Total_Alight', 'Avg_Congestion', 'Avg_Speed', 'Num_Stops']
 
 zone_pressure['Net_Flow'] = zone_pressure['Total_Board'] - zone_pressure['Total_Alight']
 zone_pressure['Flow_Dir'] = zone_pressure['Net_Flow'].apply(
     lambda x: 'GENERATOR' if x > 0 else 'ATTRACTOR'
 )
 
-# Stops per zone
-stops_per_zone = recent.groupby('Zone')['Stop_ID'].nunique().reset_index()
-stops_per_zone.columns = ['Zone', 'Num_Stops']
-zone_pressure = zone_pressure.merge(stops_per_zone, on='Zone')
+# Stops per zone (distinct stops, from the view)
 zone_pressure['Pax_Per_Stop'] = zone_pressure['Avg_Pax'] / zone_pressure['Num_Stops'] * zone_pressure['Num_Stops']
 
 zone_pressure = zone_pressure.sort_values('Total_Pax', ascending=False)
@@ -274,11 +280,11 @@ print("=" * 70)
 
 dow_names = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday', 
              4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
-dow_route = recent.groupby(['DayOfWeek', 'Route_Code', 'Route_Type'])['Total_Pax'].mean().reset_index()
+dow_route = cube.mean(by=['DayOfWeek', 'Route_Code', 'Route_Type'], where=H1_2025, measures=['Total_Pax'])
 dow_route['DayName'] = dow_route['DayOfWeek'].map(dow_names)
 
 # Find which route-day combos have the highest demand relative to that route's average
-route_avgs = dow_route.groupby('Route_Code')['Total_Pax'].mean().reset_index()
+route_avgs = dow_route.groupby('Route_Code', observed=True)['Total_Pax'].mean().reset_index()
 route_avgs.columns = ['Route_Code', 'Route_Avg']
 dow_route = dow_route.merge(route_avgs, on='Route_Code')
 dow_route['Demand_Index'] = (dow_route['Total_Pax'] / dow_route['Route_Avg'] * 100).round(1)
@@ -300,8 +306,8 @@ print(f"  {'Route':<8} {'Type':<12} {'Weekday_Avg':>12} {'Weekend_Avg':>12} {'Ra
 print("  " + "-" * 55)
 for route_code in sorted(dow_route['Route_Code'].unique()):
     rd = dow_route[dow_route['Route_Code'] == route_code]
-    weekday_avg = rd[~rd['DayOfWeek'].isin([4, 5])]['Total_Pax'].mean()
-    weekend_avg = rd[rd['DayOfWeek'].isin([4, 5])]['Total_Pax'].mean()
+    weekday_avg = rd[~rd['DayOfWeek'].isin(WEEKEND_DAYS)]['Total_Pax'].mean()
+    weekend_avg = rd[rd['DayOfWeek'].isin(WEEKEND_DAYS)]['Total_Pax'].mean()
     ratio = weekend_avg / weekday_avg if weekday_avg > 0 else 0
     rtype = rd['Route_Type'].iloc[0]
     print(f"  {route_code:<8} {rtype:<12} {weekday_avg:>11,.0f} {weekend_avg:>11,.0f} {ratio:>6.2f}")
@@ -313,24 +319,20 @@ print("\n" + "=" * 70)
 print("SECTION G: ROUTE LOAD PROFILE (Cumulative Boarding Pattern)")
 print("=" * 70)
 
-# For each route, show how boarding accumulates along the stop sequence
+# For each route, show how boarding accumulates along the stop sequence.
+# Profiles come from the stored (route x day x stop) onboard array.
 print(f"\n  Shows board/alight pattern along the route to find where buses fill up")
+load_profile = ctx.load_profile().window(start=H1_START, end=TRAIN_END)
+stop_labels = cube.pairs.set_index(['Route_ID', 'Stop_Sequence'])
+route_labels = cube.pairs.drop_duplicates('Route_ID').set_index('Route_ID')
+
+for route_id in load_profile.route_ids:
+    rd = load_profile.mean_profile(route_id)
+    rd['Zone'] = stop_labels.loc[route_id].reindex(rd['Stop_Sequence'])['Zone'].to_numpy()
+
+    route_code = route_labels.loc[route_id, 'Route_Code']
+    route_type = route_labels.loc[route_id, 'Route_Type']
 
-for route_id in sorted(recent['Route_ID'].unique()):
-    rd = recent[recent['Route_ID'] == route_id].groupby(['Stop_Sequence', 'Stop_ID', 'Stop_Name', 'Zone']).agg({
-        'Boarding_Count': 'mean',
-        'Alighting_Count': 'mean',
-        'Total_Pax': 'mean'
-    }).reset_index().sort_values('Stop_Sequence')
-    
-    route_code = recent[recent['Route_ID'] == route_id]['Route_Code'].iloc[0]
-    route_type = recent[recent['Route_ID'] == route_id]['Route_Type'].iloc[0]
-    
-    # Cumulative on-board estimate
-    rd['Cum_Board'] = rd['Boarding_Count'].cumsum()
-    rd['Cum_Alight'] = rd['Alighting_Count'].cumsum()
-    rd['Est_Onboard'] = rd['Cum_Board'] - rd['Cum_Alight']
-    
     peak_onboard = rd['Est_Onboard'].max()
     peak_seq = rd.loc[rd['Est_Onboard'].idxmax(), 'Stop_Sequence']
     peak_zone = rd.loc[rd['Est_Onboard'].idxmax(), 'Zone']
@@ -343,8 +345,114 @@ for route_id in sorted(recent['Route_ID'].unique()):
         print(f"  {stop['Stop_Sequence']:>4} {stop['Boarding_Count']:>6.0f} {stop['Alighting_Count']:>6.0f} "
               f"{stop['Est_Onboard']:>7.0f} {stop['Zone']:<25} {bar}")
 
+# Day-to-day spread of the peak: the average profile hides the bad days
+print(f"\n  Daily peak onboard (2025 H1, every route-day)")
+peak_quantiles = load_profile.peak_quantiles([0.5, 0.95])
+peak_segments = load_profile.peak_segments().drop_duplicates('Route_ID').set_index('Route_ID')
+print(f"  {'Route':<8} {'Type':<12} {'P50':>7} {'P95':>7} {'Most frequent peak':<30} {'Share':>6}")
+for route_id, row in peak_quantiles.iterrows():
+    segment = peak_segments.loc[route_id]
+    peak_seq = int(segment['Stop_Sequence'])
+    zone = stop_labels.loc[(route_id, peak_seq), 'Zone']
+    print(f"  {route_labels.loc[route_id, 'Route_Code']:<8} {route_labels.loc[route_id, 'Route_Type']:<12} "
+          f"{row['P50']:>7.0f} {row['P95']:>7.0f} {f'#{peak_seq} ({zone})':<30} "
+          f"{segment['Share']:>5.0%}")
+
+# ============================================================
+# 9. ORIGIN-DESTINATION FLOWS
+# ============================================================
+print("\n" + "=" * 70)
+print("SECTION H: ORIGIN-DESTINATION FLOWS (IPF from stop boardings/alightings)")
+print("=" * 70)
+
+# One batched IPF over every route-day of the load profile
+od = estimate_od(load_profile.boarding, load_profile.alighting)
+observed = load_profile.observed
+print(f"\n  {observed.sum():,} route-days in {od.iterations} iterations: "
+      f"{od.converged[observed].mean():.1%} converged, max margin error {od.max_error[observed].max():.1e}")
+
+# Average daily OD matrix per route, and what it puts on each segment
+route_od = (od.trips * observed[:, :, None, None]).sum(axis=1) / observed.sum(axis=1)[:, None, None]
+outbound, inbound = segment_flows(route_od)
+lengths = trip_lengths(route_od)
+
+print(f"\n  {'Route':<8} {'Type':<12} {'Trips/day':>10} {'Avg_Stops':>10} {'Top OD pair':<22} "
+      f"{'Peak segment (out / in)':<24}")
+print("  " + "-" * 90)
+od_rows, segment_rows = [], []
+for r, route_id in enumerate(load_profile.route_ids):
+    n_stops = load_profile.n_stops[r]
+    matrix = route_od[r, :n_stops, :n_stops]
+    origin, destination = np.unravel_index(matrix.argmax(), matrix.shape)
+    flows = outbound[r, :n_stops - 1] + inbound[r, :n_stops - 1]
+    peak = flows.argmax()
+    print(f"  {route_labels.loc[route_id, 'Route_Code']:<8} {route_labels.loc[route_id, 'Route_Type']:<12} "
+          f"{matrix.sum():>10,.0f} {lengths[r]:>10.2f} "
+          f"{f'#{origin + 1}->#{destination + 1} ({matrix[origin, destination]:.0f}/day)':<22} "
+          f"{f'#{peak + 1}-#{peak + 2} ({outbound[r, peak]:.0f} / {inbound[r, peak]:.0f})':<24}")
+    seqs = np.arange(1, n_stops + 1)
+    od_rows.append(pd.DataFrame({'Route_ID': route_id, 'Origin_Seq': np.repeat(seqs, n_stops),
+                                 'Destination_Seq': np.tile(seqs, n_stops), 'Avg_Daily_Trips': matrix.ravel()}))
+    segment_rows.append(pd.DataFrame({'Route_ID': route_id, 'From_Seq': seqs[:-1], 'To_Seq': seqs[1:],
+                                      'Outbound_Pax': outbound[r, :n_stops - 1],
+                                      'Inbound_Pax': inbound[r, :n_stops - 1]}))
+
+od_df = pd.concat(od_rows, ignore_index=True)
+od_df = od_df[od_df['Origin_Seq'] != od_df['Destination_Seq']].round(2)
+print(f"\n  Route OD matrices: {save_table(od_df, DATA_DIR, ROUTE_OD_NAME)}")
+print(f"  Segment flows:     {save_table(pd.concat(segment_rows, ignore_index=True).round(2), DATA_DIR, SEGMENT_FLOWS_NAME)}")
+
+# ============================================================
+# 10. STOP GEOMETRY: PASSENGER-KM, DENSITY, CATCHMENT OVERLAP
+# ============================================================
+print("\n" + "=" * 70)
+print("SECTION I: STOP GEOMETRY (haversine segments, stop KD-tree)")
+print("=" * 70)
+
+segments_df = ctx.segment_lengths()
+segment_km = segment_array(segments_df, load_profile.route_ids, route_od.shape[-1] - 1)
+mapped_km = segment_km.sum(axis=1)
+# On-route km of every OD pair, weighted by the average daily trips
+pax_km = (route_od * trip_distances(segment_km)).sum(axis=(1, 2))
+overlap = catchment_overlap(ctx.stop_index(), mapping_df, CATCHMENT_RADIUS_KM)
+route_lengths = routes_df.set_index('Route_ID')['Route_Length_km']
+
+print(f"\n  {'Route':<8} {'Listed_km':>9} {'Mapped_km':>9} {'Spacing':>8} {'Pax-km/day':>11} "
+      f"{'Trip_km':>8} {'Load/km':>8} {f'Catchment overlap ({CATCHMENT_RADIUS_KM:g} km)':<26}")
+print("  " + "-" * 95)
+geometry_rows = []
+for r, route_id in enumerate(load_profile.route_ids):
+    n_stops = load_profile.n_stops[r]
+    shares = overlap.loc[route_id].drop(route_id)
+    spacing = mapped_km[r] / max(n_stops - 1, 1)
+    trips = route_od[r].sum()
+    row = {
+        'Route_ID': route_id,
+        'Route_Code': route_labels.loc[route_id, 'Route_Code'],
+        'Route_Length_km': route_lengths.loc[route_id],
+        'Mapped_km': mapped_km[r],
+        'Stop_Spacing_km': spacing,
+        'Stops_Per_Km': n_stops / mapped_km[r] if mapped_km[r] > 0 else np.nan,
+        'Passenger_km': pax_km[r],
+        'Avg_Trip_km': pax_km[r] / trips if trips > 0 else np.nan,
+        'Avg_Load': pax_km[r] / mapped_km[r] if mapped_km[r] > 0 else np.nan,
+        'Max_Overlap_Route': route_labels.loc[shares.idxmax(), 'Route_Code'],
+        'Max_Overlap_Share': shares.max(),
+    }
+    geometry_rows.append(row)
+    print(f"  {row['Route_Code']:<8} {row['Route_Length_km']:>9.1f} {row['Mapped_km']:>9.1f} "
+          f"{row['Stop_Spacing_km']:>8.2f} {row['Passenger_km']:>11,.0f} {row['Avg_Trip_km']:>8.2f} "
+          f"{row['Avg_Load']:>8.1f} {row['Max_Overlap_Route']:<4} {row['Max_Overlap_Share']:>6.0%}")
+
+geometry_df = pd.DataFrame(geometry_rows).round(3)
+print("\n  Mapped_km sums the stop-to-stop haversine segments; Load/km = passenger-km per mapped km "
+      "(average onboard load along the route).")
+print(f"  Mapped / listed length: median {(geometry_df['Mapped_km'] / geometry_df['Route_Length_km']).median():.1f}x "
+      "- stop coordinates disagree with Route_Length_km, so compare mapped km across routes only")
+print(f"  Route geometry: {save_table(geometry_df, DATA_DIR, ROUTE_GEOMETRY_NAME)}")
+
 # ============================================================
-# 9. EXECUTIVE SUMMARY
+# 11. EXECUTIVE SUMMARY
 # ============================================================
 print("\n" + "=" * 70)
 print("EXECUTIVE SUMMARY: OVERLOAD & WASTE FINDINGS")
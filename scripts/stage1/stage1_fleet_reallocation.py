@@ -10,12 +10,17 @@ Uses findings from corridor analysis:
   - Bottleneck zone: Coastal_Marina
 """
 
-import pandas as pd
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END
+from common.paths import data_dir
 
-DATA_DIR = r'c:\Users\asus\Desktop\decodex'
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
 
 # ============================================================
 # 1. LOAD DATA
@@ -24,15 +29,13 @@ print("=" * 70)
 print("FLEET REALLOCATION & HEADWAY OPTIMIZATION PROPOSALS")
 print("=" * 70)
 
-master_df = pd.read_csv(f'{DATA_DIR}/master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
-forecast_df = pd.read_csv(f'{DATA_DIR}/forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
-routes_df = pd.read_csv(f'{DATA_DIR}/Bus_Routes.csv')
-mapping_df = pd.read_csv(f'{DATA_DIR}/Route_Stop_Mapping.csv')
-
-# Recent data (H1 2025)
-recent = master_df[master_df['Date'] >= '2025-01-01'].copy()
+ctx = DataContext(DATA_DIR)
+# Recent data (H1 2025), queried from the demand cube instead of the master rows
+cube = ctx.demand_cube().window(end=TRAIN_END)
+RECENT = [('Date', '>=', H1_START), ('Date', '<=', TRAIN_END)]
+forecast_df = ctx.forecast()
+routes_df = ctx.routes()
+mapping_df = ctx.mapping()
 
 # ============================================================
 # 2. CURRENT SERVICE PROFILE (BASELINE)
@@ -59,15 +62,12 @@ route_profile = route_profile.merge(num_stops, on='Route_ID').merge(total_dwell,
 route_profile['Round_Trip_Min'] = 2 * (route_profile['Avg_Travel_Time_Min'] + 5)  # 5 min turnaround
 
 # Daily demand from H1 2025
-daily_demand = recent.groupby(['Route_ID']).agg({
-    'Total_Pax': 'mean',
-    'Boarding_Count': 'mean',
-    'Alighting_Count': 'mean'
-}).reset_index()
+daily_demand = cube.mean(by='Route_ID', where=RECENT,
+                         measures=['Total_Pax', 'Boarding_Count', 'Alighting_Count'])
 daily_demand.columns = ['Route_ID', 'Daily_Pax_Avg', 'Daily_Board_Avg', 'Daily_Alight_Avg']
 # These are per-stop averages, multiply by number of stops is wrong
 # Instead, get the daily route total directly
-daily_route_total = recent.groupby(['Date', 'Route_ID'])['Total_Pax'].sum().reset_index()
+daily_route_total = cube.sum(by=['Date', 'Route_ID'], where=RECENT, measures=['Total_Pax'])
 daily_route_avg = daily_route_total.groupby('Route_ID')['Total_Pax'].mean().reset_index()
 daily_route_avg.columns = ['Route_ID', 'Daily_Total_Pax']
 
@@ -261,19 +261,16 @@ print("  Based on day-of-week demand patterns from H1 2025 data\n")
 
 # Calculate relative demand by DayOfWeek for each route
 dow_names = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'}
-recent['DayOfWeek'] = recent['Date'].dt.dayofweek
 
-dow_demand = recent.groupby(['DayOfWeek', 'Route_ID', 'Route_Code']).agg({
-    'Total_Pax': 'sum'
-}).reset_index()
+dow_demand = cube.sum(by=['DayOfWeek', 'Route_ID', 'Route_Code'], where=RECENT, measures=['Total_Pax'])
 # Average across dates
-dow_days = recent.groupby('DayOfWeek')['Date'].nunique().reset_index()
+dow_days = cube.days(by='DayOfWeek', where=RECENT)
 dow_days.columns = ['DayOfWeek', 'NumDays']
 dow_demand = dow_demand.merge(dow_days, on='DayOfWeek')
 dow_demand['Daily_Avg'] = dow_demand['Total_Pax'] / dow_demand['NumDays']
 
 # Get route average across all days
-route_overall = dow_demand.groupby('Route_Code')['Daily_Avg'].mean().reset_index()
+route_overall = dow_demand.groupby('Route_Code', observed=True)['Daily_Avg'].mean().reset_index()
 route_overall.columns = ['Route_Code', 'Overall_Avg']
 dow_demand = dow_demand.merge(route_overall, on='Route_Code')
 dow_demand['Demand_Index'] = dow_demand['Daily_Avg'] / dow_demand['Overall_Avg']
@@ -303,22 +300,15 @@ print("SECTION 5: SEASONAL FLEET ADJUSTMENT")
 print("=" * 70)
 
 # Winter needs more, summer needs less
-def dubai_season(m):
-    if m in [11, 12, 1, 2, 3]: return 'Winter_Peak'
-    elif m in [6, 7, 8]: return 'Summer_Moderate'
-    else: return 'Shoulder'
-
-recent['Season'] = recent['Month'].apply(dubai_season) if 'Month' in recent.columns else recent['Date'].dt.month.apply(dubai_season)
-
-season_demand = recent.groupby(['Season', 'Route_ID', 'Route_Code', 'Route_Type']).agg({
-    'Total_Pax': 'sum'
-}).reset_index()
-season_days = recent.groupby('Season')['Date'].nunique().reset_index()
+# (Season comes with the cube's date attributes, from the shared date dimension)
+season_demand = cube.sum(by=['Season', 'Route_ID', 'Route_Code', 'Route_Type'], where=RECENT,
+                         measures=['Total_Pax'])
+season_days = cube.days(by='Season', where=RECENT)
 season_days.columns = ['Season', 'NumDays']
 season_demand = season_demand.merge(season_days, on='Season')
 season_demand['Daily_Avg'] = season_demand['Total_Pax'] / season_demand['NumDays']
 
-overall_avg = season_demand.groupby('Route_Code')['Daily_Avg'].mean().reset_index()
+overall_avg = season_demand.groupby('Route_Code', observed=True)['Daily_Avg'].mean().reset_index()
 overall_avg.columns = ['Route_Code', 'Overall_Avg']
 season_demand = season_demand.merge(overall_avg, on='Route_Code')
 season_demand['Season_Factor'] = season_demand['Daily_Avg'] / season_demand['Overall_Avg']
@@ -16,9 +16,20 @@ import numpy as np
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
-
-DATA_DIR = r'c:\Users\asus\Desktop\decodex'
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import TRAIN_END, add_calendar_features
+from common.forecasting import (FORECAST_DRAWS, FORECAST_QUANTILES, FORECAST_SEED, SEASONAL_COLUMNS,
+                                STOP_FORECAST_PARAMS_NAME, Forecaster, horizon_tag, reconcile_to_totals)
+from common.hierarchy import FORECAST_HIERARCHY_NAME, HIERARCHY_LEVELS, Hierarchy
+from common.paths import data_dir
+from common.store import save_table
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
 OUTPUT_DIR = DATA_DIR
+FORECAST_START, FORECAST_END = '2025-07-01', '2025-12-31'
 
 # ============================================================
 # 1. LOAD MASTER DATASET
@@ -27,8 +38,12 @@ print("=" * 70)
 print("BASELINE FORECAST: Jul 1 - Dec 31, 2025")
 print("=" * 70)
 
-master_df = pd.read_csv(f'{DATA_DIR}/master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
+ctx = DataContext(DATA_DIR)
+# Training history only: drops ingested after TRAIN_END are what the forecast is graded against
+master_df = ctx.master(columns=[
+    'Date', 'Route_ID', 'Stop_ID', 'Route_Code', 'Route_Type', 'Total_Pax',
+    'Boarding_Count', 'Alighting_Count', 'Congestion_Level', 'Avg_Speed_kmph'
+], end=TRAIN_END)
 
 print(f"  Loaded: {master_df.shape[0]:,} rows, {master_df['Date'].min().date()} to {master_df['Date'].max().date()}")
 
@@ -37,7 +52,7 @@ print(f"  Loaded: {master_df.shape[0]:,} rows, {master_df['Date'].min().date()}
 # ============================================================
 print("\n--- Step 2: Aggregating daily route-level demand ---")
 
-daily_route = master_df.groupby(['Date', 'Route_ID', 'Route_Code', 'Route_Type']).agg({
+daily_route = master_df.groupby(['Date', 'Route_ID', 'Route_Code', 'Route_Type'], observed=True).agg({
     'Total_Pax': 'sum',
     'Boarding_Count': 'sum',
     'Alighting_Count': 'sum',
@@ -45,18 +60,10 @@ daily_route = master_df.groupby(['Date', 'Route_ID', 'Route_Code', 'Route_Type']
     'Avg_Speed_kmph': 'first'
 }).reset_index()
 
-daily_route['Year'] = daily_route['Date'].dt.year
-daily_route['Month'] = daily_route['Date'].dt.month
-daily_route['DayOfWeek'] = daily_route['Date'].dt.dayofweek
-daily_route['IsWeekend'] = daily_route['DayOfWeek'].isin([4, 5]).astype(int)  # Dubai weekend
-
-# Season
-def dubai_season(m):
-    if m in [11, 12, 1, 2, 3]: return 'Winter_Peak'
-    elif m in [6, 7, 8]: return 'Summer_Moderate'
-    else: return 'Shoulder'
-
-daily_route['Season'] = daily_route['Month'].apply(dubai_season)
+# Calendar features (incl. Dubai Fri-Sat weekend and season) from the shared date dimension
+date_dim = ctx.date_dimension()
+daily_route = add_calendar_features(daily_route, date_dim,
+                                    ['Year', 'Month', 'DayOfWeek', 'IsWeekend', 'Season'])
 
 print(f"  Daily route records: {len(daily_route):,}")
 print(f"  Routes: {daily_route['Route_ID'].nunique()}")
@@ -66,119 +73,127 @@ print(f"  Routes: {daily_route['Route_ID'].nunique()}")
 # ============================================================
 print("\n--- Step 3: Decomposing demand components per route ---")
 
-forecasts = []
+# Trend, seasonal, DOW and congestion components for all routes at once (common/forecasting.py)
+model = Forecaster(keys=['Route_ID'], labels=['Route_Code', 'Route_Type']).fit(daily_route)
+params = model.params
 
-for route_id in sorted(daily_route['Route_ID'].unique()):
-    route_data = daily_route[daily_route['Route_ID'] == route_id].copy()
-    route_code = route_data['Route_Code'].iloc[0]
-    route_type = route_data['Route_Type'].iloc[0]
-    
-    # ----- 3a. Growth Trend -----
-    # Calculate monthly averages and fit linear growth
-    monthly_avg = route_data.groupby([route_data['Date'].dt.to_period('M')])['Total_Pax'].mean().reset_index()
-    monthly_avg.columns = ['Period', 'Avg_Pax']
-    monthly_avg['Period_Num'] = range(len(monthly_avg))
-    
-    # Linear regression for trend
-    x = monthly_avg['Period_Num'].values
-    y = monthly_avg['Avg_Pax'].values
-    slope, intercept = np.polyfit(x, y, 1)
-    monthly_growth_rate = slope / np.mean(y) if np.mean(y) > 0 else 0
-    
-    # ----- 3b. Monthly Seasonal Multipliers -----
-    # Calculate how each month deviates from the overall detrended average
-    route_data['Detrended'] = route_data['Total_Pax'] / (1 + monthly_growth_rate * 
-        ((route_data['Date'] - route_data['Date'].min()).dt.days / 30))
-    
-    overall_detrended_avg = route_data['Detrended'].mean()
-    monthly_multipliers = {}
-    for month in range(1, 13):
-        month_data = route_data[route_data['Month'] == month]['Detrended']
-        if len(month_data) > 0:
-            monthly_multipliers[month] = month_data.mean() / overall_detrended_avg
-        else:
-            monthly_multipliers[month] = 1.0
-    
-    # ----- 3c. Day-of-Week Multipliers -----
-    dow_avg = route_data.groupby('DayOfWeek')['Detrended'].mean()
-    overall_dow_avg = dow_avg.mean()
-    dow_multipliers = (dow_avg / overall_dow_avg).to_dict()
-    
-    # ----- 3d. Congestion Elasticity -----
-    # How does ridership change per unit of congestion?
-    cong_avg = route_data.groupby('Congestion_Level')['Total_Pax'].mean()
-    if len(cong_avg) > 1:
-        cong_levels = cong_avg.index.values
-        cong_pax = cong_avg.values
-        cong_slope, cong_intercept = np.polyfit(cong_levels, cong_pax, 1)
-    else:
-        cong_slope, cong_intercept = 0, route_data['Total_Pax'].mean()
-    
-    # ----- 3e. Generate Forecast for Jul 1 - Dec 31, 2025 -----
-    forecast_dates = pd.date_range('2025-07-01', '2025-12-31', freq='D')
-    
-    # Project the trend forward from the last known data point
-    last_known_date = route_data['Date'].max()
-    last_known_period = len(monthly_avg) - 1
-    base_value = intercept + slope * last_known_period  # trend value at last known point
-    
-    for fdate in forecast_dates:
-        # Months ahead from last known period
-        months_ahead = (fdate.year - last_known_date.year) * 12 + (fdate.month - last_known_date.month)
-        
-        # Trend component
-        trend_value = base_value + slope * months_ahead
-        
-        # Seasonal multiplier
-        seasonal_mult = monthly_multipliers.get(fdate.month, 1.0)
-        
-        # Day-of-week multiplier
-        dow_mult = dow_multipliers.get(fdate.dayofweek, 1.0)
-        
-        # Forecast congestion (use historical monthly average congestion)
-        hist_cong = route_data[route_data['Month'] == fdate.month]['Congestion_Level']
-        expected_cong = hist_cong.mean() if len(hist_cong) > 0 else 3
-        
-        # Combine: Trend * Seasonal * DOW
-        forecast_pax = trend_value * seasonal_mult * dow_mult
-        
-        # Small congestion adjustment
-        cong_adjustment = cong_slope * (expected_cong - route_data['Congestion_Level'].mean())
-        forecast_pax += cong_adjustment * 0.3  # damped congestion effect
-        
-        # Floor at 0
-        forecast_pax = max(0, round(forecast_pax))
-        
-        forecasts.append({
-            'Date': fdate,
-            'Route_ID': route_id,
-            'Route_Code': route_code,
-            'Route_Type': route_type,
-            'Forecast_Total_Pax': forecast_pax,
-            'Trend_Component': round(trend_value),
-            'Seasonal_Multiplier': round(seasonal_mult, 3),
-            'DOW_Multiplier': round(dow_mult, 3),
-            'Expected_Congestion': round(expected_cong, 1),
-            'Month': fdate.month,
-            'DayOfWeek': fdate.dayofweek,
-            'IsWeekend': 1 if fdate.dayofweek in [4, 5] else 0,
-            'Season': dubai_season(fdate.month)
-        })
-    
-    print(f"  Route {route_code} ({route_type:10s}): trend_slope={slope:+.1f}/mo, "
-          f"seasonal_range=[{min(monthly_multipliers.values()):.2f}-{max(monthly_multipliers.values()):.2f}], "
-          f"cong_elasticity={cong_slope:+.1f}")
+for p in params.itertuples():
+    seasonal = params.loc[p.Index, SEASONAL_COLUMNS]
+    print(f"  Route {p.Route_Code} ({p.Route_Type:10s}): trend_slope={p.Slope:+.1f}/mo, "
+          f"seasonal_range=[{seasonal.min():.2f}-{seasonal.max():.2f}], "
+          f"cong_elasticity={p.Cong_Slope:+.1f}")
 
 # ============================================================
 # 4. ASSEMBLE FORECAST DATASET
 # ============================================================
 print("\n--- Step 4: Assembling forecast dataset ---")
 
-forecast_df = pd.DataFrame(forecasts)
+# Jul 1 - Dec 31, 2025 on the shared date dimension: routes x horizon grid, flattened route by route,
+# with P10/P50/P90/P95 from the residual bootstrap next to the point forecast
+forecast_df = model.predict(FORECAST_START, FORECAST_END, date_dim=date_dim,
+                            quantiles=True, draws=FORECAST_DRAWS, seed=FORECAST_SEED)
 
 print(f"  Forecast records: {len(forecast_df):,}")
 print(f"  Date range: {forecast_df['Date'].min().date()} to {forecast_df['Date'].max().date()}")
 print(f"  Routes covered: {forecast_df['Route_ID'].nunique()}")
+print(f"  Quantiles: {', '.join(FORECAST_QUANTILES)} from {FORECAST_DRAWS} bootstrap draws "
+      f"of {len(model.residuals):,} residual days (seed {FORECAST_SEED})")
+quantile_columns = [f'Forecast_{name}' for name in FORECAST_QUANTILES]
+band = forecast_df.groupby(['Route_Code', 'Route_Type'], observed=True)[
+    ['Forecast_Total_Pax'] + quantile_columns].mean().round(0)
+for (rcode, rtype), row in band.iterrows():
+    print(f"    {rcode} ({rtype:10s}): daily P10={row['Forecast_P10']:>7,.0f}  "
+          f"point={row['Forecast_Total_Pax']:>7,.0f}  P90={row['Forecast_P90']:>7,.0f}  "
+          f"P95={row['Forecast_P95']:>7,.0f}")
+
+# ============================================================
+# 4b. STOP-LEVEL FORECAST (every mapped route-stop pair)
+# ============================================================
+print("\n--- Step 4b: Stop-level forecast (all route-stop pairs, one batched fit) ---")
+
+mapping_df = ctx.mapping()
+daily_stop = master_df.groupby(['Date', 'Route_ID', 'Stop_ID', 'Route_Code', 'Route_Type'], observed=True).agg({
+    'Total_Pax': 'sum',
+    'Congestion_Level': 'first'
+}).reset_index()
+daily_stop = daily_stop.merge(mapping_df[['Route_ID', 'Stop_ID', 'Stop_Sequence']], on=['Route_ID', 'Stop_ID'])
+daily_stop = add_calendar_features(daily_stop, date_dim, ['Month', 'DayOfWeek'])
+
+stop_model = Forecaster(keys=['Route_ID', 'Stop_ID'],
+                        labels=['Route_Code', 'Route_Type', 'Stop_Sequence']).fit(daily_stop)
+stop_model_df = stop_model.predict(FORECAST_START, FORECAST_END, date_dim=date_dim)
+print(f"  Stop series: {len(stop_model.params)} of {len(mapping_df)} mapped route-stop pairs")
+if len(stop_model.params) < len(mapping_df):
+    print(f"  {len(mapping_df) - len(stop_model.params)} pairs without history are forecast by reconciliation alone")
+
+# ============================================================
+# 4c. HIERARCHICAL RECONCILIATION (network / route type / zone / route / stop)
+# ============================================================
+print("\n--- Step 4c: Reconciling stop, zone, route type and network forecasts ---")
+
+hierarchy = Hierarchy(mapping_df, ctx.routes(), ctx.stops())
+horizon_dates = pd.DatetimeIndex(forecast_df['Date'].unique())
+
+# Base forecasts for the aggregate levels: one batched fit over every node's history
+node_history = hierarchy.node_history(daily_stop, ['Network', 'Route_Type', 'Zone'])
+node_history = add_calendar_features(node_history, date_dim, ['Month', 'DayOfWeek'])
+node_model = Forecaster(keys=['Level', 'Node']).fit(node_history)
+base_frames = [node_model.predict(FORECAST_START, FORECAST_END, date_dim=date_dim)]
+for level, frame, column in [('Route', forecast_df, 'Forecast_Total_Pax'),
+                             ('Stop', stop_model_df, 'Forecast_Total_Pax')]:
+    base_frames.append(pd.DataFrame({'Level': level, 'Node': hierarchy.node_labels(frame, level),
+                                     'Date': frame['Date'], 'Forecast_Total_Pax': frame[column]}))
+base = hierarchy.matrix(pd.concat(base_frames, ignore_index=True), horizon_dates)
+
+# Routes stay at the published route forecast; stops, zones, types and network adjust around them
+bottom = hierarchy.reconcile(base, fixed_levels=['Route'])
+
+# One row per mapped pair and day; model columns stay missing for pairs with no history
+calendar_columns = [col for col in stop_model_df.columns if col in date_dim.columns and col != 'Date']
+pairs = hierarchy.bottom[['Route_ID', 'Stop_ID', 'Route_Code', 'Route_Type']].merge(
+    mapping_df[['Route_ID', 'Stop_ID', 'Stop_Sequence']].drop_duplicates(['Route_ID', 'Stop_ID']),
+    on=['Route_ID', 'Stop_ID'])
+stop_forecast_df = pairs.merge(pd.DataFrame({'Date': horizon_dates}), how='cross')
+model_columns = stop_model_df.columns.difference(stop_forecast_df.columns.union(calendar_columns), sort=False)
+stop_forecast_df = stop_forecast_df.merge(stop_model_df[['Date', 'Route_ID', 'Stop_ID', *model_columns]],
+                                          on=['Date', 'Route_ID', 'Stop_ID'], how='left')
+int_columns = stop_model_df[model_columns].select_dtypes('integer').columns
+stop_forecast_df[int_columns] = stop_forecast_df[int_columns].astype('Int64')
+stop_forecast_df = add_calendar_features(stop_forecast_df, date_dim, calendar_columns)[stop_model_df.columns]
+
+stop_rows = hierarchy.bottom_rows(stop_forecast_df)
+day_cols = horizon_dates.get_indexer(stop_forecast_df['Date'])
+model_total = stop_forecast_df['Forecast_Total_Pax'].sum()
+route_total = forecast_df['Forecast_Total_Pax'].sum()
+stop_forecast_df.insert(stop_forecast_df.columns.get_loc('Forecast_Total_Pax') + 1, 'Model_Total_Pax',
+                        stop_forecast_df['Forecast_Total_Pax'])
+stop_forecast_df['Forecast_Total_Pax'] = np.maximum(bottom[stop_rows, day_cols], 0)
+# Whole passengers per stop that still sum exactly to the route forecast
+stop_forecast_df['Forecast_Total_Pax'] = reconcile_to_totals(stop_forecast_df, forecast_df, ['Date', 'Route_ID'])
+
+coherent_bottom = np.zeros((len(hierarchy.bottom), len(horizon_dates)))
+coherent_bottom[stop_rows, day_cols] = stop_forecast_df['Forecast_Total_Pax']
+hierarchy_df = hierarchy.to_frame(hierarchy.aggregate(coherent_bottom).astype('int64'), horizon_dates)
+# Nullable: nodes without a base forecast (pairs with no history) stay missing
+hierarchy_df.insert(3, 'Base_Forecast', pd.array(np.round(base.ravel()), dtype='Int64'))
+
+stop_sums = stop_forecast_df.groupby(['Date', 'Route_ID'])['Forecast_Total_Pax'].sum()
+route_totals = forecast_df.set_index(['Date', 'Route_ID'])['Forecast_Total_Pax']
+print(f"  Hierarchy: {len(hierarchy.bottom)} route-stop series, {len(hierarchy.nodes)} nodes "
+      f"over {len(HIERARCHY_LEVELS)} levels")
+print(f"  Unreconciled stop total: {model_total:,.0f} pax ({(model_total / route_total - 1) * 100:+.1f}% vs route forecast)")
+print(f"  Reconciled: max |stop sum - route forecast| = {(stop_sums - route_totals).abs().max():.0f} pax")
+print(f"\n  {'Level':<12} {'Nodes':>6} {'Base H2':>12} {'Coherent H2':>12} {'Adj':>7}")
+level_totals = hierarchy_df.groupby('Level', sort=False)[['Base_Forecast', 'Forecast_Total_Pax']].sum()
+for level, row in level_totals.iterrows():
+    print(f"  {level:<12} {(hierarchy.nodes['Level'] == level).sum():>6} {row['Base_Forecast']:>12,.0f} "
+          f"{row['Forecast_Total_Pax']:>12,.0f} {(row['Forecast_Total_Pax'] / row['Base_Forecast'] - 1) * 100:>+6.1f}%")
+
+print("\n  Busiest stops (forecast daily avg, H2 2025):")
+busiest = (stop_forecast_df.groupby(['Route_Code', 'Stop_ID', 'Stop_Sequence'], observed=True)['Forecast_Total_Pax']
+           .mean().sort_values(ascending=False).head(10))
+for (rcode, stop_id, seq), daily_avg in busiest.items():
+    print(f"    {rcode} stop {stop_id:>3} (seq {seq:>2}): {daily_avg:>7,.0f}/day")
 
 # ============================================================
 # 5. FORECAST SUMMARY & VALIDATION
@@ -278,8 +293,7 @@ print("=" * 70)
 
 # Historical 95th percentile by route as capacity threshold
 print("\nRoutes exceeding historical 95th percentile demand:")
-for route_id in sorted(daily_route['Route_ID'].unique()):
-    hist_route = daily_route[daily_route['Route_ID'] == route_id]
+for route_id, hist_route in daily_route.groupby('Route_ID', sort=True):
     p95 = hist_route['Total_Pax'].quantile(0.95)
     route_code = hist_route['Route_Code'].iloc[0]
     route_type = hist_route['Route_Type'].iloc[0]
@@ -300,11 +314,23 @@ print("\n" + "=" * 70)
 print("SAVING FORECAST")
 print("=" * 70)
 
-output_path = f'{OUTPUT_DIR}/forecast_h2_2025.csv'
+output_path = f'{OUTPUT_DIR}/forecast_{horizon_tag(FORECAST_START, FORECAST_END)}.csv'
 forecast_df.to_csv(output_path, index=False)
 print(f"  Saved to: {output_path}")
 print(f"  Shape: {forecast_df.shape}")
 
+stop_output_path = f'{OUTPUT_DIR}/forecast_stops_{horizon_tag(FORECAST_START, FORECAST_END)}.csv'
+stop_forecast_df.to_csv(stop_output_path, index=False)
+print(f"  Stop-level forecast: {stop_output_path} {stop_forecast_df.shape}")
+hierarchy_path = save_table(hierarchy_df, OUTPUT_DIR, FORECAST_HIERARCHY_NAME)
+print(f"  Reconciled hierarchy: {hierarchy_path} ({len(hierarchy.nodes)} nodes)")
+
+# Fitted components, so later stages re-forecast any horizon without refitting
+params_path = model.save(OUTPUT_DIR)
+print(f"  Model parameters: {params_path} ({len(params)} series)")
+stop_params_path = stop_model.save(OUTPUT_DIR, STOP_FORECAST_PARAMS_NAME)
+print(f"  Stop model parameters: {stop_params_path} ({len(stop_model.params)} series)")
+
 print("\n" + "=" * 70)
 print("[DONE] BASELINE FORECAST COMPLETE")
 print("=" * 70)
@@ -0,0 +1,73 @@
+"""
+DECODE X 2026 - Stage 1: Forecast for Any Horizon & Cadence
+============================================================
+Generates the Stage 1 route forecast for an arbitrary date range, daily,
+weekly (ISO weeks) or monthly, from the stored model parameters - no
+history scan, no refit - and writes it as a horizon-tagged artifact:
+
+  python stage1_horizon_forecast.py --start 2026-01-01 --end 2027-12-31 --freq M
+      -> forecast_2026_2027_monthly.csv
+  python stage1_horizon_forecast.py --start 2025-10-01 --end 2025-12-31
+      -> forecast_q4_2025.csv
+
+Calendar features come from the shared date dimension where it covers
+the range, otherwise from the same builder (common/dates.py). Weekly and
+monthly rows are period totals (P10-P95 of the bootstrapped period
+totals); needs stage1_forecast.py to have run.
+"""
+
+import argparse
+import time
+import warnings
+warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.forecasting import FORECAST_DRAWS, FORECAST_FREQUENCIES, FORECAST_SEED, horizon_tag
+from common.paths import data_dir
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+OUTPUT_DIR = DATA_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stage 1 route forecast for any horizon and cadence')
+    parser.add_argument('--start', required=True, help='first forecast day (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='last forecast day (YYYY-MM-DD)')
+    parser.add_argument('--freq', default='D', choices=list(FORECAST_FREQUENCIES),
+                        help='D = daily, W = ISO week, M = month')
+    parser.add_argument('--draws', type=int, default=FORECAST_DRAWS, help='bootstrap draws for P10-P95')
+    parser.add_argument('--seed', type=int, default=FORECAST_SEED, help='bootstrap seed')
+    args = parser.parse_args()
+
+    ctx = DataContext(DATA_DIR)
+    tag = horizon_tag(args.start, args.end, args.freq)
+    print("=" * 70)
+    print(f"STAGE 1 FORECAST: {args.start} to {args.end} ({tag})")
+    print("=" * 70)
+
+    start = time.time()
+    model = ctx.forecaster()
+    forecast_df = model.predict(args.start, args.end, date_dim=ctx.date_dimension(), freq=args.freq,
+                                quantiles=model.residuals is not None, draws=args.draws, seed=args.seed)
+    print(f"  {len(forecast_df):,} rows ({len(model.params)} routes x "
+          f"{forecast_df['Date'].nunique()} periods) in {time.time() - start:.2f}s")
+
+    total = forecast_df['Forecast_Total_Pax'].sum()
+    print(f"  Total forecast demand: {total:,.0f} pax")
+    by_year = forecast_df.groupby(forecast_df['Date'].dt.year)['Forecast_Total_Pax'].sum()
+    for year, year_total in by_year.items():
+        print(f"    {year}: {year_total:>12,.0f}")
+    by_type = forecast_df.groupby('Route_Type')['Forecast_Total_Pax'].sum()
+    for rtype, type_total in by_type.items():
+        print(f"    {rtype:<12} {type_total:>12,.0f} ({type_total / total * 100:.1f}%)")
+
+    output_path = f'{OUTPUT_DIR}/forecast_{tag}.csv'
+    forecast_df.to_csv(output_path, index=False)
+    print(f"\n  Saved to: {output_path}")
+    print(f"  Shape: {forecast_df.shape}")
+
+
+if __name__ == '__main__':
+    main()
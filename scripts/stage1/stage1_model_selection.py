@@ -0,0 +1,120 @@
+"""
+DECODE X 2026 - Stage 1: Model Zoo & Per-Series Model Selection
+================================================================
+Fits every candidate model (common/models.py: the Stage 1 decomposition,
+Holt-Winters, damped trend, seasonal naive) to every route - or every
+route-stop pair with --level stop - in a process pool, scores them on the
+last --holdout days and forecasts each series with its best model.
+
+Fits are cached in <data_dir>/.cache/models, so a re-run after a new data
+drop refits only the series whose history changed.
+
+Usage: python stage1_model_selection.py [--level route|stop] [--holdout 91] [--jobs N]
+"""
+
+import argparse
+import time
+import warnings
+warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import TRAIN_END
+from common.forecasting import horizon_tag
+from common.models import HOLDOUT_DAYS, MODEL_ZOO, select_models
+from common.paths import data_dir
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+OUTPUT_DIR = DATA_DIR
+FORECAST_START, FORECAST_END = '2025-07-01', '2025-12-31'
+
+LEVELS = {
+    'route': (['Route_ID'], ['Route_Code', 'Route_Type']),
+    'stop': (['Route_ID', 'Stop_ID'], ['Route_Code', 'Route_Type']),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit the model zoo and pick the best model per series')
+    parser.add_argument('--level', default='route', choices=list(LEVELS), help='series level')
+    parser.add_argument('--holdout', type=int, default=HOLDOUT_DAYS, help='days held out for scoring')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+    keys, labels = LEVELS[args.level]
+
+    print("=" * 70)
+    print(f"MODEL ZOO: {len(MODEL_ZOO)} CANDIDATES PER {args.level.upper()} SERIES")
+    print("=" * 70)
+
+    ctx = DataContext(DATA_DIR)
+    master_df = ctx.master(columns=['Date', 'Route_ID', 'Stop_ID', 'Route_Code', 'Route_Type',
+                                    'Total_Pax', 'Congestion_Level'], end=TRAIN_END)
+    daily = master_df.groupby(['Date'] + keys + labels, observed=True).agg({
+        'Total_Pax': 'sum',
+        'Congestion_Level': 'first'
+    }).reset_index()
+    print(f"  History: {daily['Date'].min().date()} to {daily['Date'].max().date()}, "
+          f"{daily.groupby(keys, observed=True).ngroups} series")
+    print(f"  Holdout: last {args.holdout} days")
+
+    start = time.time()
+    zoo = select_models(daily, keys, labels, holdout_days=args.holdout, cache_dir=ctx.cache_dir, jobs=args.jobs)
+    cached = len(zoo.scores) - zoo.fitted
+    print(f"  Fits: {zoo.fitted} new, {cached} from cache, in {time.time() - start:.1f}s")
+
+    # ============================================================
+    # 1. CANDIDATE ACCURACY
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SECTION 1: HOLDOUT ACCURACY BY MODEL")
+    print("=" * 70)
+    by_model = zoo.scores.groupby('Model', sort=False)[['WAPE', 'MAPE', 'Bias']].mean()
+    wins = zoo.selected['Model'].value_counts()
+    print(f"\n  {'Model':<16} {'WAPE':>8} {'MAPE':>8} {'Bias':>8} {'Selected':>9}")
+    for model, row in by_model.iterrows():
+        print(f"  {model:<16} {row['WAPE']:>7.1f}% {row['MAPE']:>7.1f}% {row['Bias']:>+7.1f}% "
+              f"{wins.get(model, 0):>9}")
+
+    # ============================================================
+    # 2. SELECTED MODEL PER SERIES
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SECTION 2: SELECTED MODEL PER SERIES")
+    print("=" * 70)
+    wape = zoo.scores.pivot_table(index=keys, columns='Model', values='WAPE', sort=False)
+    if args.level == 'route':
+        print("\n  " + f"{'Route':<8}" + "".join(f"{model:>15}" for model in wape.columns) + "  Selected")
+        for series_key, row in zoo.selected.iterrows():
+            print("  " + f"{row['Route_Code']:<8}" + "".join(f"{v:>14.1f}%" for v in wape.loc[series_key])
+                  + f"  {row['Model']}")
+    else:
+        by_route = zoo.selected.groupby(['Route_Code', 'Model'], observed=True).size().unstack(fill_value=0)
+        print("\n  Stops per route and selected model:")
+        print("  " + by_route.to_string().replace('\n', '\n  '))
+    gain = (zoo.scores[zoo.scores['Model'] == 'decomposition'].set_index(keys)['WAPE']
+            - zoo.selected['WAPE']).mean()
+    print(f"\n  Mean holdout WAPE gain of the selected model over the decomposition: {gain:.2f} points")
+
+    # ============================================================
+    # 3. SAVE
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SAVING MODEL SELECTION")
+    print("=" * 70)
+    suffix = '' if args.level == 'route' else '_stops'
+    scores_path = f'{OUTPUT_DIR}/model_selection{suffix}.csv'
+    zoo.scores.round(3).to_csv(scores_path, index=False)
+    print(f"  Candidate scores: {scores_path}")
+    forecast_df = zoo.predict(FORECAST_START, FORECAST_END)
+    forecast_path = f'{OUTPUT_DIR}/forecast_zoo{suffix}_{horizon_tag(FORECAST_START, FORECAST_END)}.csv'
+    forecast_df.to_csv(forecast_path, index=False)
+    print(f"  Selected-model forecast: {forecast_path} ({forecast_df['Forecast_Total_Pax'].sum():,.0f} pax)")
+
+    print("\n" + "=" * 70)
+    print("[DONE] MODEL SELECTION COMPLETE")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
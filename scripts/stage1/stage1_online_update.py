@@ -0,0 +1,129 @@
+"""
+DECODE X 2026 - Stage 1: Online Forecast Update
+================================================
+Daily recalibration instead of a quarterly refit: folds the days of
+actuals the state has not seen yet into the per-route level / trend /
+day-of-week state (common/online.py) and refreshes the forward forecast.
+
+  python stage1_pipeline.py --ingest <ridership.csv> --traffic <traffic.csv>
+  python stage1_online_update.py [--days 92] [--reset]
+
+The first run (or --reset) starts the state from the Stage 1 model
+(forecast_params); later runs continue from forecast_state. Only master
+months after the state's last update are read, so a run costs the same
+however long the history is.
+"""
+
+import argparse
+import os
+import time
+import warnings
+warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import pandas as pd
+from common.context import DataContext
+from common.online import HOLDOUT_DAYS, ONLINE_STATE_NAME, OnlineForecaster
+from common.paths import data_dir
+from common.store import table_path
+
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
+OUTPUT_DIR = DATA_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold new daily actuals into the online forecast state')
+    parser.add_argument('--days', type=int, default=92, help='days of forward forecast to write')
+    parser.add_argument('--reset', action='store_true', help='restart the state from the Stage 1 model')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("ONLINE FORECAST UPDATE")
+    print("=" * 70)
+
+    ctx = DataContext(DATA_DIR)
+    if args.reset or not os.path.exists(table_path(OUTPUT_DIR, ONLINE_STATE_NAME)):
+        online = OnlineForecaster.from_forecaster(ctx.forecaster())
+        print("  State: initialised from the Stage 1 model (forecast_params)")
+    else:
+        online = OnlineForecaster.load(OUTPUT_DIR)
+        print(f"  State: {table_path(OUTPUT_DIR, ONLINE_STATE_NAME)}")
+    before = online.params[['Route_Code', 'Base_Value', 'Slope', 'Last_Date']].copy()
+    since = before['Last_Date'].min()
+    print(f"  Last update: {since.date()}")
+
+    # ============================================================
+    # 1. NEW ACTUALS (only the master months after the last update)
+    # ============================================================
+    start = time.time()
+    new_rows = ctx.master(start=since + pd.Timedelta(days=1),
+                          columns=['Date', 'Route_ID', 'Total_Pax', 'Congestion_Level'])
+    actuals = new_rows.groupby(['Date', 'Route_ID'], observed=True).agg({
+        'Total_Pax': 'sum',
+        'Congestion_Level': 'first'
+    }).reset_index()
+    if actuals.empty:
+        print("  No new actuals since the last update")
+    else:
+        print(f"  New actuals: {actuals['Date'].nunique()} days "
+              f"({actuals['Date'].min().date()} to {actuals['Date'].max().date()}), "
+              f"{len(actuals):,} route-days")
+
+    # ============================================================
+    # 2. FOLD INTO THE STATE (one O(routes) step per day)
+    # ============================================================
+    # Does updating help? Replay without the last HOLDOUT_DAYS and score both states on them
+    check = online.holdout_wape(actuals) if not actuals.empty else None
+    if check is not None:
+        print(f"  Holdout check (last {HOLDOUT_DAYS} days): WAPE {check['updated']:.1f}% updated "
+              f"vs {check['static']:.1f}% without the update")
+        if check['updated'] > check['static']:
+            print("  [WARN] Updating made the holdout worse; review ALPHA / BETA in common/online.py")
+    online.update(actuals)
+    print(f"  Updated in {time.time() - start:.2f}s")
+
+    after = online.params
+    print(f"\n  {'Route':<8} {'Level':>9} {'->':^4} {'Level':>9} {'Slope/mo':>10} {'->':^4} {'Slope/mo':>10}")
+    for route_id, row in before.iterrows():
+        print(f"  {row['Route_Code']:<8} {row['Base_Value']:>9,.0f} {'->':^4} "
+              f"{after.at[route_id, 'Base_Value']:>9,.0f} {row['Slope']:>+10.1f} {'->':^4} "
+              f"{after.at[route_id, 'Slope']:>+10.1f}")
+
+    # ============================================================
+    # 3. REFRESHED FORWARD FORECAST
+    # ============================================================
+    last_update = after['Last_Date'].max()
+    horizon_start = last_update + pd.Timedelta(days=1)
+    horizon_end = last_update + pd.Timedelta(days=args.days)
+    forward_df = online.predict(horizon_start, horizon_end)
+    print(f"\n  Forward forecast: {horizon_start.date()} to {horizon_end.date()}, "
+          f"{forward_df['Forecast_Total_Pax'].sum():,.0f} pax")
+
+    batch_df = ctx.forecast()
+    batch_df = batch_df[(batch_df['Date'] >= horizon_start) & (batch_df['Date'] <= horizon_end)]
+    if not batch_df.empty:
+        overlap = forward_df[forward_df['Date'].isin(batch_df['Date'])]
+        batch_total = batch_df['Forecast_Total_Pax'].sum()
+        online_total = overlap['Forecast_Total_Pax'].sum()
+        print(f"  vs Stage 1 forecast on the same {batch_df['Date'].nunique()} days: "
+              f"{online_total:,.0f} vs {batch_total:,.0f} pax ({(online_total / batch_total - 1) * 100:+.1f}%)")
+
+    # ============================================================
+    # 4. SAVE
+    # ============================================================
+    print("\n" + "=" * 70)
+    print("SAVING ONLINE STATE")
+    print("=" * 70)
+    print(f"  State: {online.save(OUTPUT_DIR)} ({len(after)} series)")
+    forward_path = f'{OUTPUT_DIR}/forecast_online.csv'
+    forward_df.to_csv(forward_path, index=False)
+    print(f"  Forward forecast: {forward_path}")
+
+    print("\n" + "=" * 70)
+    print("[DONE] ONLINE UPDATE COMPLETE")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
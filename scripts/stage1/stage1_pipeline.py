@@ -6,9 +6,184 @@ Master merge of all 5 CSVs + initial diagnostic metrics.
 
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.cube import DemandCube
+from common.dates import DATE_DIM_NAME, add_calendar_features, build_date_dimension
+from common.ingest import ingest_drop, master_dimensions, running_aggregates, save_aggregates
+from common.joins import enrich
+from common.loads import LoadProfile
+from common.paths import data_dir
+from common.schema import apply_schema, memory_report
+from common.store import master_path, save_master, save_table
+from common.streaming import DiagnosticAggregates, IntegrityCounters, stream_master
+
+DATA_DIR = data_dir(os.path.dirname(os.path.abspath(__file__)))
+FORECAST_HORIZON_END = '2025-12-31'  # date dimension covers history through the H2 2025 horizon
+
+parser = argparse.ArgumentParser(description='Stage 1 master merge & diagnostics')
+parser.add_argument('--export-csv', action='store_true',
+                    help='also export master_analytical_dataset.csv alongside the Parquet store')
+parser.add_argument('--ingest', metavar='RIDERSHIP_CSV',
+                    help='append a new ridership drop to the existing master store instead of rebuilding')
+parser.add_argument('--traffic', metavar='TRAFFIC_CSV',
+                    help='traffic file covering the dates of the --ingest drop')
+parser.add_argument('--tag', help='partition name for the --ingest drop (default: ridership file name)')
+parser.add_argument('--chunksize', type=int, metavar='ROWS',
+                    help='stream the ridership file in chunks of ROWS rows (bounded memory)')
+parser.add_argument('--partition-routes', action='store_true',
+                    help='slice the master store by month and route (default: by month)')
+args = parser.parse_args()
+
+
+def print_join_report(join_report, rows_before):
+    for dim, row in join_report.iterrows():
+        label = f"After {dim} join:"
+        print(f"  {label:<21}{row['Rows']} rows (lost {rows_before - row['Rows']}, unmatched {row['Unmatched']})")
+
+
+def print_integrity(integrity):
+    """Step 4 report from IntegrityCounters (whole table or merged chunks)."""
+    print("\n" + "=" * 60)
+    print("STEP 4: Integrity Checks...")
+    print("=" * 60)
+
+    print(f"  Final master rows:     {integrity.rows_out}")
+    print(f"  Original ridership:    {integrity.rows_in}")
+    print(f"  Row difference:        {integrity.rows_out - integrity.rows_in}")
+    print(f"  Null counts per column:")
+    null_counts = integrity.nulls
+    for col, count in null_counts.items():
+        if count > 0:
+            print(f"    {col}: {count} ({count/integrity.rows_out*100:.1f}%)")
+    if null_counts.sum() == 0:
+        print(f"    [OK] No null values found!")
+
+    print(f"\n  Unique Routes:  {len(integrity.routes)}")
+    print(f"  Unique Stops:   {len(integrity.stops)}")
+    print(f"  Unique Dates:   {len(integrity.dates)}")
+    print(f"  Route Types:    {list(integrity.listed['Route_Type'])}")
+    print(f"  Zones:          {list(integrity.listed['Zone'])}")
+    print(f"  Stop Types:     {list(integrity.listed['Stop_Type'])}")
+
+
+def _sum_mean_count(diagnostics, name):
+    # (Total_Pax sum, mean, record count) per group
+    sums, means = diagnostics.sums(name), diagnostics.means(name)
+    return pd.DataFrame({'Total_Pax': sums['Total_Pax'], 'Avg_Pax': means['Total_Pax'],
+                         'Records': sums['Records']})
+
+
+def print_diagnostics(diagnostics):
+    """Step 6 report from DiagnosticAggregates (whole table or merged chunks)."""
+    print("\n" + "=" * 60)
+    print("STEP 6: Initial Diagnostic Metrics")
+    print("=" * 60)
+
+    # 6a. Yearly growth
+    print("\n--- 6a. Yearly Total Pax Growth ---")
+    yearly = _sum_mean_count(diagnostics, 'yearly')
+    yearly.columns = ['Total_Pax', 'Avg_Pax_Per_Record', 'Records']
+    for year, row in yearly.iterrows():
+        print(f"  {year}: Total={row['Total_Pax']:,.0f}  Avg={row['Avg_Pax_Per_Record']:.1f}  Records={row['Records']:,}")
+
+    # Year-over-year growth
+    yearly_totals = yearly['Total_Pax'].values
+    for i in range(1, len(yearly_totals)):
+        growth = (yearly_totals[i] - yearly_totals[i-1]) / yearly_totals[i-1] * 100
+        print(f"  {yearly.index[i-1]}->{yearly.index[i]} growth: {growth:+.1f}%")
+
+    # 6b. Seasonal patterns
+    print("\n--- 6b. Seasonal Demand Patterns ---")
+    seasonal = _sum_mean_count(diagnostics, 'seasonal')
+    for season, row in seasonal.iterrows():
+        print(f"  {season:20s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
+
+    # 6c. Weekday vs Weekend
+    print("\n--- 6c. Weekday vs Weekend ---")
+    daytype = _sum_mean_count(diagnostics, 'daytype')
+    daytype.index = ['Weekday', 'Weekend']
+    for dtype, row in daytype.iterrows():
+        print(f"  {dtype:10s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
+
+    # 6d. Route-type comparison
+    print("\n--- 6d. Route Type Analysis ---")
+    routetype = _sum_mean_count(diagnostics, 'routetype')
+    routetype = routetype.sort_values('Total_Pax', ascending=False)
+    for rtype, row in routetype.iterrows():
+        print(f"  {rtype:12s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
+
+    # 6e. Zone-level demand
+    print("\n--- 6e. Zone-Level Demand ---")
+    zone = _sum_mean_count(diagnostics, 'zone')
+    zone = zone.sort_values('Total_Pax', ascending=False)
+    for z, row in zone.iterrows():
+        print(f"  {z:30s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
+
+    # 6f. Congestion impact
+    print("\n--- 6f. Congestion Level Impact on Ridership ---")
+    congestion_means = diagnostics.means('congestion')
+    congestion = pd.DataFrame({
+        'Total_Pax': diagnostics.sums('congestion')['Total_Pax'],
+        'Avg_Pax': congestion_means['Total_Pax'],
+        'Avg_Speed': congestion_means['Avg_Speed_kmph'],
+        'Avg_Board': congestion_means['Boarding_Count'],
+        'Avg_Alight': congestion_means['Alighting_Count'],
+    }).round(2)
+    for level, row in congestion.iterrows():
+        print(f"  Level {level}: Pax_Avg={row['Avg_Pax']:.1f}  Speed={row['Avg_Speed']:.1f} km/h  Board={row['Avg_Board']:.1f}  Alight={row['Avg_Alight']:.1f}")
+
+    # 6g. Top 10 busiest stops
+    print("\n--- 6g. Top 10 Busiest Stops ---")
+    top_stops = diagnostics.sums('stops')['Total_Pax'].reset_index()
+    top_stops = top_stops.sort_values('Total_Pax', ascending=False).head(10)
+    for _, row in top_stops.iterrows():
+        print(f"  Stop {row['Stop_ID']:2d} ({row['Stop_Type']:12s}|{row['Zone']:25s}): {row['Total_Pax']:>10,.0f} pax")
+
+    # 6h. Top 10 busiest routes
+    print("\n--- 6h. Top 10 Busiest Routes ---")
+    top_routes = diagnostics.sums('routes')['Total_Pax'].reset_index()
+    top_routes = top_routes.sort_values('Total_Pax', ascending=False).head(10)
+    for _, row in top_routes.iterrows():
+        print(f"  Route {row['Route_Code']} ({row['Route_Type']:10s}): {row['Total_Pax']:>12,.0f} pax")
+
+    # 6i. Monthly trend
+    print("\n--- 6i. Monthly Demand Trend (last 12 months of data) ---")
+    monthly = diagnostics.sums('monthly')['Total_Pax']
+    for ym, total in monthly.tail(12).items():
+        print(f"  {ym}: {total:>10,.0f}")
 
-DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============================================================
+# INGEST MODE: append one drop, skip the full rebuild
+# ============================================================
+if args.ingest:
+    if not args.traffic:
+        parser.error('--ingest requires --traffic')
+    print("=" * 60)
+    print(f"INGEST: {os.path.basename(args.ingest)} + {os.path.basename(args.traffic)}")
+    print("=" * 60)
+
+    summary = ingest_drop(DATA_DIR, args.ingest, args.traffic, tag=args.tag)
+    print(f"  Partition:   {summary['tag']} -> {summary['partition']}")
+    print(f"  New rows:    {summary['rows']:,} across {summary['routes']} routes")
+    print(f"  Date range:  {summary['dates'][0]} to {summary['dates'][1]}")
+    print(f"  Total_Pax:   {summary['total_pax']:,}")
+    if summary['load_profile']:
+        print(f"  Load profile: {summary['load_profile']}")
+    if summary['demand_cube']:
+        print(f"  Demand cube:  {summary['demand_cube']}")
+    print(f"\n  Running monthly aggregate (last 6 months):")
+    for _, row in summary['monthly'].tail(6).iterrows():
+        print(f"    {row['YearMonth']}: {row['Total_Pax']:>10,.0f}  ({row['Records']:,} records)")
+
+    print("\n" + "=" * 60)
+    print("[DONE] INGEST COMPLETE")
+    print("=" * 60)
+    sys.exit(0)
 
 # ============================================================
 # 1. LOAD ALL DATASETS
@@ -20,15 +195,61 @@ print("=" * 60)
 routes_df = pd.read_csv(os.path.join(DATA_DIR, 'Bus_Routes.csv'))
 stops_df = pd.read_csv(os.path.join(DATA_DIR, 'Bus_Stops.csv'))
 mapping_df = pd.read_csv(os.path.join(DATA_DIR, 'Route_Stop_Mapping.csv'))
-ridership_df = pd.read_csv(os.path.join(DATA_DIR, 'Train_Ridership_2022_to_2025H1.csv'))
+ridership_path = os.path.join(DATA_DIR, 'Train_Ridership_2022_to_2025H1.csv')
 traffic_df = pd.read_csv(os.path.join(DATA_DIR, 'Train_Traffic_2022_to_2025H1.csv'))
+traffic_df['Date'] = pd.to_datetime(traffic_df['Date'])
 
 print(f"  Routes:          {routes_df.shape}")
 print(f"  Stops:           {stops_df.shape}")
 print(f"  Route-Stop Map:  {mapping_df.shape}")
-print(f"  Ridership:       {ridership_df.shape}")
+if args.chunksize:
+    print(f"  Ridership:       streamed in chunks of {args.chunksize:,} rows")
+else:
+    ridership_df = pd.read_csv(ridership_path)
+    print(f"  Ridership:       {ridership_df.shape}")
 print(f"  Traffic:         {traffic_df.shape}")
 
+dimensions = master_dimensions(routes_df, stops_df, mapping_df, traffic_df)
+
+# ============================================================
+# STREAMING MODE: Steps 2-5 and 7 per chunk, partial aggregates
+# ============================================================
+if args.chunksize:
+    print("\n" + "=" * 60)
+    print("STEPS 2-5: Streaming build (enrich + features + append per chunk)...")
+    print("=" * 60)
+
+    # The date dimension spans the traffic calendar (one row per service day)
+    date_dim = build_date_dimension(traffic_df['Date'].min(), FORECAST_HORIZON_END)
+    date_dim_path = save_table(date_dim, DATA_DIR, DATE_DIM_NAME)
+    integrity, diagnostics, aggregates, load_profile, cube, n_chunks = stream_master(
+        ridership_path, dimensions, date_dim, DATA_DIR, args.chunksize, export_csv=args.export_csv,
+        by_route=args.partition_routes)
+
+    print(f"  Chunks:          {n_chunks}")
+    print(f"  Total_Pax range: {integrity.pax_min} to {integrity.pax_max}")
+    print(f"  Total_Pax mean:  {integrity.pax_mean:.1f}")
+    print(f"  Date range:      {integrity.date_min.date()} to {integrity.date_max.date()}")
+    print_join_report(integrity.joins, integrity.rows_in)
+    print(f"  Date dimension: {len(date_dim):,} days -> {date_dim_path}")
+
+    print_integrity(integrity)
+    print_diagnostics(diagnostics)
+
+    print("\n" + "=" * 60)
+    print("STEP 7: Master dataset stored...")
+    print("=" * 60)
+    print(f"  Saved to: {master_path(DATA_DIR)} (+ {n_chunks - 1} chunk partitions)")
+    for name, path in save_aggregates(aggregates, DATA_DIR).items():
+        print(f"  Aggregate {name}: {path}")
+    print(f"  Load profile: {load_profile.onboard.shape} -> {load_profile.save(DATA_DIR)}")
+    print(f"  Demand cube: {cube.values.shape} -> {cube.save(DATA_DIR)}")
+
+    print("\n" + "=" * 60)
+    print("[DONE] STAGE 1 DATA PIPELINE COMPLETE (streaming)")
+    print("=" * 60)
+    sys.exit(0)
+
 # ============================================================
 # 2. CREATE TARGET METRIC
 # ============================================================
@@ -38,7 +259,6 @@ print("=" * 60)
 
 ridership_df['Total_Pax'] = ridership_df['Boarding_Count'] + ridership_df['Alighting_Count']
 ridership_df['Date'] = pd.to_datetime(ridership_df['Date'])
-traffic_df['Date'] = pd.to_datetime(traffic_df['Date'])
 
 print(f"  Total_Pax range: {ridership_df['Total_Pax'].min()} to {ridership_df['Total_Pax'].max()}")
 print(f"  Total_Pax mean:  {ridership_df['Total_Pax'].mean():.1f}")
@@ -53,62 +273,18 @@ print("=" * 60)
 
 rows_before = len(ridership_df)
 
-# 3a. Merge Ridership + Stop details (on Stop_ID)
-master_df = ridership_df.merge(
-    stops_df[['Stop_ID', 'Stop_Name', 'Latitude', 'Longitude', 'Stop_Type', 'Zone']],
-    on='Stop_ID',
-    how='left'
-)
-print(f"  After Stop merge:    {master_df.shape[0]} rows (lost {rows_before - master_df.shape[0]})")
-
-# 3b. Merge + Route details (on Route_ID)
-master_df = master_df.merge(
-    routes_df[['Route_ID', 'Route_Code', 'Route_Length_km', 'Avg_Travel_Time_Min', 'Route_Type']],
-    on='Route_ID',
-    how='left'
-)
-print(f"  After Route merge:   {master_df.shape[0]} rows (lost {rows_before - master_df.shape[0]})")
-
-# 3c. Merge + Route-Stop Mapping (on Route_ID + Stop_ID)
-master_df = master_df.merge(
-    mapping_df[['Route_ID', 'Stop_ID', 'Stop_Sequence', 'Dwell_Time_Min']],
-    on=['Route_ID', 'Stop_ID'],
-    how='left'
-)
-print(f"  After Mapping merge: {master_df.shape[0]} rows (lost {rows_before - master_df.shape[0]})")
-
-# 3d. Merge + Traffic/Congestion (on Date)
-master_df = master_df.merge(
-    traffic_df[['Date', 'Congestion_Level', 'Avg_Speed_kmph']],
-    on='Date',
-    how='left'
-)
-print(f"  After Traffic merge: {master_df.shape[0]} rows (lost {rows_before - master_df.shape[0]})")
+# Dimension lookups are built once; all attributes are then gathered in a
+# single pass instead of four successive full-table merges.
+# (common/ingest.py shares the same lookups with --ingest mode)
+master_df, join_report = enrich(ridership_df, dimensions)
+print_join_report(join_report, rows_before)
 
 # ============================================================
 # 4. INTEGRITY CHECK
 # ============================================================
-print("\n" + "=" * 60)
-print("STEP 4: Integrity Checks...")
-print("=" * 60)
-
-print(f"  Final master rows:     {len(master_df)}")
-print(f"  Original ridership:    {rows_before}")
-print(f"  Row difference:        {len(master_df) - rows_before}")
-print(f"  Null counts per column:")
-null_counts = master_df.isnull().sum()
-for col, count in null_counts.items():
-    if count > 0:
-        print(f"    {col}: {count} ({count/len(master_df)*100:.1f}%)")
-if null_counts.sum() == 0:
-    print(f"    [OK] No null values found!")
-
-print(f"\n  Unique Routes:  {master_df['Route_ID'].nunique()}")
-print(f"  Unique Stops:   {master_df['Stop_ID'].nunique()}")
-print(f"  Unique Dates:   {master_df['Date'].nunique()}")
-print(f"  Route Types:    {master_df['Route_Type'].unique().tolist()}")
-print(f"  Zones:          {master_df['Zone'].unique().tolist()}")
-print(f"  Stop Types:     {master_df['Stop_Type'].unique().tolist()}")
+integrity = IntegrityCounters()
+integrity.update(rows_before, master_df, join_report)
+print_integrity(integrity)
 
 # ============================================================
 # 5. FEATURE ENGINEERING FOR ANALYSIS
@@ -117,112 +293,35 @@ print("\n" + "=" * 60)
 print("STEP 5: Feature Engineering...")
 print("=" * 60)
 
-master_df['Year'] = master_df['Date'].dt.year
-master_df['Month'] = master_df['Date'].dt.month
-master_df['DayOfWeek'] = master_df['Date'].dt.dayofweek  # 0=Mon, 6=Sun
-master_df['IsWeekend'] = master_df['DayOfWeek'].isin([4, 5]).astype(int)  # Fri-Sat for Dubai
-master_df['Quarter'] = master_df['Date'].dt.quarter
-
-# Season classification (Dubai context)
-def dubai_season(month):
-    if month in [11, 12, 1, 2, 3]:
-        return 'Winter_Peak'
-    elif month in [6, 7, 8]:
-        return 'Summer_Moderate'
-    else:
-        return 'Shoulder'
-
-master_df['Season'] = master_df['Month'].apply(dubai_season)
-
-# Year-Month for time series
-master_df['YearMonth'] = master_df['Date'].dt.to_period('M')
+# Calendar attributes come from the shared date dimension (one row per day,
+# history + forecast horizon) in a single vectorized lookup
+date_dim = build_date_dimension(master_df['Date'].min(), FORECAST_HORIZON_END)
+master_df = add_calendar_features(master_df, date_dim)
+date_dim_path = save_table(date_dim, DATA_DIR, DATE_DIM_NAME)
 
 print(f"  Added: Year, Month, DayOfWeek, IsWeekend, Quarter, Season, YearMonth")
 print(f"  Weekend definition: Friday + Saturday (Dubai standard)")
 print(f"  Seasons: Winter_Peak (Nov-Mar), Summer_Moderate (Jun-Aug), Shoulder (Apr-May, Sep-Oct)")
+print(f"  Date dimension: {len(date_dim):,} days ({date_dim['Date'].min().date()} to "
+      f"{date_dim['Date'].max().date()}) -> {date_dim_path}")
+
+# Compact dtypes (categoricals for dimension strings, narrow ints/floats)
+mem_before = memory_report(master_df)['Bytes']
+master_df = apply_schema(master_df)
+mem_after = memory_report(master_df)
+
+print(f"\n  Compact dtype schema applied (common/schema.py):")
+print(f"  {'Column':<22} {'Dtype':<16} {'Before_KB':>10} {'After_KB':>10}")
+for col, row in mem_after.iterrows():
+    print(f"  {col:<22} {row['Dtype']:<16} {mem_before[col]/1024:>10,.0f} {row['Bytes']/1024:>10,.0f}")
+print(f"  Total: {mem_before.sum()/1024**2:,.1f} MB -> {mem_after['Bytes'].sum()/1024**2:,.1f} MB")
 
 # ============================================================
 # 6. INITIAL DIAGNOSTIC METRICS
 # ============================================================
-print("\n" + "=" * 60)
-print("STEP 6: Initial Diagnostic Metrics")
-print("=" * 60)
-
-# 6a. Yearly growth
-print("\n--- 6a. Yearly Total Pax Growth ---")
-yearly = master_df.groupby('Year')['Total_Pax'].agg(['sum', 'mean', 'count'])
-yearly.columns = ['Total_Pax', 'Avg_Pax_Per_Record', 'Records']
-for year, row in yearly.iterrows():
-    print(f"  {year}: Total={row['Total_Pax']:,.0f}  Avg={row['Avg_Pax_Per_Record']:.1f}  Records={row['Records']:,}")
-
-# Year-over-year growth
-yearly_totals = yearly['Total_Pax'].values
-for i in range(1, len(yearly_totals)):
-    growth = (yearly_totals[i] - yearly_totals[i-1]) / yearly_totals[i-1] * 100
-    print(f"  {yearly.index[i-1]}->{yearly.index[i]} growth: {growth:+.1f}%")
-
-# 6b. Seasonal patterns
-print("\n--- 6b. Seasonal Demand Patterns ---")
-seasonal = master_df.groupby('Season')['Total_Pax'].agg(['sum', 'mean', 'count'])
-seasonal.columns = ['Total_Pax', 'Avg_Pax', 'Records']
-for season, row in seasonal.iterrows():
-    print(f"  {season:20s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
-
-# 6c. Weekday vs Weekend
-print("\n--- 6c. Weekday vs Weekend ---")
-daytype = master_df.groupby('IsWeekend')['Total_Pax'].agg(['sum', 'mean', 'count'])
-daytype.index = ['Weekday', 'Weekend']
-daytype.columns = ['Total_Pax', 'Avg_Pax', 'Records']
-for dtype, row in daytype.iterrows():
-    print(f"  {dtype:10s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
-
-# 6d. Route-type comparison
-print("\n--- 6d. Route Type Analysis ---")
-routetype = master_df.groupby('Route_Type')['Total_Pax'].agg(['sum', 'mean', 'count'])
-routetype.columns = ['Total_Pax', 'Avg_Pax', 'Records']
-routetype = routetype.sort_values('Total_Pax', ascending=False)
-for rtype, row in routetype.iterrows():
-    print(f"  {rtype:12s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
-
-# 6e. Zone-level demand
-print("\n--- 6e. Zone-Level Demand ---")
-zone = master_df.groupby('Zone')['Total_Pax'].agg(['sum', 'mean', 'count'])
-zone.columns = ['Total_Pax', 'Avg_Pax', 'Records']
-zone = zone.sort_values('Total_Pax', ascending=False)
-for z, row in zone.iterrows():
-    print(f"  {z:30s}: Total={row['Total_Pax']:>12,.0f}  Avg={row['Avg_Pax']:.1f}")
-
-# 6f. Congestion impact
-print("\n--- 6f. Congestion Level Impact on Ridership ---")
-congestion = master_df.groupby('Congestion_Level').agg({
-    'Total_Pax': ['sum', 'mean'],
-    'Avg_Speed_kmph': 'mean',
-    'Boarding_Count': 'mean',
-    'Alighting_Count': 'mean'
-}).round(2)
-congestion.columns = ['Total_Pax', 'Avg_Pax', 'Avg_Speed', 'Avg_Board', 'Avg_Alight']
-for level, row in congestion.iterrows():
-    print(f"  Level {level}: Pax_Avg={row['Avg_Pax']:.1f}  Speed={row['Avg_Speed']:.1f} km/h  Board={row['Avg_Board']:.1f}  Alight={row['Avg_Alight']:.1f}")
-
-# 6g. Top 10 busiest stops
-print("\n--- 6g. Top 10 Busiest Stops ---")
-top_stops = master_df.groupby(['Stop_ID', 'Stop_Name', 'Zone', 'Stop_Type'])['Total_Pax'].sum().reset_index()
-top_stops = top_stops.sort_values('Total_Pax', ascending=False).head(10)
-for _, row in top_stops.iterrows():
-    print(f"  Stop {row['Stop_ID']:2d} ({row['Stop_Type']:12s}|{row['Zone']:25s}): {row['Total_Pax']:>10,.0f} pax")
-
-# 6h. Top 10 busiest routes
-print("\n--- 6h. Top 10 Busiest Routes ---")
-top_routes = master_df.groupby(['Route_ID', 'Route_Code', 'Route_Type'])['Total_Pax'].sum().reset_index()
-top_routes = top_routes.sort_values('Total_Pax', ascending=False).head(10)
-for _, row in top_routes.iterrows():
-    print(f"  Route {row['Route_Code']} ({row['Route_Type']:10s}): {row['Total_Pax']:>12,.0f} pax")
-
-# 6i. Monthly trend
-print("\n--- 6i. Monthly Demand Trend (last 12 months of data) ---")
-monthly = master_df.groupby('YearMonth')['Total_Pax'].sum()
-for ym, total in monthly.tail(12).items():
-    print(f"  {ym}: {total:>10,.0f}")
+diagnostics = DiagnosticAggregates()
+diagnostics.update(master_df)
+print_diagnostics(diagnostics)
 
 # ============================================================
 # 7. SAVE MASTER DATASET
@@ -231,10 +330,20 @@ print("\n" + "=" * 60)
 print("STEP 7: Saving master dataset...")
 print("=" * 60)
 
-output_path = os.path.join(DATA_DIR, 'master_analytical_dataset.csv')
-master_df.to_csv(output_path, index=False)
+output_path = save_master(master_df, DATA_DIR, export_csv=args.export_csv, by_route=args.partition_routes)
 print(f"  Saved to: {output_path}")
+if args.export_csv:
+    print(f"  CSV export: {os.path.join(DATA_DIR, 'master_analytical_dataset.csv')}")
 print(f"  Shape: {master_df.shape}")
+
+# Running aggregates, kept current by --ingest without a rebuild
+for name, path in save_aggregates(running_aggregates(master_df), DATA_DIR).items():
+    print(f"  Aggregate {name}: {path}")
+# (route x day x stop sequence) onboard loads and the (measure x pair x day) demand cube
+load_profile = LoadProfile.from_master(master_df)
+print(f"  Load profile: {load_profile.onboard.shape} -> {load_profile.save(DATA_DIR)}")
+cube = DemandCube.from_master(master_df)
+print(f"  Demand cube: {cube.values.shape} -> {cube.save(DATA_DIR)}")
 print(f"  Columns: {master_df.columns.tolist()}")
 
 print("\n" + "=" * 60)
@@ -14,8 +14,13 @@ import seaborn as sns
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END
+from common.paths import data_dir
 
-DATA_DIR = Path(r'c:\Users\asus\Desktop\decodex')
+DATA_DIR = Path(data_dir(r'c:\Users\asus\Desktop\decodex'))
 CHART_DIR = DATA_DIR / 'charts'
 CHART_DIR.mkdir(exist_ok=True)
 
@@ -29,10 +34,14 @@ COLORS = {
 FONT = {'family': 'sans-serif', 'size': 11}
 matplotlib.rc('font', **FONT)
 
-master_df = pd.read_csv(DATA_DIR / 'master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
-forecast_df = pd.read_csv(DATA_DIR / 'forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
+ctx = DataContext(DATA_DIR)
+# Demand breakdowns come from the cube; the master only for the daily traffic columns
+# Both end at TRAIN_END, so drops ingested since never show up as history
+cube = ctx.demand_cube().window(end=TRAIN_END)
+master_df = ctx.master(columns=['Date', 'Total_Pax', 'Congestion_Level', 'Avg_Speed_kmph'], end=TRAIN_END)
+forecast_df = ctx.forecast()
+H1_2025 = [('Date', '>=', H1_START), ('Date', '<=', TRAIN_END)]
+H2_2024 = [('Date', '>=', pd.Timestamp('2024-07-01')), ('Date', '<=', pd.Timestamp('2024-12-31'))]
 
 def add_inference(ax, text, x=0.02, y=0.02, fontsize=9):
     """Add inference text box at bottom of chart."""
@@ -47,7 +56,7 @@ print("Generating visualizations v2...\n")
 # CHART 1: Monthly Demand Trend
 # ============================================================
 fig, ax = plt.subplots(figsize=(14, 6))
-monthly = master_df.groupby(master_df['Date'].dt.to_period('M'))['Total_Pax'].sum()
+monthly = cube.sum(by='YearMonth', measures=['Total_Pax']).set_index('YearMonth')['Total_Pax']
 monthly.index = monthly.index.to_timestamp()
 ax.plot(monthly.index, monthly.values, color=COLORS['primary'], linewidth=2, label='Actual')
 
@@ -83,7 +92,7 @@ print("  [1/12] Monthly demand trend")
 # CHART 2: Yearly Growth
 # ============================================================
 fig, ax = plt.subplots(figsize=(8, 6))
-yearly = master_df.groupby('Year')['Total_Pax'].sum()
+yearly = cube.sum(by='Year', measures=['Total_Pax']).set_index('Year')['Total_Pax']
 bars = ax.bar(yearly.index.astype(str), yearly.values, color=COLORS['primary'], width=0.6, edgecolor='white')
 
 for i in range(1, len(yearly)):
@@ -117,14 +126,14 @@ print("  [2/12] Yearly growth")
 # ============================================================
 fig, ax = plt.subplots(figsize=(9, 6))
 
-def dubai_season(m):
-    if m in [11, 12, 1, 2, 3]: return 'Winter Peak\n(Nov-Mar)'
-    elif m in [6, 7, 8]: return 'Summer Low\n(Jun-Aug)'
-    else: return 'Shoulder\n(Apr-May, Sep-Oct)'
-
-master_df['Season_Label'] = master_df['Date'].dt.month.apply(dubai_season)
+season_labels = {
+    'Winter_Peak': 'Winter Peak\n(Nov-Mar)',
+    'Summer_Moderate': 'Summer Low\n(Jun-Aug)',
+    'Shoulder': 'Shoulder\n(Apr-May, Sep-Oct)',
+}
 season_order = ['Winter Peak\n(Nov-Mar)', 'Shoulder\n(Apr-May, Sep-Oct)', 'Summer Low\n(Jun-Aug)']
-season_data = master_df.groupby('Season_Label')['Total_Pax'].mean().reindex(season_order)
+season_data = cube.mean(by='Season', measures=['Total_Pax'])
+season_data = season_data.set_index(season_data['Season'].map(season_labels).astype(str))['Total_Pax'].reindex(season_order)
 season_colors = ['#1565C0', '#FF8F00', '#C62828']
 
 bars = ax.bar(season_data.index, season_data.values, color=season_colors, width=0.6, edgecolor='white')
@@ -151,8 +160,9 @@ print("  [3/12] Seasonal demand")
 # ============================================================
 fig, axes = plt.subplots(1, 3, figsize=(15, 5.5))
 
-route_type_data = master_df.groupby('Route_Type').agg({'Total_Pax': ['sum', 'mean', 'count']}).reset_index()
-route_type_data.columns = ['Route_Type', 'Total', 'Avg', 'Records']
+route_type_data = cube.sum(by='Route_Type', measures=['Total_Pax', 'Records'])
+route_type_data.columns = ['Route_Type', 'Total', 'Records']
+route_type_data['Avg'] = route_type_data['Total'] / route_type_data['Records']
 type_order = ['City', 'Express', 'Feeder', 'Intercity']
 type_colors = [COLORS[t] for t in type_order]
 route_type_data = route_type_data.set_index('Route_Type').reindex(type_order)
@@ -166,7 +176,7 @@ axes[1].barh(route_type_data.index, route_type_data['Avg'], color=type_colors, e
 axes[1].set_title('Avg Pax per Stop-Day', fontweight='bold')
 for i, v in enumerate(route_type_data['Avg']): axes[1].text(v, i, f' {v:.0f}', va='center', fontweight='bold')
 
-route_counts = master_df.groupby('Route_Type')['Route_ID'].nunique().reindex(type_order)
+route_counts = cube.pairs.groupby('Route_Type', observed=True)['Route_ID'].nunique().reindex(type_order)
 axes[2].barh(route_counts.index, route_counts.values, color=type_colors, edgecolor='white')
 axes[2].set_title('Number of Routes', fontweight='bold')
 for i, v in enumerate(route_counts.values): axes[2].text(v, i, f' {v}', va='center', fontweight='bold', fontsize=12)
@@ -222,8 +232,9 @@ print("  [5/12] Congestion paradox")
 # CHART 6: Zone Demand
 # ============================================================
 fig, ax = plt.subplots(figsize=(12, 6))
-zone_data = master_df.groupby('Zone')['Total_Pax'].agg(['sum', 'mean']).reset_index()
-zone_data.columns = ['Zone', 'Total', 'Avg']
+zone_data = cube.sum(by='Zone', measures=['Total_Pax', 'Records'])
+zone_data['Avg'] = zone_data['Total_Pax'] / zone_data['Records']
+zone_data = zone_data.rename(columns={'Total_Pax': 'Total'})[['Zone', 'Total', 'Avg']]
 zone_data = zone_data.sort_values('Total', ascending=True)
 zone_data['Short'] = zone_data['Zone'].str.replace('Res_','').str.replace('CBD_','').str.replace('Core_','').str.replace('Ind_','').str.replace('Coastal_','')
 
@@ -252,8 +263,7 @@ print("  [6/12] Zone demand")
 # CHART 7: Weekday vs Weekend
 # ============================================================
 fig, ax = plt.subplots(figsize=(12, 6))
-master_df['IsWeekend'] = master_df['Date'].dt.dayofweek.isin([4, 5]).astype(int)
-daytype = master_df.groupby(['Route_Code', 'Route_Type', 'IsWeekend'])['Total_Pax'].mean().reset_index()
+daytype = cube.mean(by=['Route_Code', 'Route_Type', 'IsWeekend'], measures=['Total_Pax'])
 weekday = daytype[daytype['IsWeekend'] == 0].set_index('Route_Code')['Total_Pax']
 weekend = daytype[daytype['IsWeekend'] == 1].set_index('Route_Code')['Total_Pax']
 
@@ -272,7 +282,7 @@ ax.set_title('Weekday vs Weekend Demand by Route', fontsize=14, fontweight='bold
 ax.set_ylabel('Avg Passengers per Stop-Day')
 ax.legend()
 
-type_map = master_df.groupby('Route_Code')['Route_Type'].first().to_dict()
+type_map = cube.pairs.groupby('Route_Code', observed=True)['Route_Type'].first().to_dict()
 for label in ax.get_xticklabels():
     rtype = type_map.get(label.get_text(), '')
     label.set_color(COLORS.get(rtype, 'black'))
@@ -293,7 +303,7 @@ print("  [7/12] Weekday vs weekend")
 # CHART 8: Top 10 Busiest Stops
 # ============================================================
 fig, ax = plt.subplots(figsize=(12, 7))
-top_stops = master_df.groupby(['Stop_ID', 'Zone', 'Stop_Type'])['Total_Pax'].sum().reset_index()
+top_stops = cube.sum(by=['Stop_ID', 'Zone', 'Stop_Type'], measures=['Total_Pax'])
 top_stops = top_stops.sort_values('Total_Pax', ascending=True).tail(10)
 
 zone_colors = {
@@ -335,10 +345,9 @@ print("  [8/12] Top stops")
 # CHART 9: Overload Risk Score
 # ============================================================
 fig, ax = plt.subplots(figsize=(10, 7))
-recent = master_df[master_df['Date'] >= '2025-01-01']
-route_daily = recent.groupby(['Date', 'Route_ID', 'Route_Code', 'Route_Type'])['Total_Pax'].sum().reset_index()
-route_avg = route_daily.groupby(['Route_Code', 'Route_Type'])['Total_Pax'].mean().reset_index()
-routes_info = pd.read_csv(DATA_DIR / 'Bus_Routes.csv')
+route_daily = cube.sum(by=['Date', 'Route_ID', 'Route_Code', 'Route_Type'], where=H1_2025, measures=['Total_Pax'])
+route_avg = route_daily.groupby(['Route_Code', 'Route_Type'], observed=True)['Total_Pax'].mean().reset_index()
+routes_info = ctx.routes()
 route_avg = route_avg.merge(routes_info[['Route_Code', 'Route_Length_km']], on='Route_Code')
 route_avg['Pax_Per_Km'] = route_avg['Total_Pax'] / route_avg['Route_Length_km']
 min_pk, max_pk = route_avg['Pax_Per_Km'].min(), route_avg['Pax_Per_Km'].max()
@@ -381,8 +390,7 @@ print("  [9/12] Overload risk")
 # ============================================================
 fig, ax = plt.subplots(figsize=(12, 6))
 
-h2_2024 = master_df[(master_df['Date'] >= '2024-07-01') & (master_df['Date'] <= '2024-12-31')]
-h2_2024_monthly = h2_2024.groupby(h2_2024['Date'].dt.month)['Total_Pax'].sum()
+h2_2024_monthly = cube.sum(by='Month', where=H2_2024, measures=['Total_Pax']).set_index('Month')['Total_Pax']
 h2_2025_monthly = forecast_df.groupby(forecast_df['Date'].dt.month)['Forecast_Total_Pax'].sum()
 
 months = ['Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
@@ -501,11 +509,9 @@ print("  [11/12] Fleet reallocation (with current counts)")
 fig, ax = plt.subplots(figsize=(12, 7))
 
 dow_names = {0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri\n(Wknd)', 5: 'Sat\n(Wknd)', 6: 'Sun'}
-recent = master_df[master_df['Date'] >= '2025-01-01']
-recent_daily = recent.groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
-recent_daily['DayOfWeek'] = recent_daily['Date'].dt.dayofweek
+recent_daily = cube.sum(by=['Date', 'DayOfWeek', 'Route_Code'], where=H1_2025, measures=['Total_Pax'])
 
-heatmap_data = recent_daily.groupby(['Route_Code', 'DayOfWeek'])['Total_Pax'].mean().reset_index()
+heatmap_data = recent_daily.groupby(['Route_Code', 'DayOfWeek'], observed=True)['Total_Pax'].mean().reset_index()
 heatmap_pivot = heatmap_data.pivot(index='Route_Code', columns='DayOfWeek', values='Total_Pax')
 route_order = heatmap_pivot.sum(axis=1).sort_values(ascending=True).index
 heatmap_pivot = heatmap_pivot.reindex(route_order)
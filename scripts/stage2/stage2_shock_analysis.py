@@ -15,8 +15,16 @@ import pandas as pd
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END
+from common.joins import DimensionIndex, enrich
+from common.paths import data_dir
+from common.regression import grouped_ols
 
-DATA_DIR = r'c:\Users\asus\Desktop\decodex'
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
 
 # ============================================================
 # 0. LOAD ALL DATA
@@ -25,34 +33,38 @@ print("=" * 70)
 print("STAGE 2: STRUCTURAL BREAK ANALYSIS — METRO PHASE 2")
 print("=" * 70)
 
-# Historical master dataset
-master_df = pd.read_csv(f'{DATA_DIR}/master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
+ctx = DataContext(DATA_DIR)
+
+# Historical master dataset, up to TRAIN_END: an ingested shock drop is read from its own file
+master_df = ctx.master(columns=[
+    'Date', 'Total_Pax', 'Congestion_Level', 'Avg_Speed_kmph'
+], end=TRAIN_END)
+
+# Pre-shock demand breakdowns come from the demand cube
+cube = ctx.demand_cube().window(end=TRAIN_END)
+H1_2025 = [('Date', '>=', H1_START), ('Date', '<=', TRAIN_END)]
 
 # Stage 1 forecast
-forecast_df = pd.read_csv(f'{DATA_DIR}/forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
+forecast_df = ctx.forecast()
 
 # NEW: Shock data
-shock_ride = pd.read_csv(f'{DATA_DIR}/Shock_Ridership_2025_Q3.csv')
-shock_ride['Date'] = pd.to_datetime(shock_ride['Date'])
+shock_ride = ctx.shock_ridership()
 shock_ride['Total_Pax'] = shock_ride['Boarding_Count'] + shock_ride['Alighting_Count']
 
-shock_traffic = pd.read_csv(f'{DATA_DIR}/Shock_Traffic_2025_Q3.csv')
-shock_traffic['Date'] = pd.to_datetime(shock_traffic['Date'])
+shock_traffic = ctx.shock_traffic()
 
 # Route metadata
-routes_df = pd.read_csv(f'{DATA_DIR}/Bus_Routes.csv')
-mapping_df = pd.read_csv(f'{DATA_DIR}/Route_Stop_Mapping.csv')
-stops_df = pd.read_csv(f'{DATA_DIR}/Bus_Stops.csv')
+routes_df = ctx.routes()
+mapping_df = ctx.mapping()
+stops_df = ctx.stops()
 
 # Enrich shock data — it already has Route_Code & Route_Type
 # Only add Route_Length_km from routes, and Zone/Stop_Type from stops
-shock_ride = shock_ride.merge(
-    routes_df[['Route_ID', 'Route_Length_km']].drop_duplicates(), on='Route_ID', how='left')
-shock_ride = shock_ride.merge(
-    stops_df[['Stop_ID', 'Stop_Type', 'Zone']].drop_duplicates(), on='Stop_ID', how='left')
-shock_ride = shock_ride.merge(shock_traffic, on='Date', how='left')
+shock_ride, _ = enrich(shock_ride, [
+    DimensionIndex('Route', routes_df, ['Route_ID'], ['Route_Length_km']),
+    DimensionIndex('Stop', stops_df, ['Stop_ID'], ['Stop_Type', 'Zone']),
+    DimensionIndex('Traffic', shock_traffic, ['Date'], ['Congestion_Level', 'Avg_Speed_kmph']),
+])
 
 # Metro-affected zones
 METRO_ZONES = ['CBD_Downtown', 'CBD_BusinessBay', 'Core_Deira']
@@ -121,9 +133,8 @@ for _, r in route_comparison.iterrows():
 print(f"\n  A3. SHIFT CLASSIFICATION BY TYPE")
 
 # Level shift: compare pre-shock vs post-shock daily averages
-h1_2025 = master_df[master_df['Date'] >= '2025-01-01']
-h1_daily = h1_2025.groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
-h1_route_avg = h1_daily.groupby('Route_Code')['Total_Pax'].mean()
+h1_daily = cube.sum(by=['Date', 'Route_Code'], where=H1_2025, measures=['Total_Pax'])
+h1_route_avg = h1_daily.groupby('Route_Code', observed=True)['Total_Pax'].mean()
 
 q3_route_daily = shock_ride.groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
 q3_route_avg = q3_route_daily.groupby('Route_Code')['Total_Pax'].mean()
@@ -131,12 +142,12 @@ q3_route_avg = q3_route_daily.groupby('Route_Code')['Total_Pax'].mean()
 level_shift = ((q3_route_avg / h1_route_avg) - 1) * 100
 
 # Volatility shift: compare CV
-h1_route_cv = h1_daily.groupby('Route_Code')['Total_Pax'].std() / h1_daily.groupby('Route_Code')['Total_Pax'].mean()
+h1_route_cv = h1_daily.groupby('Route_Code', observed=True)['Total_Pax'].std() / h1_daily.groupby('Route_Code', observed=True)['Total_Pax'].mean()
 q3_route_cv = q3_route_daily.groupby('Route_Code')['Total_Pax'].std() / q3_route_daily.groupby('Route_Code')['Total_Pax'].mean()
 vol_shift = ((q3_route_cv / h1_route_cv) - 1) * 100
 
 # Congestion-mediated shift
-h1_traffic = master_df[master_df['Date'] >= '2025-01-01'].groupby('Date')[['Congestion_Level', 'Avg_Speed_kmph']].first()
+h1_traffic = master_df[master_df['Date'] >= H1_START].groupby('Date')[['Congestion_Level', 'Avg_Speed_kmph']].first()
 q3_cong_mean = shock_traffic['Congestion_Level'].mean()
 h1_cong_mean = h1_traffic['Congestion_Level'].mean()
 cong_shift = ((q3_cong_mean / h1_cong_mean) - 1) * 100
@@ -161,12 +172,13 @@ print(f"      Avg Speed:        {h1_speed_mean:.1f} → {q3_speed_mean:.1f} km/h
 
 # Elasticity shift: how has ridership-congestion relationship changed?
 q3_merged = shock_ride.groupby('Date').agg({'Total_Pax': 'sum', 'Congestion_Level': 'first'}).reset_index()
-h1_merged = master_df[master_df['Date'] >= '2025-01-01'].groupby('Date').agg({'Total_Pax': 'sum', 'Congestion_Level': 'first'}).reset_index()
+h1_merged = master_df[master_df['Date'] >= H1_START].groupby('Date').agg({'Total_Pax': 'sum', 'Congestion_Level': 'first'}).reset_index()
 
 if len(q3_merged) > 5:
-    from numpy.polynomial.polynomial import polyfit
-    h1_elast = np.polyfit(h1_merged['Congestion_Level'], h1_merged['Total_Pax'], 1)[0]
-    q3_elast = np.polyfit(q3_merged['Congestion_Level'], q3_merged['Total_Pax'], 1)[0]
+    # Both periods in one grouped fit (common/regression.py)
+    elast = grouped_ols(pd.concat([h1_merged.assign(Period='H1'), q3_merged.assign(Period='Q3')]),
+                        x='Congestion_Level', y='Total_Pax', by='Period')['Slope']
+    h1_elast, q3_elast = elast['H1'], elast['Q3']
     elast_change = ((q3_elast / h1_elast) - 1) * 100 if h1_elast != 0 else 0
     
     print(f"\n    ELASTICITY SHIFT (congestion→ridership sensitivity):")
@@ -182,8 +194,8 @@ print(f"\n  A4. ZONE-LEVEL IMPACT (Metro-Affected vs Others)")
 # Q3 actual by zone
 q3_zone = shock_ride.groupby('Zone')['Total_Pax'].sum()
 # H1 actual by zone (3 months equivalent for fair comparison)
-h1_zone = master_df[master_df['Date'] >= '2025-01-01'].groupby('Zone')['Total_Pax'].sum()
-h1_days = master_df[master_df['Date'] >= '2025-01-01']['Date'].nunique()
+h1_zone = cube.sum(by='Zone', where=H1_2025, measures=['Total_Pax']).set_index('Zone')['Total_Pax']
+h1_days = cube.days(where=H1_2025)
 q3_days = shock_ride['Date'].nunique()
 h1_zone_daily = h1_zone / h1_days
 q3_zone_daily = q3_zone / q3_days
@@ -224,8 +236,8 @@ for route in sorted(route_adjustment.keys()):
     route_adjustment[route] = adj_factor
     print(f"    {route}: deviation {adj:>+6.1f}% → {classification} → Factor: {adj_factor:.3f}")
 
-# Generate Q4 forecast
-q4_original = forecast_df[(forecast_df['Date'] >= '2025-10-01') & (forecast_df['Date'] <= '2025-12-31')].copy()
+# Generate Q4 forecast straight from the stored Stage 1 components (no refit, no CSV rescan)
+q4_original = ctx.forecaster().predict('2025-10-01', '2025-12-31')
 q4_revised = q4_original.copy()
 
 for route, factor in route_adjustment.items():
@@ -287,7 +299,7 @@ q3_route_avg2['Pax_Per_Km'] = q3_route_avg2['Total_Pax'] / q3_route_avg2['Route_
 
 # Compare with pre-shock overload
 h1_route_daily_total = h1_daily.copy()
-h1_route_avg2 = h1_route_daily_total.groupby('Route_Code')['Total_Pax'].mean().reset_index()
+h1_route_avg2 = h1_route_daily_total.groupby('Route_Code', observed=True)['Total_Pax'].mean().reset_index()
 h1_route_avg2 = h1_route_avg2.merge(routes_df[['Route_Code', 'Route_Length_km']], on='Route_Code')
 h1_route_avg2['Pax_Per_Km'] = h1_route_avg2['Total_Pax'] / h1_route_avg2['Route_Length_km']
 
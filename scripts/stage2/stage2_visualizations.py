@@ -15,8 +15,13 @@ from matplotlib.patches import Patch
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END
+from common.paths import data_dir
 
-DATA_DIR = Path(r'c:\Users\asus\Desktop\decodex')
+DATA_DIR = Path(data_dir(r'c:\Users\asus\Desktop\decodex'))
 CHART_DIR = DATA_DIR / 'charts'
 CHART_DIR.mkdir(exist_ok=True)
 
@@ -28,14 +33,13 @@ COLORS = {
 matplotlib.rc('font', family='sans-serif', size=11)
 
 # Load data
-master_df = pd.read_csv(DATA_DIR / 'master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'])
-forecast_df = pd.read_csv(DATA_DIR / 'forecast_h2_2025.csv')
-forecast_df['Date'] = pd.to_datetime(forecast_df['Date'])
-shock_ride = pd.read_csv(DATA_DIR / 'Shock_Ridership_2025_Q3.csv')
-shock_ride['Date'] = pd.to_datetime(shock_ride['Date'])
+ctx = DataContext(DATA_DIR)
+cube = ctx.demand_cube().window(end=TRAIN_END)
+H1_2025 = [('Date', '>=', H1_START), ('Date', '<=', TRAIN_END)]
+forecast_df = ctx.forecast()
+shock_ride = ctx.shock_ridership()
 shock_ride['Total_Pax'] = shock_ride['Boarding_Count'] + shock_ride['Alighting_Count']
-routes_df = pd.read_csv(DATA_DIR / 'Bus_Routes.csv')
+routes_df = ctx.routes()
 shock_ride = shock_ride.merge(routes_df[['Route_ID', 'Route_Length_km']].drop_duplicates(), on='Route_ID', how='left')
 
 def add_inference(ax, text, x=0.02, y=0.02, fontsize=9):
@@ -100,9 +104,8 @@ print("  [1/6] Forecast deviation")
 fig, axes = plt.subplots(1, 2, figsize=(14, 6))
 
 # Before: H1 2025
-h1 = master_df[master_df['Date'] >= '2025-01-01']
-h1_type = h1.groupby([h1['Date'], 'Route_Type'])['Total_Pax'].sum().reset_index()
-h1_type_avg = h1_type.groupby('Route_Type')['Total_Pax'].mean()
+h1_type = cube.sum(by=['Date', 'Route_Type'], where=H1_2025, measures=['Total_Pax'])
+h1_type_avg = h1_type.groupby('Route_Type', observed=True)['Total_Pax'].mean()
 
 # After: Q3 2025
 q3_type = shock_ride.groupby([shock_ride['Date'], 'Route_Type'])['Total_Pax'].sum().reset_index()
@@ -144,7 +147,7 @@ print("  [2/6] Demand redistribution")
 fig, ax = plt.subplots(figsize=(14, 6))
 
 # Historical monthly
-monthly = master_df.groupby(master_df['Date'].dt.to_period('M'))['Total_Pax'].sum()
+monthly = cube.sum(by='YearMonth', measures=['Total_Pax']).set_index('YearMonth')['Total_Pax']
 monthly.index = monthly.index.to_timestamp()
 ax.plot(monthly.index, monthly.values, color=COLORS['primary'], linewidth=2, label='Historical Actual')
 
@@ -161,8 +164,7 @@ ax.plot(q3_monthly.index, q3_monthly.values, color=COLORS['danger'], linewidth=3
         label='Q3 Actual (Post-Metro)', marker='o', markersize=8)
 
 # Revised forecast (Q4)
-revised_df = pd.read_csv(DATA_DIR / 'revised_forecast_q4_2025.csv')
-revised_df['Date'] = pd.to_datetime(revised_df['Date'])
+revised_df = ctx.revised_forecast()
 rev_monthly = revised_df.groupby(revised_df['Date'].dt.to_period('M'))['Forecast_Total_Pax'].sum()
 rev_monthly.index = rev_monthly.index.to_timestamp()
 ax.plot(rev_monthly.index, rev_monthly.values, color=COLORS['success'], linewidth=2,
@@ -197,8 +199,8 @@ print("  [3/6] Timeline with break")
 fig, ax = plt.subplots(figsize=(12, 7))
 
 # Level shift by route
-h1_daily = master_df[master_df['Date'] >= '2025-01-01'].groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
-h1_avg = h1_daily.groupby('Route_Code')['Total_Pax'].mean()
+h1_daily = cube.sum(by=['Date', 'Route_Code'], where=H1_2025, measures=['Total_Pax'])
+h1_avg = h1_daily.groupby('Route_Code', observed=True)['Total_Pax'].mean()
 q3_daily = shock_ride.groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
 q3_avg = q3_daily.groupby('Route_Code')['Total_Pax'].mean()
 
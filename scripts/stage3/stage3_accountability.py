@@ -6,15 +6,22 @@ Sections:
   A. Forecast Performance Audit (Stage1 vs Q3, Stage2 vs Q4)
   B. Strategic Alignment Evaluation
   C. Elasticity & Substitution Diagnosis
-  D. 2026 Forward Strategy
+  D. 2026 Forward Strategy (incl. the Stage 1 model's 2026 monthly baseline)
 """
 
 import pandas as pd
 import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.context import DataContext
+from common.dates import H1_START, TRAIN_END
+from common.paths import DATA_SEARCH_DIRS, data_dir
+from common.regression import grouped_ols
 
-DATA_DIR = r'c:\Users\asus\Desktop\decodex'
+DATA_DIR = data_dir(r'c:\Users\asus\Desktop\decodex')
 
 print("=" * 70)
 print("STAGE 3: STRATEGIC ACCOUNTABILITY & STABILIZED REGIME EVALUATION")
@@ -23,39 +30,34 @@ print("=" * 70)
 # ============================================================
 # 0. LOAD ALL DATA
 # ============================================================
-# Historical
-master_df = pd.read_csv(f'{DATA_DIR}/data/generated/master_analytical_dataset.csv')
-master_df['Date'] = pd.to_datetime(master_df['Date'], format='mixed', dayfirst=True)
-master_df['Total_Pax'] = master_df['Boarding_Count'] + master_df['Alighting_Count'] if 'Total_Pax' not in master_df.columns else master_df['Total_Pax']
+# Same search order as the orchestrator: the flat data directory, then the data/ layout
+ctx = DataContext(DATA_DIR, subdirs=DATA_SEARCH_DIRS)
+DATES = {'format': 'mixed', 'dayfirst': True}
 
-routes_df = pd.read_csv(f'{DATA_DIR}/data/raw/Bus_Routes.csv')
+# Historical: H1 2025 is the baseline for every comparison, so only its row groups are read
+h1_data = ctx.master(start=H1_START, end=TRAIN_END, columns=[
+    'Date', 'Route_Code', 'Route_Type', 'Total_Pax', 'Congestion_Level', 'Avg_Speed_kmph'
+])
+
+routes_df = ctx.routes()
 
 # Stage 1 forecast
-s1_forecast = pd.read_csv(f'{DATA_DIR}/data/generated/forecast_h2_2025.csv')
-s1_forecast['Date'] = pd.to_datetime(s1_forecast['Date'], format='mixed', dayfirst=True)
+s1_forecast = ctx.forecast(**DATES)
 
 # Stage 2 revised forecast
-s2_forecast = pd.read_csv(f'{DATA_DIR}/data/generated/revised_forecast_q4_2025.csv')
-s2_forecast['Date'] = pd.to_datetime(s2_forecast['Date'], format='mixed', dayfirst=True)
+s2_forecast = ctx.revised_forecast(**DATES)
 
 # Q3 actuals (shock)
-q3_actual = pd.read_csv(f'{DATA_DIR}/data/shock/Shock_Ridership_2025_Q3.csv')
-q3_actual['Date'] = pd.to_datetime(q3_actual['Date'], format='mixed', dayfirst=True)
+q3_actual = ctx.shock_ridership(**DATES)
 q3_actual['Total_Pax'] = q3_actual['Boarding_Count'] + q3_actual['Alighting_Count']
 
 # Q4 actuals (out-of-time) — NEW
-q4_actual = pd.read_csv(f'{DATA_DIR}/data/raw/OutOfTime_Ridership_2025_Q4.csv')
-q4_actual['Date'] = pd.to_datetime(q4_actual['Date'], format='mixed', dayfirst=True)
+q4_actual = ctx.q4_ridership(**DATES)
 q4_actual['Total_Pax'] = q4_actual['Boarding_Count'] + q4_actual['Alighting_Count']
 
-q4_traffic = pd.read_csv(f'{DATA_DIR}/data/raw/OutOfTime_Traffic_2025_Q4.csv')
-q4_traffic['Date'] = pd.to_datetime(q4_traffic['Date'], format='mixed', dayfirst=True)
+q4_traffic = ctx.q4_traffic(**DATES)
 
-q3_traffic = pd.read_csv(f'{DATA_DIR}/data/shock/Shock_Traffic_2025_Q3.csv')
-q3_traffic['Date'] = pd.to_datetime(q3_traffic['Date'], format='mixed', dayfirst=True)
-
-# H1 2025 for baseline comparisons
-h1_data = master_df[master_df['Date'] >= '2025-01-01']
+q3_traffic = ctx.shock_traffic(**DATES)
 
 print(f"\n  Data loaded:")
 print(f"    Q4 Ridership: {q4_actual.shape[0]:,} rows, {q4_actual['Date'].nunique()} days")
@@ -259,13 +261,15 @@ for route in sorted(stage2_fleet.keys()):
 
 # B3: Did elasticity assumptions persist?
 print(f"\n  B3. ELASTICITY PERSISTENCE CHECK")
-h1_traffic = master_df[master_df['Date'] >= '2025-01-01'].groupby('Date').agg({'Total_Pax': 'sum', 'Congestion_Level': 'first'}).reset_index()
+h1_traffic = h1_data.groupby('Date').agg({'Total_Pax': 'sum', 'Congestion_Level': 'first'}).reset_index()
 q3_merged = q3_actual.groupby('Date')['Total_Pax'].sum().reset_index().merge(q3_traffic, on='Date')
 q4_merged = q4_actual.groupby('Date')['Total_Pax'].sum().reset_index().merge(q4_traffic, on='Date')
 
-h1_elast = np.polyfit(h1_traffic['Congestion_Level'], h1_traffic['Total_Pax'], 1)[0]
-q3_elast = np.polyfit(q3_merged['Congestion_Level'], q3_merged['Total_Pax'], 1)[0]
-q4_elast = np.polyfit(q4_merged['Congestion_Level'], q4_merged['Total_Pax'], 1)[0]
+# H1, Q3 and Q4 fitted together (common/regression.py)
+periods = pd.concat([h1_traffic.assign(Period='H1'), q3_merged.assign(Period='Q3'),
+                     q4_merged.assign(Period='Q4')])
+elast = grouped_ols(periods, x='Congestion_Level', y='Total_Pax', by='Period')['Slope']
+h1_elast, q3_elast, q4_elast = elast['H1'], elast['Q3'], elast['Q4']
 
 print(f"    H1 2025 elasticity: {h1_elast:>+8,.0f} pax per congestion level")
 print(f"    Q3 2025 elasticity: {q3_elast:>+8,.0f} pax per congestion level (shock)")
@@ -286,8 +290,8 @@ print("=" * 70)
 
 # C1: Metro substitution elasticity
 print(f"\n  C1. METRO SUBSTITUTION ELASTICITY")
-h1_type_daily = h1_data.groupby([h1_data['Date'], 'Route_Type'])['Total_Pax'].sum().reset_index()
-h1_type_avg = h1_type_daily.groupby('Route_Type')['Total_Pax'].mean()
+h1_type_daily = h1_data.groupby([h1_data['Date'], 'Route_Type'], observed=True)['Total_Pax'].sum().reset_index()
+h1_type_avg = h1_type_daily.groupby('Route_Type', observed=True)['Total_Pax'].mean()
 q3_type_daily = q3_actual.groupby([q3_actual['Date'], 'Route_Type'])['Total_Pax'].sum().reset_index()
 q3_type_avg = q3_type_daily.groupby('Route_Type')['Total_Pax'].mean()
 q4_type_daily = q4_actual.groupby([q4_actual['Date'], 'Route_Type'])['Total_Pax'].sum().reset_index()
@@ -309,7 +313,7 @@ print(f"\n  C2. CONGESTION ELASTICITY PERSISTENCE")
 h1_cong = h1_traffic['Congestion_Level'].mean()
 q3_cong = q3_traffic['Congestion_Level'].mean()
 q4_cong = q4_traffic['Congestion_Level'].mean()
-h1_speed = master_df[master_df['Date'] >= '2025-01-01'].groupby('Date')['Avg_Speed_kmph'].first().mean()
+h1_speed = h1_data.groupby('Date')['Avg_Speed_kmph'].first().mean()
 q3_speed = q3_traffic['Avg_Speed_kmph'].mean()
 q4_speed = q4_traffic['Avg_Speed_kmph'].mean()
 
@@ -419,9 +423,9 @@ print(f"\n  D6. EFFICIENCY GAIN (2026 Projection)")
 q4_enriched = q4_daily.merge(routes_df[['Route_Code', 'Route_Length_km']], on='Route_Code')
 q4_pax_km = q4_enriched.groupby('Route_Code').apply(
     lambda g: g['Total_Pax'].mean() / g['Route_Length_km'].iloc[0])
-h1_enriched = h1_data.groupby(['Date', 'Route_Code'])['Total_Pax'].sum().reset_index()
+h1_enriched = h1_data.groupby(['Date', 'Route_Code'], observed=True)['Total_Pax'].sum().reset_index()
 h1_enriched = h1_enriched.merge(routes_df[['Route_Code', 'Route_Length_km']], on='Route_Code')
-h1_pax_km = h1_enriched.groupby('Route_Code').apply(
+h1_pax_km = h1_enriched.groupby('Route_Code', observed=True).apply(
     lambda g: g['Total_Pax'].mean() / g['Route_Length_km'].iloc[0])
 
 print(f"    {'Route':<8} {'H1 Pax/km':>10} {'Q4 Pax/km':>10} {'Change':>8}")
@@ -432,6 +436,22 @@ for route in sorted(stage2_fleet.keys()):
     ch = ((q4_pk / h1_pk) - 1) * 100 if h1_pk > 0 else 0
     print(f"    {route:<8} {h1_pk:>9.1f} {q4_pk:>9.1f} {ch:>+7.1f}%")
 
+# D7: 2026 baseline (Stage 1 model projected monthly) vs the stabilized Q4 run-rate
+print(f"\n  D7. 2026 BASELINE DEMAND (Stage 1 model, monthly) vs Q4 RUN-RATE")
+fcast_2026 = ctx.forecaster().predict('2026-01-01', '2026-12-31', freq='M')
+type_2026 = fcast_2026.groupby('Route_Type')['Forecast_Total_Pax'].sum() / fcast_2026.groupby('Date')['Days'].first().sum()
+q4_type_daily = (q4_actual.groupby(['Date', 'Route_Type'])['Total_Pax'].sum()
+                 .groupby('Route_Type').mean())
+print(f"    {'Type':<12} {'2026 Daily':>11} {'Q4 Daily':>10} {'Gap':>8}")
+print("    " + "-" * 44)
+for rtype, daily_2026 in type_2026.items():
+    q4_d = q4_type_daily.get(rtype, 0)
+    gap = ((q4_d / daily_2026) - 1) * 100 if daily_2026 > 0 else 0
+    print(f"    {rtype:<12} {daily_2026:>11,.0f} {q4_d:>10,.0f} {gap:>+7.1f}%")
+peak_month = fcast_2026.groupby('Date')['Forecast_Total_Pax'].sum().idxmax()
+print(f"    2026 baseline total: {fcast_2026['Forecast_Total_Pax'].sum():,.0f} pax, "
+      f"peak month {peak_month:%b}")
+
 # ============================================================
 # EXECUTIVE SUMMARY
 # ============================================================
@@ -14,11 +14,14 @@ import matplotlib.ticker as mticker
 import numpy as np
 from matplotlib.patches import Patch
 from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common.paths import data_dir
 
 plt.style.use('seaborn-v0_8-darkgrid')
 matplotlib.rc('font', family='sans-serif', size=11)
 
-CHART_DIR = Path(r'c:\Users\asus\Desktop\decodex\charts\stage3')
+CHART_DIR = Path(data_dir(r'c:\Users\asus\Desktop\decodex')) / 'charts' / 'stage3'
 CHART_DIR.mkdir(parents=True, exist_ok=True)
 
 BLUE = '#1976D2'